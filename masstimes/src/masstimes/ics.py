@@ -0,0 +1,119 @@
+import hashlib
+from datetime import UTC, datetime
+
+from .schedule import Schedule, Service
+
+_MAX_LINE_OCTETS = 75
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Folds a content line into lines of at most 75 octets (RFC 5545, 3.1)."""
+    if len(line.encode()) <= _MAX_LINE_OCTETS:
+        return line
+
+    parts: list[str] = []
+    current = ""
+
+    for character in line:
+        # Continuation lines start with a space, which counts towards their length
+        limit = _MAX_LINE_OCTETS - (1 if parts else 0)
+
+        if len((current + character).encode()) > limit:
+            parts.append(current)
+            current = ""
+
+        current += character
+
+    parts.append(current)
+
+    return "\r\n ".join(parts)
+
+
+def _format_local(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y%m%dT%H%M%S")
+
+
+def _format_utc(schedule: Schedule, timestamp: datetime) -> str:
+    # Written in UTC, which needs no VTIMEZONE component to be understood
+    return (
+        timestamp.replace(tzinfo=schedule.timezone)
+        .astimezone(UTC)
+        .strftime("%Y%m%dT%H%M%SZ")
+    )
+
+
+def _uid(schedule: Schedule, service: Service) -> str:
+    # Only one service of a church starts at a time, so church and start identify
+    # the event
+    church = hashlib.sha256(schedule.church.encode()).hexdigest()[:16]
+    return f"{_format_local(service.start)}-{church}@masstimes"
+
+
+class CalendarFeed:
+    """
+    Renders schedules as iCalendar feeds.
+
+    Events are cached per service, so after a reload of the schedule only new or
+    changed services have to be rendered again.
+    """
+
+    def __init__(self) -> None:
+        self._events: dict[tuple[str, str, Service], str] = {}
+
+    def _event(self, schedule: Schedule, service: Service) -> str:
+        key = (schedule.church, schedule.timezone.key, service)
+        event = self._events.get(key)
+
+        if event is None:
+            lines = [
+                f"UID:{_escape(_uid(schedule, service))}",
+                f"DTSTART:{_format_utc(schedule, service.start)}",
+                f"DTEND:{_format_utc(schedule, service.end)}",
+                f"SUMMARY:{_escape(service.description)}",
+                f"LOCATION:{_escape(schedule.church)}",
+                "END:VEVENT",
+            ]
+            event = "".join(f"{_fold(line)}\r\n" for line in lines)
+            self._events[key] = event
+
+        return event
+
+    def render(self, schedule: Schedule) -> str:
+        # The stamp is taken from the data file, so that the feed only changes
+        # together with the schedule
+        stamp = schedule.modified_at.strftime("%Y%m%dT%H%M%SZ")
+        events = [
+            f"BEGIN:VEVENT\r\nDTSTAMP:{stamp}\r\n{self._event(schedule, service)}"
+            for service in schedule.services
+        ]
+
+        # Drop events of services that are no longer part of the schedule
+        current = {
+            (schedule.church, schedule.timezone.key, service)
+            for service in schedule.services
+        }
+        self._events = {
+            key: event for key, event in self._events.items() if key in current
+        }
+
+        return "".join(
+            [
+                "BEGIN:VCALENDAR\r\n",
+                "VERSION:2.0\r\n",
+                "PRODID:-//masstimes//Heilige Messe//DE\r\n",
+                "CALSCALE:GREGORIAN\r\n",
+                f"{_fold(f'X-WR-CALNAME:{_escape(schedule.church)}')}\r\n",
+                f"X-WR-TIMEZONE:{schedule.timezone.key}\r\n",
+                *events,
+                "END:VCALENDAR\r\n",
+            ]
+        )
@@ -1,10 +1,40 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from webcommon.compression import CompressionMiddleware, CompressionStats
+
+from .routers import home, services
+from .schedule import get_schedule_store
+from .static_assets import static_assets
+from .templating import precompile_templates
+
+logger = logging.getLogger(__name__)
+
+compression_stats = CompressionStats()
+
+
+@asynccontextmanager
+async def lifespan(fastapi_app: FastAPI) -> AsyncIterator[None]:
+    precompile_templates()
+
+    # Fails the startup on a broken schedule, and renders the home page up front
+    home.render_home_page(fastapi_app, get_schedule_store().current())
+
+    yield
+
+    logger.info(
+        f"Compressed {compression_stats.responses} responses to "
+        f"{compression_stats.ratio:.1%} of their size"
+    )
 
-from .routers import home
 
-app = FastAPI(docs_url=None, redoc_url=None)
+app = FastAPI(docs_url=None, redoc_url=None, lifespan=lifespan)
+# Pages and the calendar feed are precompressed and passed through as they are
+app.add_middleware(CompressionMiddleware, stats=compression_stats)
 
-app.mount("/static", StaticFiles(directory="src/masstimes/static"), name="static")
+app.mount("/static", static_assets, name="static")
 
 app.include_router(home.router)
+app.include_router(services.router)
@@ -0,0 +1,83 @@
+import gzip
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Self
+
+from fastapi import FastAPI, Request, Response
+from webcommon.content_encoding import choose_encoding
+
+from .templating import templates
+
+# Brotli is an optional extra, pages are only compressed with gzip without it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+@dataclass(frozen=True)
+class PrecompressedPage:
+    """
+    A page rendered once and kept compressed in memory, so that serving it is only
+    a matter of picking the right byte buffer.
+    """
+
+    etag: str
+    media_type: str
+    identity: bytes
+    gzip: bytes
+    brotli: bytes | None
+
+    @classmethod
+    def from_content(cls, content: str, media_type: str = "text/html") -> Self:
+        body = content.encode()
+
+        return cls(
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            media_type=media_type,
+            identity=body,
+            # Compression happens once, so it can use the highest levels
+            gzip=gzip.compress(body, compresslevel=9, mtime=0),
+            brotli=brotli.compress(body, quality=11) if brotli else None,
+        )
+
+    def response(self, request: Request) -> Response:
+        bodies = {"br": self.brotli, "gzip": self.gzip}
+        encoding = choose_encoding(
+            request.headers.get("accept-encoding", ""),
+            [encoding for encoding, body in bodies.items() if body is not None],
+        )
+        body = bodies[encoding] if encoding else self.identity
+
+        # Each encoding is a different representation, with its own strong ETag
+        etag = f'{self.etag[:-1]}-{encoding}"' if encoding else self.etag
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "public, max-age=60",
+        }
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+def render_page(app: FastAPI, name: str, **context: Any) -> PrecompressedPage:
+    """
+    Renders a template outside of any request and compresses the result.
+
+    url_for is replaced by a variant generating paths instead of absolute URLs, as
+    the host of future requests is not known yet.
+    """
+
+    def url_for(route_name: str, /, **path_params: Any) -> str:
+        return str(app.url_path_for(route_name, **path_params))
+
+    html = templates.get_template(name).render(url_for=url_for, **context)
+
+    return PrecompressedPage.from_content(html)
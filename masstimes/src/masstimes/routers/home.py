@@ -1,16 +1,25 @@
-from pathlib import Path
+from functools import lru_cache
+from typing import Annotated
 
-from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, FastAPI, Request, Response
+
+from ..precompressed import PrecompressedPage, render_page
+from ..schedule import Schedule, ScheduleStore, get_schedule_store
 
 router = APIRouter()
 
-templates = Jinja2Templates(
-    directory=Path(__file__).resolve().parent.parent / "templates"
-)
+WEEKDAYS = ("Mo", "Di", "Mi", "Do", "Fr", "Sa", "So")
+
+
+@lru_cache(maxsize=1)
+def render_home_page(app: FastAPI, schedule: Schedule) -> PrecompressedPage:
+    """Renders the home page once per version of the schedule."""
+    return render_page(app, "home.html.jinja", schedule=schedule, weekdays=WEEKDAYS)
 
 
 @router.get("/")
-async def home(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(request=request, name="home.html.jinja")
+async def home(
+    request: Request,
+    store: Annotated[ScheduleStore, Depends(get_schedule_store)],
+) -> Response:
+    return render_home_page(request.app, store.current()).response(request)
@@ -0,0 +1,49 @@
+from datetime import date
+from functools import lru_cache
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from ..ics import CalendarFeed
+from ..precompressed import PrecompressedPage
+from ..schedule import Schedule, ScheduleStore, Service, get_schedule_store
+
+router = APIRouter()
+
+_calendar_feed = CalendarFeed()
+
+
+@lru_cache(maxsize=1)
+def _calendar_page(schedule: Schedule) -> PrecompressedPage:
+    return PrecompressedPage.from_content(
+        _calendar_feed.render(schedule), media_type="text/calendar"
+    )
+
+
+@router.get("/services/next")
+async def services_next(
+    store: Annotated[ScheduleStore, Depends(get_schedule_store)],
+    count: Annotated[int, Query(ge=1, le=100)] = 5,
+) -> list[Service]:
+    return list(store.current().next_services(count))
+
+
+@router.get("/services")
+async def services_between(
+    store: Annotated[ScheduleStore, Depends(get_schedule_store)],
+    start: date,
+    end: date,
+) -> list[Service]:
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    return list(store.current().between(start, end))
+
+
+@router.get("/calendar.ics")
+async def calendar(
+    request: Request,
+    store: Annotated[ScheduleStore, Depends(get_schedule_store)],
+) -> Response:
+    # Rendered and compressed once per version of the schedule
+    return _calendar_page(store.current()).response(request)
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from functools import cache
+from itertools import groupby
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULE_FILE = Path(__file__).resolve().parent / "data" / "schedule.json"
+
+_DEFAULT_DURATION_MINUTES = 60
+
+
+@dataclass(frozen=True)
+class Service:
+    """A single service, with its start in the local time of the church."""
+
+    start: datetime
+    description: str
+    duration: timedelta = timedelta(minutes=_DEFAULT_DURATION_MINUTES)
+
+    @property
+    def end(self) -> datetime:
+        return self.start + self.duration
+
+
+# Compared by identity, so caches keyed by a schedule are cheap to look up and are
+# invalidated by every reload.
+@dataclass(frozen=True, eq=False)
+class Schedule:
+    """Immutable, date-sorted index of all services, replaced as a whole on reload."""
+
+    church: str
+    timezone: ZoneInfo
+    services: tuple[Service, ...]
+    modified_at: datetime
+    _starts: list[datetime] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self, "_starts", [service.start for service in self.services]
+        )
+
+    def now(self) -> datetime:
+        """Current local time of the church, comparable to the service starts."""
+        return datetime.now(self.timezone).replace(tzinfo=None)
+
+    def next_services(
+        self, count: int, after: datetime | None = None
+    ) -> Sequence[Service]:
+        """Returns up to count services starting at or after the given time."""
+        index = bisect_left(self._starts, after if after is not None else self.now())
+        return self.services[index : index + count]
+
+    def between(self, start: date, end: date) -> Sequence[Service]:
+        """Returns all services on the days from start up to and including end."""
+        first = bisect_left(self._starts, datetime.combine(start, datetime.min.time()))
+        last = bisect_left(
+            self._starts, datetime.combine(end + timedelta(days=1), datetime.min.time())
+        )
+        return self.services[first:last]
+
+    def by_day(self) -> list[tuple[date, list[Service]]]:
+        return [
+            (day, list(services))
+            for day, services in groupby(
+                self.services, key=lambda service: service.start.date()
+            )
+        ]
+
+
+def _parse_schedule(path: Path, modified_at: datetime) -> Schedule:
+    with path.open(encoding="utf-8") as file:
+        data = json.load(file)
+
+    services = sorted(
+        (
+            Service(
+                start=datetime.fromisoformat(service["start"]),
+                description=service["description"],
+                duration=timedelta(
+                    minutes=service.get("duration_minutes", _DEFAULT_DURATION_MINUTES)
+                ),
+            )
+            for service in data["services"]
+        ),
+        key=lambda service: service.start,
+    )
+
+    return Schedule(
+        church=data["church"],
+        timezone=ZoneInfo(data["timezone"]),
+        services=tuple(services),
+        modified_at=modified_at,
+    )
+
+
+class ScheduleStore:
+    """
+    Keeps the schedule of a data file in memory, reloading it whenever the file's
+    modification time changes.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._mtime_ns: int | None = None
+        self._schedule: Schedule | None = None
+
+    def current(self) -> Schedule:
+        """
+        Returns the current schedule, reloading the data file if it changed.
+
+        If reloading fails, e.g. because the file is being written, the previous
+        schedule is kept until the file changes again.
+
+        Raises:
+            OSError, ValueError, KeyError, TypeError: If the data file cannot be
+                loaded and no schedule was loaded before.
+        """
+        schedule = self._schedule
+
+        try:
+            mtime_ns = self._path.stat().st_mtime_ns
+
+            if schedule is None or mtime_ns != self._mtime_ns:
+                self._mtime_ns = mtime_ns
+                schedule = self._schedule = _parse_schedule(
+                    self._path, datetime.fromtimestamp(mtime_ns / 1e9, UTC)
+                )
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if schedule is None:
+                raise
+
+            logger.warning(
+                f"Keeping previous schedule, loading {self._path} failed: {e}"
+            )
+
+        return schedule
+
+
+@cache
+def get_schedule_store() -> ScheduleStore:
+    return ScheduleStore(Path(os.getenv("SCHEDULE_FILE", DEFAULT_SCHEDULE_FILE)))
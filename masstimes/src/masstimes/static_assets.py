@@ -0,0 +1,12 @@
+from pathlib import Path
+
+from webcommon.static_assets import StaticAssets, compress_files
+
+STATIC_DIRECTORY = Path(__file__).resolve().parent / "static"
+
+static_assets = StaticAssets(directory=STATIC_DIRECTORY, prefix="/static")
+
+
+if __name__ == "__main__":
+    # Run while building the image to precompress the static files
+    print(f"Wrote {compress_files(STATIC_DIRECTORY)} compressed static files")
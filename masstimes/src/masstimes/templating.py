@@ -0,0 +1,50 @@
+import os
+from pathlib import Path
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+from .static_assets import static_assets
+
+TEMPLATE_DIRECTORY = Path(__file__).resolve().parent / "templates"
+
+
+def _create_bytecode_cache() -> jinja2.BytecodeCache | None:
+    # Compiled templates survive restarts; an empty value disables the cache
+    directory = os.getenv("TEMPLATE_CACHE_DIR", ".cache/templates")
+
+    if not directory:
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    return jinja2.FileSystemBytecodeCache(directory)
+
+
+templates = Jinja2Templates(
+    env=jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIRECTORY),
+        autoescape=True,
+        bytecode_cache=_create_bytecode_cache(),
+        # Templates only change with a deployment
+        auto_reload=False,
+    )
+)
+templates.env.globals["asset_url"] = static_assets.url
+
+
+def precompile_templates() -> list[str]:
+    """
+    Loads and compiles all templates, so that a broken template fails the startup
+    instead of the first request rendering it.
+    """
+    names = templates.env.list_templates(extensions=["jinja"])
+
+    for name in names:
+        templates.get_template(name)
+
+    return names
+
+
+if __name__ == "__main__":
+    # Run while building the image to bake the compiled templates into it
+    print(f"Compiled {len(precompile_templates())} templates")
@@ -0,0 +1,93 @@
+from datetime import UTC, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from masstimes.ics import CalendarFeed
+from masstimes.schedule import Schedule, Service
+
+
+def _schedule(*services: Service, church: str = "St. Paul") -> Schedule:
+    return Schedule(
+        church=church,
+        timezone=ZoneInfo("Europe/Berlin"),
+        services=services,
+        modified_at=datetime(2025, 8, 1, tzinfo=UTC),
+    )
+
+
+def _unfold(feed: str) -> list[str]:
+    return feed.replace("\r\n ", "").split("\r\n")
+
+
+def test_times_are_written_in_utc() -> None:
+    feed = CalendarFeed().render(
+        _schedule(
+            Service(start=datetime(2025, 8, 24, 9, 30), description="Sommerzeit"),
+            Service(
+                start=datetime(2025, 12, 24, 22, 0),
+                description="Christmette",
+                duration=timedelta(minutes=90),
+            ),
+        )
+    )
+    lines = _unfold(feed)
+
+    assert "DTSTART:20250824T073000Z" in lines
+    assert "DTEND:20250824T083000Z" in lines
+    assert "DTSTART:20251224T210000Z" in lines
+    assert "DTEND:20251224T223000Z" in lines
+    assert not any("TZID" in line for line in lines)
+
+
+def test_uids_differ_between_churches() -> None:
+    service = Service(start=datetime(2025, 8, 24, 9, 30), description="Hochamt")
+    feed = CalendarFeed()
+
+    uids = {
+        line
+        for church in ("St. Paul", "St. Peter")
+        for line in _unfold(feed.render(_schedule(service, church=church)))
+        if line.startswith("UID:")
+    }
+
+    assert len(uids) == 2
+
+
+def test_text_is_escaped() -> None:
+    feed = CalendarFeed().render(
+        _schedule(
+            Service(
+                start=datetime(2025, 8, 24, 9, 30),
+                description="Messe; danach Agape, Kaffee\\Kuchen\nim Saal",
+            )
+        )
+    )
+
+    summary = "SUMMARY:Messe\\; danach Agape\\, Kaffee\\\\Kuchen\\nim Saal"
+
+    assert summary in _unfold(feed)
+
+
+def test_long_lines_are_folded_between_characters() -> None:
+    description = "Hl. Messe für die Verstorbenen der Gemeinde – Gedenken " * 3
+    feed = CalendarFeed().render(
+        _schedule(Service(start=datetime(2025, 8, 24, 9, 30), description=description))
+    )
+
+    # Splitting inside a multi-byte character would fail to decode per line
+    physical_lines = feed.encode().split(b"\r\n")
+
+    assert all(len(line) <= 75 for line in physical_lines)
+    assert all(line.decode() for line in physical_lines if line)
+    assert f"SUMMARY:{description}" in _unfold(feed)
+
+
+def test_events_of_removed_services_are_not_kept() -> None:
+    first = Service(start=datetime(2025, 8, 24, 9, 30), description="Hochamt")
+    second = Service(start=datetime(2025, 8, 31, 9, 30), description="Hochamt")
+    feed = CalendarFeed()
+
+    feed.render(_schedule(first, second))
+    rendered = feed.render(_schedule(second))
+
+    assert len(feed._events) == 1
+    assert rendered.count("BEGIN:VEVENT") == 1
@@ -0,0 +1,79 @@
+import gzip
+
+import pytest
+from fastapi import Request
+
+from masstimes.precompressed import PrecompressedPage
+
+PAGE = PrecompressedPage.from_content("<p>Heilige Messe</p>\n" * 100)
+
+
+def _request(headers: dict[str, str]) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+def test_page_is_sent_unencoded_without_accept_encoding() -> None:
+    response = PAGE.response(_request({}))
+
+    assert response.status_code == 200
+    assert response.body == PAGE.identity
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == PAGE.etag
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_page_is_sent_gzipped() -> None:
+    response = PAGE.response(_request({"Accept-Encoding": "gzip, deflate"}))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == PAGE.identity
+    assert response.headers["etag"] == f'{PAGE.etag[:-1]}-gzip"'
+
+
+def test_page_is_sent_as_brotli_if_accepted() -> None:
+    # Brotli is an optional extra, without it pages are only gzipped
+    brotli = pytest.importorskip("brotli")
+
+    response = PAGE.response(_request({"Accept-Encoding": "gzip, br"}))
+
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(response.body) == PAGE.identity
+    assert response.headers["etag"] == f'{PAGE.etag[:-1]}-br"'
+
+
+def test_refused_encodings_are_not_used() -> None:
+    response = PAGE.response(_request({"Accept-Encoding": "br;q=0, gzip;q=0"}))
+
+    assert "content-encoding" not in response.headers
+    assert response.body == PAGE.identity
+
+
+def test_matching_etag_is_not_modified() -> None:
+    etag = f'{PAGE.etag[:-1]}-gzip"'
+
+    response = PAGE.response(
+        _request({"Accept-Encoding": "gzip", "If-None-Match": f'"other", {etag}'})
+    )
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+
+
+def test_etag_of_another_encoding_is_modified() -> None:
+    response = PAGE.response(
+        _request({"Accept-Encoding": "gzip", "If-None-Match": PAGE.etag})
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
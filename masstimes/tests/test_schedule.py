@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from masstimes.schedule import ScheduleStore
+
+
+def _write_schedule(path: Path, services: list[dict[str, Any]], mtime: int) -> None:
+    path.write_text(
+        json.dumps(
+            {"church": "St. Paul", "timezone": "Europe/Berlin", "services": services}
+        ),
+        encoding="utf-8",
+    )
+    # Set explicitly, as consecutive writes may share a modification time
+    os.utime(path, ns=(mtime, mtime))
+
+
+SERVICES: list[dict[str, Any]] = [
+    {"start": "2025-08-30T17:00", "description": "Vorabendmesse"},
+    {"start": "2025-08-24T09:30", "description": "Hochamt"},
+    {"start": "2025-08-30T16:30", "description": "Beichte", "duration_minutes": 30},
+    {"start": "2025-08-31T09:30", "description": "Hochamt"},
+]
+
+
+@pytest.fixture
+def schedule_file(tmp_path: Path) -> Path:
+    path = tmp_path / "schedule.json"
+    _write_schedule(path, SERVICES, 1_000_000_000)
+    return path
+
+
+def test_services_are_sorted_by_start(schedule_file: Path) -> None:
+    schedule = ScheduleStore(schedule_file).current()
+
+    assert [service.start for service in schedule.services] == sorted(
+        datetime.fromisoformat(service["start"]) for service in SERVICES
+    )
+    assert schedule.services[1].end == datetime(2025, 8, 30, 17, 0)
+
+
+def test_store_reloads_only_when_the_file_changes(schedule_file: Path) -> None:
+    store = ScheduleStore(schedule_file)
+    first = store.current()
+
+    assert store.current() is first
+
+    _write_schedule(schedule_file, SERVICES[:1], 2_000_000_000)
+    reloaded = store.current()
+
+    assert reloaded is not first
+    assert [service.description for service in reloaded.services] == ["Vorabendmesse"]
+
+
+def test_store_keeps_the_previous_schedule_if_reloading_fails(
+    schedule_file: Path,
+) -> None:
+    store = ScheduleStore(schedule_file)
+    first = store.current()
+
+    schedule_file.write_text("{", encoding="utf-8")
+    os.utime(schedule_file, ns=(2_000_000_000, 2_000_000_000))
+
+    assert store.current() is first
+
+
+def test_store_fails_without_any_schedule(tmp_path: Path) -> None:
+    with pytest.raises(OSError):
+        ScheduleStore(tmp_path / "missing.json").current()
+
+
+def test_next_services_start_at_or_after_the_given_time(schedule_file: Path) -> None:
+    schedule = ScheduleStore(schedule_file).current()
+
+    services = schedule.next_services(2, after=datetime(2025, 8, 30, 16, 30))
+
+    assert [service.description for service in services] == [
+        "Beichte",
+        "Vorabendmesse",
+    ]
+    assert schedule.next_services(5, after=datetime(2025, 9, 1)) == ()
+
+
+def test_between_includes_the_whole_end_day(schedule_file: Path) -> None:
+    schedule = ScheduleStore(schedule_file).current()
+
+    services = schedule.between(date(2025, 8, 25), date(2025, 8, 30))
+
+    assert [service.description for service in services] == [
+        "Beichte",
+        "Vorabendmesse",
+    ]
+    assert schedule.between(date(2025, 8, 25), date(2025, 8, 29)) == ()
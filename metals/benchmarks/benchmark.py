@@ -0,0 +1,406 @@
+"""
+Load and latency benchmark of the metals app.
+
+Seeds a fresh SQLite database with portfolios, holdings and a price history, stubs
+the upstream price APIs and drives the real routes concurrently, in process. Run it
+from the metals directory, so that templates and static files are found:
+
+    PYTHONPATH=src uv run python benchmarks/benchmark.py --output results.json
+
+The results are written as JSON, to compare runs across commits.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+# Prices served by the stubbed upstream APIs
+STUB_PRICES_IN_USD = {"XAU": 2650.0, "XAG": 31.0}
+STUB_USD_TO_EUR = 0.92
+
+# Interval of the seeded price ticks, like the default refresh interval
+PRICE_TICK_INTERVAL = timedelta(minutes=5)
+
+
+@dataclass
+class Counter:
+    queries: int = 0
+
+
+# Statements run while handling a request are counted in the request's counter. The
+# ASGI transport runs the app in the task of the client, so the counter follows the
+# request into the app, the database driver and streamed responses.
+_current_counter: contextvars.ContextVar[Counter | None] = contextvars.ContextVar(
+    "current_counter", default=None
+)
+
+
+@dataclass
+class RouteResults:
+    latencies: list[float] = field(default_factory=list)
+    queries: int = 0
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> dict[str, float | int]:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput_rps": round(len(self.latencies) / elapsed, 1),
+            "mean_ms": round(_mean(self.latencies) * 1000, 2),
+            "p50_ms": round(_percentile(self.latencies, 50) * 1000, 2),
+            "p95_ms": round(_percentile(self.latencies, 95) * 1000, 2),
+            "p99_ms": round(_percentile(self.latencies, 99) * 1000, 2),
+            "queries_per_request": round(self.queries / max(len(self.latencies), 1), 2),
+        }
+
+
+def _mean(values: list[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    """Nearest-rank percentile, so results are actual measurements."""
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(int(len(ordered) * percentile / 100 + 0.5), 1)
+
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _stub_upstreams(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "api.gold-api.com":
+        symbol = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"price": STUB_PRICES_IN_USD[symbol]})
+
+    if request.url.host == "api.frankfurter.app":
+        return httpx.Response(200, json={"rates": {"EUR": STUB_USD_TO_EUR}})
+
+    return httpx.Response(404)
+
+
+def _seed(
+    database_url: str, args: argparse.Namespace
+) -> dict[uuid.UUID, list[uuid.UUID]]:
+    """Creates the schema and seed data, returning the holding ids per portfolio."""
+    from sqlalchemy import create_engine, insert
+
+    from metals.internal.persistency.models import (
+        BaseModel,
+        Holding,
+        LatestMetalPrice,
+        MetalPrice,
+        Portfolio,
+    )
+    from metals.internal.types import Metal
+
+    rng = random.Random(args.seed)
+    now = datetime.now(UTC)
+    engine = create_engine(database_url.replace("+aiosqlite", ""))
+    BaseModel.metadata.create_all(engine)
+
+    holding_ids: dict[uuid.UUID, list[uuid.UUID]] = {}
+
+    with engine.begin() as connection:
+        for _ in range(args.portfolios):
+            portfolio_id = uuid.UUID(int=rng.getrandbits(128))
+            connection.execute(
+                insert(Portfolio),
+                [{"id": portfolio_id, "created_at": now, "updated_at": now}],
+            )
+            ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(args.holdings)]
+            rows = [
+                {
+                    "id": holding_id,
+                    "portfolio_id": portfolio_id,
+                    "description": f"Holding {index}",
+                    "metal": rng.choice(list(Metal)),
+                    "quantity": round(rng.uniform(0.1, 100), 2),
+                    "purchase_price": round(rng.uniform(20, 2500), 2),
+                    "created_at": now - timedelta(minutes=args.holdings - index),
+                    "updated_at": now,
+                }
+                for index, holding_id in enumerate(ids)
+            ]
+            connection.execute(insert(Holding), rows)
+            holding_ids[portfolio_id] = ids
+
+        tick_count = int(timedelta(days=args.history_days) / PRICE_TICK_INTERVAL)
+        base_prices = {
+            Metal.GOLD: STUB_PRICES_IN_USD["XAU"] * STUB_USD_TO_EUR,
+            Metal.SILVER: STUB_PRICES_IN_USD["XAG"] * STUB_USD_TO_EUR,
+        }
+
+        for metal, base_price in base_prices.items():
+            price = base_price
+            ticks = []
+
+            for tick in range(tick_count):
+                # A random walk of about 0.1% per tick
+                price *= 1 + rng.gauss(0, 0.001)
+                created_at = now - PRICE_TICK_INTERVAL * (tick_count - tick)
+                ticks.append(
+                    {
+                        "id": uuid.UUID(int=rng.getrandbits(128)),
+                        "metal": metal,
+                        "price": price,
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                    }
+                )
+
+            connection.execute(insert(MetalPrice), ticks)
+            connection.execute(
+                insert(LatestMetalPrice),
+                [
+                    {
+                        "metal": metal,
+                        "price": price,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                ],
+            )
+
+    engine.dispose()
+
+    return holding_ids
+
+
+Route = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+
+def _routes(holding_ids: dict[uuid.UUID, list[uuid.UUID]]) -> dict[str, Route]:
+    portfolio_ids = list(holding_ids)
+
+    async def home(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.get("/")
+
+    async def portfolio_show(
+        client: httpx.AsyncClient, rng: random.Random
+    ) -> httpx.Response:
+        return await client.get(f"/p/{rng.choice(portfolio_ids)}")
+
+    async def portfolio_stream(
+        client: httpx.AsyncClient, rng: random.Random
+    ) -> httpx.Response:
+        return await client.get(f"/p/{rng.choice(portfolio_ids)}?stream=true")
+
+    async def holdings_export(
+        client: httpx.AsyncClient, rng: random.Random
+    ) -> httpx.Response:
+        return await client.get(f"/p/{rng.choice(portfolio_ids)}/holdings/export.csv")
+
+    async def holding_update(
+        client: httpx.AsyncClient, rng: random.Random
+    ) -> httpx.Response:
+        portfolio_id = rng.choice(portfolio_ids)
+        holding_id = rng.choice(holding_ids[portfolio_id])
+
+        return await client.post(
+            f"/p/{portfolio_id}/holdings/{holding_id}",
+            data={
+                "description": "Updated holding",
+                "metal": rng.choice(["Gold", "Silver"]),
+                "quantity": str(round(rng.uniform(0.1, 100), 2)),
+                "purchase_price": str(round(rng.uniform(20, 2500), 2)),
+            },
+        )
+
+    return {
+        "home": home,
+        "portfolio_show": portfolio_show,
+        "portfolio_stream": portfolio_stream,
+        "holdings_export": holdings_export,
+        "holding_update": holding_update,
+    }
+
+
+def _parse_mix(value: str) -> dict[str, int]:
+    """Parses a route mix like home=1,portfolio_show=8 into weights per route."""
+    mix = {}
+
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+
+    return mix
+
+
+async def _run(
+    args: argparse.Namespace, holding_ids: dict[uuid.UUID, list[uuid.UUID]]
+) -> dict[str, Any]:
+    from sqlalchemy import event
+
+    from metals.internal.persistency.db import engine
+    from metals.internal.price_cache import get_price_refresher
+    from metals.main import app
+    from metals.routers.shared import precompile_templates
+
+    def count_query(*_args: Any) -> None:
+        counter = _current_counter.get()
+
+        if counter is not None:
+            counter.queries += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+
+    routes = _routes(holding_ids)
+    mix = _parse_mix(args.mix)
+    unknown = set(mix) - set(routes)
+
+    if unknown:
+        raise SystemExit(f"Unknown routes in mix: {', '.join(sorted(unknown))}")
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {name: RouteResults() for name in names}
+    remaining = args.warmup + args.requests
+
+    async def worker(client: httpx.AsyncClient, rng: random.Random) -> None:
+        nonlocal remaining
+
+        while remaining > 0:
+            measured = remaining <= args.requests
+            remaining -= 1
+            name = rng.choices(names, weights)[0]
+            counter = Counter()
+            token = _current_counter.set(counter)
+
+            started_at = time.perf_counter()
+            try:
+                response = await routes[name](client, rng)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            finally:
+                _current_counter.reset(token)
+            latency = time.perf_counter() - started_at
+
+            if measured:
+                results[name].latencies.append(latency)
+                results[name].queries += counter.queries
+                results[name].errors += failed
+
+    # Started like in the app's lifespan, but with the upstream APIs stubbed
+    precompile_templates()
+    refresher = get_price_refresher()
+
+    async with (
+        httpx.AsyncClient(
+            transport=httpx.MockTransport(_stub_upstreams)
+        ) as upstream_client,
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://benchmark",
+            headers={"Accept-Encoding": args.accept_encoding},
+            follow_redirects=False,
+        ) as client,
+    ):
+        refresher.start_background_refresh(upstream_client)
+
+        started_at = time.perf_counter()
+        await asyncio.gather(
+            *(
+                worker(client, random.Random(args.seed + index))
+                for index in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started_at
+
+        await refresher.stop_background_refresh()
+
+    await engine.dispose()
+
+    total = RouteResults()
+    for route_results in results.values():
+        total.latencies += route_results.latencies
+        total.queries += route_results.queries
+        total.errors += route_results.errors
+
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "total": total.summary(elapsed),
+        "routes": {name: results[name].summary(elapsed) for name in names},
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+        )
+    except OSError:
+        return None
+
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--portfolios", type=int, default=50)
+    parser.add_argument("--holdings", type=int, default=200, help="Per portfolio")
+    parser.add_argument("--history-days", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument(
+        "--mix",
+        default="home=2,portfolio_show=10,portfolio_stream=2,holdings_export=1,"
+        "holding_update=2",
+        help="Weights of the requested routes",
+    )
+    parser.add_argument("--accept-encoding", default="gzip, deflate, br")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="File to write, stdout if unset")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite+aiosqlite:///{directory}/benchmark.db"
+
+        # Read by the app when it is imported, so they are set beforehand
+        os.environ["DATABASE_URL"] = database_url
+        os.environ["TEMPLATE_CACHE_DIR"] = f"{directory}/templates"
+        os.environ.pop("APP_ENV", None)
+
+        holding_ids = _seed(database_url, args)
+        results = asyncio.run(_run(args, holding_ids))
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        **results,
+    }
+    output = json.dumps(report, indent=2)
+
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Add latest_metal_prices table
+
+Revision ID: 24c3449e7572
+Revises: 908f022d3547
+Create Date: 2026-10-17 10:12:41.208513
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '24c3449e7572'
+down_revision: Union[str, Sequence[str], None] = '908f022d3547'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('latest_metal_prices',
+    sa.Column('metal', sa.Enum('SILVER', 'GOLD', name='metal'), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('metal')
+    )
+
+    # Rows written before this revision may share their created_at timestamp, so on
+    # SQLite the insertion order is used to find the most recent one.
+    tiebreaker = ', rowid DESC' if op.get_bind().dialect.name == 'sqlite' else ''
+
+    op.execute(
+        f"""
+        INSERT INTO latest_metal_prices (metal, price, created_at, updated_at)
+        SELECT mp.metal, mp.price, mp.created_at, mp.updated_at
+        FROM metal_prices mp
+        WHERE mp.id = (
+            SELECT latest.id
+            FROM metal_prices latest
+            WHERE latest.metal = mp.metal
+            ORDER BY latest.created_at DESC{tiebreaker}
+            LIMIT 1
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('latest_metal_prices')
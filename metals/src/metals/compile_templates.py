@@ -0,0 +1,11 @@
+"""
+Compiles all templates into the bytecode cache, e.g. while building the image:
+
+    PYTHONPATH=src python -m metals.compile_templates
+"""
+
+from metals.routers.shared import precompile_templates
+
+if __name__ == "__main__":
+    names = precompile_templates()
+    print(f"Compiled {len(names)} templates")
@@ -0,0 +1,11 @@
+"""
+Writes precompressed siblings of the static files, e.g. while building the image:
+
+    PYTHONPATH=src python -m metals.compress_assets
+"""
+
+from webcommon.static_assets import compress_files
+
+if __name__ == "__main__":
+    written = compress_files("src/metals/static")
+    print(f"Wrote {written} compressed static files")
@@ -1,5 +1,141 @@
 import os
+from datetime import date
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
 
 
 def is_development_mode() -> bool:
     return os.getenv("APP_ENV", "").lower() == "development"
+
+
+def get_price_history_retention_days() -> int:
+    """Returns for how many days raw price ticks are kept before compaction."""
+    return int(os.getenv("PRICE_HISTORY_RETENTION_DAYS", "7"))
+
+
+def get_price_staleness_threshold_seconds() -> int:
+    """Returns the age after which prices are reported as stale by /healthz."""
+    return int(os.getenv("PRICE_STALENESS_THRESHOLD_SECONDS", "900"))
+
+
+def get_price_refresh_interval_seconds() -> int:
+    """Returns how often prices are refreshed while they are requested now and then."""
+    return int(os.getenv("PRICE_REFRESH_INTERVAL_SECONDS", "300"))
+
+
+def get_price_refresh_busy_interval_seconds() -> int:
+    """Returns how often prices are refreshed while they are requested a lot."""
+    return int(os.getenv("PRICE_REFRESH_BUSY_INTERVAL_SECONDS", "60"))
+
+
+def get_price_refresh_idle_interval_seconds() -> int:
+    """Returns how often prices are refreshed while nobody requests them."""
+    return int(os.getenv("PRICE_REFRESH_IDLE_INTERVAL_SECONDS", "600"))
+
+
+def get_price_refresh_closed_interval_seconds() -> int:
+    """Returns how often prices are refreshed while the markets are closed."""
+    return int(os.getenv("PRICE_REFRESH_CLOSED_INTERVAL_SECONDS", "3600"))
+
+
+def get_price_refresh_busy_requests_per_minute() -> float:
+    """Returns the request rate from which prices are refreshed at the busy interval."""
+    return float(os.getenv("PRICE_REFRESH_BUSY_REQUESTS_PER_MINUTE", "30"))
+
+
+def get_price_on_demand_refresh_age_seconds() -> int:
+    """Returns the age from which a request for prices refreshes them first."""
+    return int(os.getenv("PRICE_ON_DEMAND_REFRESH_AGE_SECONDS", "300"))
+
+
+def get_price_market_hours() -> str:
+    """
+    Returns the weekly trading hours of the precious metals markets in UTC.
+
+    The default follows the spot market, open from Sunday evening until Friday
+    evening, New York time.
+    """
+    return os.getenv(
+        "PRICE_MARKET_HOURS", "sun 22:00-24:00, mon-thu 00:00-24:00, fri 00:00-21:00"
+    )
+
+
+def get_price_market_holidays() -> list[date]:
+    """Returns the dates on which the markets are closed all day."""
+    holidays = os.getenv("PRICE_MARKET_HOLIDAYS", "")
+
+    return [
+        date.fromisoformat(day.strip()) for day in holidays.split(",") if day.strip()
+    ]
+
+
+def get_database_url() -> str:
+    """
+    Returns the configured database URL with an async driver.
+
+    URLs without an explicit driver (e.g. ``sqlite:///db/database.db``) are mapped to
+    their async counterpart so existing configurations keep working.
+    """
+    url = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///db/database.db")
+    scheme, separator, rest = url.partition("://")
+
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+def get_template_cache_dir() -> str | None:
+    """
+    Returns the directory compiled templates are cached in, or None if disabled.
+
+    The cache survives restarts, so only the first process after a template change
+    has to compile it.
+    """
+    return os.getenv("TEMPLATE_CACHE_DIR", ".cache/templates") or None
+
+
+def get_compression_minimum_size() -> int:
+    """Returns the size in bytes below which complete responses are not compressed."""
+    return int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500"))
+
+
+def get_compression_gzip_level() -> int:
+    return int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+
+def get_compression_brotli_quality() -> int:
+    return int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+
+def get_database_pool_size() -> int:
+    """Returns how many connections each worker process keeps open."""
+    return int(os.getenv("DATABASE_POOL_SIZE", "5"))
+
+
+def get_database_max_overflow() -> int:
+    """Returns how many connections a worker may open beyond the pool size."""
+    return int(os.getenv("DATABASE_MAX_OVERFLOW", "5"))
+
+
+def get_sqlite_journal_mode() -> str:
+    return os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+
+
+def get_sqlite_synchronous() -> str:
+    return os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+
+def get_sqlite_mmap_size() -> int:
+    """Returns how many bytes of the database file are memory-mapped."""
+    return int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def get_sqlite_cache_size() -> int:
+    """Returns the page cache size; negative values are in KiB, positive in pages."""
+    return int(os.getenv("SQLITE_CACHE_SIZE", str(-64 * 1024)))
+
+
+def get_sqlite_busy_timeout_ms() -> int:
+    """Returns how long a connection waits for a lock before failing."""
+    return int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
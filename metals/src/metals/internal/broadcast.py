@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from metals.internal.metrics import BROADCAST_DROPPED_SUBSCRIBERS
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription[T]:
+    """Messages for a single subscriber, in the order they were broadcast."""
+
+    def __init__(self, max_queued: int):
+        # None marks the end of a dropped subscription
+        self._queue: asyncio.Queue[T | None] = asyncio.Queue(max_queued + 1)
+        self._max_queued = max_queued
+        self.dropped = False
+
+    def offer(self, message: T) -> bool:
+        """Queues a message without waiting; returns False if the queue is full."""
+        if self._queue.qsize() >= self._max_queued:
+            return False
+
+        self._queue.put_nowait(message)
+        return True
+
+    def drop(self) -> None:
+        """Ends the subscription, discarding the messages not received yet."""
+        self.dropped = True
+
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+        self._queue.put_nowait(None)
+
+    async def receive(self, timeout: float) -> T | None:
+        """
+        Waits for the next message.
+
+        Returns:
+            The next message, or None if the subscription was dropped.
+
+        Raises:
+            TimeoutError: If no message arrives within timeout seconds.
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+
+class Broadcaster[T]:
+    """
+    Fans messages out to any number of subscribers, e.g. streaming clients.
+
+    Every subscriber has a small queue of its own, so broadcasting never waits for
+    any of them. A subscriber whose queue is full has not received the previous
+    messages and is dropped, rather than letting messages pile up in memory.
+    """
+
+    def __init__(self, name: str, max_queued: int = 8):
+        """
+        Args:
+            name: Name of the broadcast, e.g. for metrics and logs
+            max_queued: Messages queued per subscriber before it is dropped
+        """
+        self._name = name
+        self._max_queued = max_queued
+        self._subscriptions: set[Subscription[T]] = set()
+        self._latest: T | None = None
+        self._closed = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def broadcast(self, message: T) -> None:
+        """Sends a message to every subscriber; must be called on the event loop."""
+        self._latest = message
+
+        for subscription in list(self._subscriptions):
+            if not subscription.offer(message):
+                self._subscriptions.discard(subscription)
+                subscription.drop()
+                BROADCAST_DROPPED_SUBSCRIBERS.inc(self._name)
+                logger.info(f"Dropped a {self._name} subscriber that fell behind")
+
+    def close(self) -> None:
+        """
+        Drops all subscribers, e.g. on shutdown, so that their receive returns None.
+        Subscriptions made afterwards are dropped right away.
+        """
+        self._closed = True
+
+        for subscription in self._subscriptions:
+            subscription.drop()
+
+        self._subscriptions.clear()
+
+    @contextmanager
+    def subscribe(self) -> Iterator[Subscription[T]]:
+        """Subscribes while the block runs, starting with the latest message."""
+        subscription = Subscription[T](self._max_queued)
+
+        if self._closed:
+            subscription.drop()
+        else:
+            if self._latest is not None:
+                subscription.offer(self._latest)
+
+            self._subscriptions.add(subscription)
+
+        try:
+            yield subscription
+        finally:
+            self._subscriptions.discard(subscription)
@@ -0,0 +1,82 @@
+import logging
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from metals.internal.persistency.db import session_factory
+from metals.internal.persistency.queries import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """
+    Elects a single leader among all processes sharing the database.
+
+    Leadership is a lease row in the database that has to be renewed before it
+    expires. If the leader dies without releasing it, another process takes over once
+    the lease has expired.
+    """
+
+    def __init__(self, name: str, ttl_seconds: int = 60):
+        """
+        Initialize leader lease.
+
+        Args:
+            name: Name of the role to elect a leader for
+            ttl_seconds: How long leadership lasts without renewal (default: 60)
+        """
+        self._name = name
+        self._ttl = timedelta(seconds=ttl_seconds)
+        self._holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._is_leader = False
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    @property
+    def ttl(self) -> timedelta:
+        return self._ttl
+
+    async def renew(self) -> bool:
+        """
+        Acquire or renew leadership. Should be called well within the lease TTL.
+
+        Returns:
+            True if this process is the leader now.
+        """
+        try:
+            async with session_factory() as session:
+                is_leader = await acquire_lease(
+                    session, self._name, self._holder, self._ttl
+                )
+        except Exception as e:
+            # Without a renewed lease it is unknown whether another process has
+            # already taken over, so leadership is given up.
+            logger.error(f"Failed to renew {self._name} lease: {e}")
+            is_leader = False
+
+        if is_leader != self._is_leader:
+            logger.info(
+                f"{self._holder} {'acquired' if is_leader else 'lost'} "
+                f"{self._name} leadership"
+            )
+
+        self._is_leader = is_leader
+
+        return is_leader
+
+    async def release(self) -> None:
+        """Give up leadership, so that another process can take over immediately."""
+        if not self._is_leader:
+            return
+
+        self._is_leader = False
+
+        try:
+            async with session_factory() as session:
+                await release_lease(session, self._name, self._holder)
+        except Exception as e:
+            logger.error(f"Failed to release {self._name} lease: {e}")
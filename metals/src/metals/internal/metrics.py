@@ -0,0 +1,427 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Connection, ExceptionContext, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# From 1 ms to 10 s, the range of latencies worth telling apart
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}"
+
+
+class _Metric(ABC):
+    @property
+    @abstractmethod
+    def type(self) -> str:
+        """Prometheus type of the metric, e.g. "counter"."""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {_escape(self.documentation)}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self._render_samples()
+
+    @abstractmethod
+    def _render_samples(self) -> Iterator[str]:
+        """Yields the sample lines of the metric, following its HELP and TYPE."""
+
+
+class _ValueMetric(_Metric):
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        function: Callable[[], float] | None = None,
+    ):
+        """
+        Args:
+            name: Name of the metric
+            documentation: Help text of the metric
+            labels: Names of the labels values are recorded with
+            function: Reads the value when rendering, instead of it being recorded;
+                for values kept elsewhere, without labels
+        """
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._function = function
+
+    def value(self, *labels: str) -> float:
+        if self._function is not None:
+            return self._function()
+
+        return self._values.get(labels, 0.0)
+
+    def _render_samples(self) -> Iterator[str]:
+        values = {(): self._function()} if self._function is not None else self._values
+
+        for labels, value in sorted(values.items()):
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}{label_text} {_format_value(value)}"
+
+
+class Counter(_ValueMetric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_ValueMetric):
+    type = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+@dataclass
+class _HistogramSeries:
+    bucket_counts: list[int]
+    count: int = 0
+    total: float = 0.0
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self._buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(
+                bucket_counts=[0] * len(self._buckets)
+            )
+
+        # Counts are kept per bucket and only accumulated when rendering, so an
+        # observation costs a single binary search
+        index = bisect_left(self._buckets, value)
+        if index < len(self._buckets):
+            series.bucket_counts[index] += 1
+
+        series.count += 1
+        series.total += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series.count if series is not None else 0
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observes the duration of the block in seconds."""
+        started_at = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, *labels)
+
+    def _render_samples(self) -> Iterator[str]:
+        label_names = (*self.label_names, "le")
+
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+
+            for bound, bucket_count in zip(
+                self._buckets, series.bucket_counts, strict=True
+            ):
+                cumulative += bucket_count
+                label_text = _format_labels(
+                    label_names, (*labels, _format_value(bound))
+                )
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+
+            label_text = _format_labels(label_names, (*labels, "+Inf"))
+            yield f"{self.name}_bucket{label_text} {series.count}"
+
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(series.total)}"
+            yield f"{self.name}_count{label_text} {series.count}"
+
+
+class Registry:
+    """
+    Collection of metrics, rendered in the Prometheus text format.
+
+    Metrics are kept per process; with several workers, each one is scraped on its
+    own or aggregated by the scraper.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register[MetricT: _Metric](self, metric: MetricT) -> MetricT:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "".join(
+            f"{line}\n" for metric in self._metrics.values() for line in metric.render()
+        )
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time from receiving a request until its response is sent completely",
+        labels=("method", "route", "status"),
+    )
+)
+REQUEST_DB_STATEMENTS = registry.register(
+    Histogram(
+        "http_request_db_statements",
+        "Database statements executed per request",
+        labels=("route",),
+        buckets=STATEMENT_BUCKETS,
+    )
+)
+REQUEST_DB_DURATION = registry.register(
+    Histogram(
+        "http_request_db_duration_seconds",
+        "Time spent executing database statements per request",
+        labels=("route",),
+    )
+)
+DB_STATEMENTS = registry.register(
+    Counter("db_statements_total", "Database statements executed in total")
+)
+TEMPLATE_RENDER_DURATION = registry.register(
+    Histogram(
+        "template_render_duration_seconds",
+        "Time spent rendering templates, excluding the time streamed parts wait",
+        labels=("template",),
+    )
+)
+PORTFOLIO_OVERVIEW_DURATION = registry.register(
+    Histogram(
+        "portfolio_overview_duration_seconds",
+        "Time spent valuing the holdings of a portfolio page",
+    )
+)
+UPSTREAM_REQUEST_DURATION = registry.register(
+    Histogram(
+        "upstream_request_duration_seconds",
+        "Duration of requests to the upstream price APIs",
+        labels=("upstream",),
+    )
+)
+UPSTREAM_REQUESTS = registry.register(
+    Counter(
+        "upstream_requests_total",
+        "Requests to the upstream price APIs, by outcome",
+        labels=("upstream", "outcome"),
+    )
+)
+UPSTREAM_CIRCUIT_OPEN = registry.register(
+    Gauge(
+        "upstream_circuit_open",
+        "Whether requests to an upstream price API are suspended after failures",
+        labels=("upstream",),
+    )
+)
+PRICE_REFRESHES = registry.register(
+    Counter(
+        "price_refreshes_total",
+        "Attempts to fetch and store new prices, by outcome",
+        labels=("outcome",),
+    )
+)
+PRICE_REFRESH_INTERVAL = registry.register(
+    Gauge(
+        "price_refresh_interval_seconds",
+        "Interval prices are currently refreshed at, following demand and market hours",
+    )
+)
+PRICE_ON_DEMAND_REFRESHES = registry.register(
+    Counter(
+        "price_on_demand_refreshes_total",
+        "Requests that found prices too old and waited for a refresh, by whether "
+        "they joined a refresh already running",
+        labels=("joined",),
+    )
+)
+BROADCAST_DROPPED_SUBSCRIBERS = registry.register(
+    Counter(
+        "broadcast_dropped_subscribers_total",
+        "Subscribers dropped for not keeping up with the broadcast messages",
+        labels=("broadcast",),
+    )
+)
+PRICE_LAST_REFRESH = registry.register(
+    Gauge(
+        "price_last_refresh_timestamp_seconds",
+        "Unix time the served prices were last confirmed by the upstream APIs",
+    )
+)
+
+
+@dataclass
+class RequestStats:
+    """Database work done while handling the current request."""
+
+    statements: int = 0
+    db_seconds: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Counts the statements of the engine and their duration, per request if one is
+    being handled.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_execute(connection: Connection, *_args: Any) -> None:
+        # A connection runs one statement at a time
+        connection.info["statement_started_at"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_execute(connection: Connection, *_args: Any) -> None:
+        _record_statement(connection)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context: ExceptionContext) -> None:
+        if context.connection is not None:
+            _record_statement(context.connection)
+
+
+def _record_statement(connection: Connection) -> None:
+    started_at = connection.info.pop("statement_started_at", None)
+
+    # Also called for errors raised outside of statements, e.g. while fetching
+    if started_at is None:
+        return
+
+    elapsed = time.perf_counter() - started_at
+    DB_STATEMENTS.inc()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+
+def _route_name(scope: Scope) -> str:
+    route = scope.get("route")
+
+    if route is not None:
+        return str(route.path)
+
+    # Mounted apps, e.g. the static files, are reported under their mount path;
+    # anything else is not worth its own label
+    if "endpoint" in scope:
+        return str(scope.get("root_path") or "/")
+
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every request per route, along with the database work
+    it caused.
+
+    Routes are labeled with their path template, e.g. /p/{_id}, so the number of
+    series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self._app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        started_at = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+            await send(message)
+
+        try:
+            await self._app(scope, receive, send_with_status)
+        finally:
+            _request_stats.reset(token)
+
+            route = _route_name(scope)
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started_at, scope["method"], route, str(status)
+            )
+            REQUEST_DB_STATEMENTS.observe(stats.statements, route)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, route)
@@ -1,17 +1,102 @@
-import os
-from collections.abc import Generator
+from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
-
-from metals.env import is_development_mode
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
-engine = create_engine(
-    os.getenv("DATABASE_URL", "sqlite:///db/database.db"), echo=is_development_mode()
+from metals.env import (
+    get_database_max_overflow,
+    get_database_pool_size,
+    get_database_url,
+    get_sqlite_busy_timeout_ms,
+    get_sqlite_cache_size,
+    get_sqlite_journal_mode,
+    get_sqlite_mmap_size,
+    get_sqlite_synchronous,
+    is_development_mode,
 )
+from metals.internal.metrics import instrument_engine
+
+
+def sqlite_pragmas(foreign_keys: bool = True) -> dict[str, str | int]:
+    """
+    Returns the pragmas set on every SQLite connection.
+
+    WAL lets readers proceed while the price refresher writes, and with it
+    synchronous=NORMAL is still safe against corruption; only the last transactions
+    may be lost on power failure.
+
+    Args:
+        foreign_keys: Whether to enforce foreign keys, which SQLite does not by default
+    """
+    return {
+        "journal_mode": get_sqlite_journal_mode(),
+        "synchronous": get_sqlite_synchronous(),
+        "mmap_size": get_sqlite_mmap_size(),
+        "cache_size": get_sqlite_cache_size(),
+        "busy_timeout": get_sqlite_busy_timeout_ms(),
+        "foreign_keys": "ON" if foreign_keys else "OFF",
+    }
+
+
+def apply_sqlite_pragmas(engine: AsyncEngine, foreign_keys: bool = True) -> None:
+    """Sets the pragmas on every new connection of the engine, if it uses SQLite."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = sqlite_pragmas(foreign_keys)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+
+        cursor.close()
+
+
+def _pool_options(url: str) -> dict[str, Any]:
+    parsed = make_url(url)
+
+    # In-memory SQLite databases live in a single shared connection
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        return {}
+
+    # Every worker process has its own pool, so these are per worker
+    return {
+        "pool_size": get_database_pool_size(),
+        "max_overflow": get_database_max_overflow(),
+    }
+
+
+def create_engine() -> AsyncEngine:
+    """Creates the application's engine from the environment."""
+    url = get_database_url()
+    engine = create_async_engine(url, echo=is_development_mode(), **_pool_options(url))
+    apply_sqlite_pragmas(engine)
+    instrument_engine(engine)
+
+    return engine
+
+
+engine = create_engine()
+
+# Objects are kept usable after commit, since lazy reloads are not possible in async
+# code without an explicit await.
+session_factory = async_sessionmaker(engine, expire_on_commit=False)
 
 
-def get_session() -> Generator[Session, None, None]:
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """FastAPI dependency to provide a database session for the request lifecycle."""
-    with Session(engine) as session:
+    async with session_factory() as session:
         yield session
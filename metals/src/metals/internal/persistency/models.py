@@ -7,6 +7,11 @@ from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from metals.internal.types import Metal
 
 
+def _utc_now() -> datetime:
+    # Passed as a callable so that every insert/update gets its own timestamp.
+    return datetime.now(UTC)
+
+
 class BaseModel(DeclarativeBase):
     pass
 
@@ -17,17 +22,67 @@ class MetalPrice(BaseModel):
     id: Mapped[uuid.UUID] = mapped_column(default=uuid.uuid4, primary_key=True)
     metal: Mapped[Metal]
     price: Mapped[float]
-    created_at: Mapped[datetime] = mapped_column(default=datetime.now(UTC))
-    updated_at: Mapped[datetime] = mapped_column(
-        default=datetime.now(UTC), onupdate=datetime.now(UTC)
-    )
+    created_at: Mapped[datetime] = mapped_column(default=_utc_now)
+    updated_at: Mapped[datetime] = mapped_column(default=_utc_now, onupdate=_utc_now)
 
     __table_args__ = (
-        # Composite index for efficiently finding latest price per metal
+        # Composite index for efficient per-metal history lookups
         Index("ix_metal_prices_metal_created_at", "metal", "created_at"),
+        # Compaction walks the oldest ticks of all metals
+        Index("ix_metal_prices_created_at", "created_at"),
     )
 
 
+class LatestMetalPrice(BaseModel):
+    """Current price per metal, kept in sync with the metal_prices history."""
+
+    __tablename__ = "latest_metal_prices"
+
+    metal: Mapped[Metal] = mapped_column(primary_key=True)
+    price: Mapped[float]
+    # The price was converted from USD with this rate, which is used again while the
+    # exchange rate cannot be fetched
+    usd_to_eur_rate: Mapped[float | None]
+    created_at: Mapped[datetime] = mapped_column(default=_utc_now)
+    updated_at: Mapped[datetime] = mapped_column(default=_utc_now, onupdate=_utc_now)
+
+
+class MetalPriceBucket(BaseModel):
+    """OHLC aggregate of all price ticks of one metal within a time bucket."""
+
+    __abstract__ = True
+
+    metal: Mapped[Metal] = mapped_column(primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(primary_key=True)
+    open: Mapped[float]
+    high: Mapped[float]
+    low: Mapped[float]
+    close: Mapped[float]
+    tick_count: Mapped[int]
+    created_at: Mapped[datetime] = mapped_column(default=_utc_now)
+    updated_at: Mapped[datetime] = mapped_column(default=_utc_now, onupdate=_utc_now)
+
+
+class HourlyMetalPrice(MetalPriceBucket):
+    __tablename__ = "metal_prices_hourly"
+
+
+class DailyMetalPrice(MetalPriceBucket):
+    __tablename__ = "metal_prices_daily"
+
+
+class Lease(BaseModel):
+    """Time-limited claim on a named role, held by at most one process at a time."""
+
+    __tablename__ = "leases"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    holder: Mapped[str]
+    expires_at: Mapped[datetime]
+    created_at: Mapped[datetime] = mapped_column(default=_utc_now)
+    updated_at: Mapped[datetime] = mapped_column(default=_utc_now, onupdate=_utc_now)
+
+
 class Holding(BaseModel):
     __tablename__ = "holdings"
 
@@ -36,25 +91,28 @@ class Holding(BaseModel):
     metal: Mapped[Metal]
     quantity: Mapped[float]
     purchase_price: Mapped[float]
-    created_at: Mapped[datetime] = mapped_column(default=datetime.now(UTC))
-    updated_at: Mapped[datetime] = mapped_column(
-        default=datetime.now(UTC), onupdate=datetime.now(UTC)
-    )
+    created_at: Mapped[datetime] = mapped_column(default=_utc_now)
+    updated_at: Mapped[datetime] = mapped_column(default=_utc_now, onupdate=_utc_now)
 
     portfolio_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("portfolios.id", ondelete="CASCADE")
     )
     portfolio: Mapped[Portfolio] = relationship(back_populates="holdings")
 
+    __table_args__ = (
+        # Serves the holdings of a portfolio in page order, and the foreign key
+        Index(
+            "ix_holdings_portfolio_id_created_at_id", "portfolio_id", "created_at", "id"
+        ),
+    )
+
 
 class Portfolio(BaseModel):
     __tablename__ = "portfolios"
 
     id: Mapped[uuid.UUID] = mapped_column(default=uuid.uuid4, primary_key=True)
-    created_at: Mapped[datetime] = mapped_column(default=datetime.now(UTC))
-    updated_at: Mapped[datetime] = mapped_column(
-        default=datetime.now(UTC), onupdate=datetime.now(UTC)
-    )
+    created_at: Mapped[datetime] = mapped_column(default=_utc_now)
+    updated_at: Mapped[datetime] = mapped_column(default=_utc_now, onupdate=_utc_now)
 
     holdings: Mapped[list[Holding]] = relationship(
         back_populates="portfolio", cascade="all, delete-orphan"
@@ -1,85 +1,545 @@
 import uuid
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Any, cast
 
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import (
+    CursorResult,
+    Insert,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from metals.internal.persistency.models import Holding, MetalPrice, Portfolio
-from metals.internal.types import Metal
+from metals.internal.persistency.models import (
+    BaseModel,
+    DailyMetalPrice,
+    Holding,
+    HourlyMetalPrice,
+    LatestMetalPrice,
+    Lease,
+    MetalPrice,
+    Portfolio,
+)
+from metals.internal.price_history import (
+    BucketT,
+    apply_ticks_to_buckets,
+    bucket_keys,
+    day_bucket_start,
+    hour_bucket_start,
+)
+from metals.internal.types import (
+    HoldingCursor,
+    HoldingFields,
+    Metal,
+    MetalHoldingTotals,
+)
 
 
-def insert_portfolio(session: Session, portfolio: Portfolio) -> Portfolio:
+async def insert_portfolio(session: AsyncSession, portfolio: Portfolio) -> Portfolio:
+    # All columns get client-side defaults, so nothing has to be reloaded after the
+    # insert
     session.add(portfolio)
-    session.commit()
-    session.refresh(portfolio)
+    await session.commit()
 
     return portfolio
 
 
-def get_portfolio(session: Session, portfolio_id: uuid.UUID) -> Portfolio | None:
-    return session.scalars(
-        select(Portfolio)
-        .where(Portfolio.id == portfolio_id)
-        .options(selectinload(Portfolio.holdings))
-    ).first()
+async def get_portfolio(
+    session: AsyncSession, portfolio_id: uuid.UUID
+) -> Portfolio | None:
+    result = await session.scalars(
+        select(Portfolio).where(Portfolio.id == portfolio_id)
+    )
 
+    return result.first()
 
-def update_portfolio(session: Session, portfolio: Portfolio) -> Portfolio:
-    session.commit()
-    session.refresh(portfolio)
 
-    return portfolio
+async def get_holdings_page(
+    session: AsyncSession,
+    portfolio_id: uuid.UUID,
+    after: HoldingCursor | None = None,
+    limit: int | None = None,
+) -> list[Holding]:
+    """
+    Loads the holdings of a portfolio in creation order, one page at a time.
+
+    Args:
+        session: Database session
+        portfolio_id: Portfolio to load the holdings of
+        after: Position of the last holding of the previous page, if any
+        limit: Maximum number of holdings to load, all remaining ones if None
+
+    Returns:
+        Holdings following the cursor, ordered by created_at and id
+    """
+    stmt = (
+        select(Holding)
+        .where(Holding.portfolio_id == portfolio_id)
+        .order_by(Holding.created_at, Holding.id)
+        .limit(limit)
+    )
+
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(Holding.created_at, Holding.id) > (after.created_at, after.id)
+        )
+
+    result = await session.scalars(stmt)
+
+    return list(result)
+
+
+async def iter_holding_batches(
+    session: AsyncSession,
+    portfolio_id: uuid.UUID,
+    batch_size: int,
+    after: HoldingCursor | None = None,
+) -> AsyncIterator[list[Holding]]:
+    """
+    Loads the holdings of a portfolio in creation order, one batch per query, so
+    that only a single batch is held in memory at a time.
+
+    Args:
+        session: Database session
+        portfolio_id: Portfolio to load the holdings of
+        batch_size: Maximum number of holdings to load per query
+        after: Position of the holding to start after, if any
+
+    Yields:
+        Batches of holdings, none of them empty
+    """
+    while True:
+        holdings = await get_holdings_page(
+            session, portfolio_id, after=after, limit=batch_size
+        )
 
+        if holdings:
+            yield holdings
 
-def get_holding(
-    session: Session, portfolio_id: uuid.UUID, holding_id: uuid.UUID
+        if len(holdings) < batch_size:
+            return
+
+        after = HoldingCursor(created_at=holdings[-1].created_at, id=holdings[-1].id)
+
+
+async def get_portfolio_metal_totals(
+    session: AsyncSession, portfolio_id: uuid.UUID
+) -> list[MetalHoldingTotals]:
+    """Sums up the holdings of a portfolio per metal, without loading them."""
+    result = await session.execute(
+        select(
+            Holding.metal,
+            func.count(),
+            func.sum(Holding.quantity),
+            func.sum(Holding.quantity * Holding.purchase_price),
+        )
+        .where(Holding.portfolio_id == portfolio_id)
+        .group_by(Holding.metal)
+    )
+
+    return [
+        MetalHoldingTotals(
+            metal=metal,
+            holding_count=holding_count,
+            quantity=quantity,
+            purchase_cost=purchase_cost,
+        )
+        for metal, holding_count, quantity, purchase_cost in result
+    ]
+
+
+async def get_holding(
+    session: AsyncSession, portfolio_id: uuid.UUID, holding_id: uuid.UUID
 ) -> Holding | None:
-    return session.scalars(
+    result = await session.scalars(
         select(Holding).where(
             (Holding.id == holding_id) & (Holding.portfolio_id == portfolio_id)
         )
-    ).first()
+    )
+
+    return result.first()
 
 
-def update_holding(session: Session, holding: Holding) -> Holding:
-    session.commit()
-    session.refresh(holding)
+async def _touch_portfolio(
+    session: AsyncSession, portfolio_id: uuid.UUID, timestamp: datetime
+) -> bool:
+    """
+    Marks a portfolio as modified, e.g. because one of its holdings changed.
+
+    Returns:
+        False if the portfolio does not exist.
+    """
+    result = await session.execute(
+        update(Portfolio)
+        .where(Portfolio.id == portfolio_id)
+        .values(updated_at=timestamp)
+        .returning(Portfolio.id)
+    )
+
+    return result.first() is not None
+
+
+async def insert_holding(
+    session: AsyncSession, portfolio_id: uuid.UUID, fields: HoldingFields
+) -> Holding | None:
+    """
+    Adds a holding to a portfolio.
+
+    Returns:
+        The added holding, or None if the portfolio does not exist.
+    """
+    timestamp = datetime.now(UTC)
+
+    # Touching the portfolio first doubles as the existence check
+    if not await _touch_portfolio(session, portfolio_id, timestamp):
+        return None
+
+    holding = Holding(
+        description=fields.description,
+        metal=fields.metal,
+        quantity=fields.quantity,
+        purchase_price=fields.purchase_price,
+        portfolio_id=portfolio_id,
+        created_at=timestamp,
+        updated_at=timestamp,
+    )
+    session.add(holding)
+    await session.commit()
+
+    return holding
+
+
+async def update_holding(
+    session: AsyncSession,
+    portfolio_id: uuid.UUID,
+    holding_id: uuid.UUID,
+    fields: HoldingFields,
+) -> Holding | None:
+    """
+    Overwrites the fields of a holding with a single UPDATE ... RETURNING.
+
+    Returns:
+        The updated holding, or None if the portfolio has no such holding.
+    """
+    timestamp = datetime.now(UTC)
+
+    result = await session.scalars(
+        update(Holding)
+        .where((Holding.id == holding_id) & (Holding.portfolio_id == portfolio_id))
+        .values(
+            description=fields.description,
+            metal=fields.metal,
+            quantity=fields.quantity,
+            purchase_price=fields.purchase_price,
+            updated_at=timestamp,
+        )
+        .returning(Holding)
+    )
+    holding = result.first()
+
+    if holding is None:
+        return None
+
+    await _touch_portfolio(session, portfolio_id, timestamp)
+    await session.commit()
 
     return holding
 
 
-def delete_holding(session: Session, holding: Holding) -> None:
-    session.delete(holding)
-    session.commit()
+async def delete_holding(
+    session: AsyncSession, portfolio_id: uuid.UUID, holding_id: uuid.UUID
+) -> bool:
+    """
+    Deletes a holding with a single DELETE ... RETURNING.
+
+    Returns:
+        False if the portfolio has no such holding.
+    """
+    result = await session.execute(
+        delete(Holding)
+        .where((Holding.id == holding_id) & (Holding.portfolio_id == portfolio_id))
+        .returning(Holding.id)
+    )
+
+    if result.first() is None:
+        return False
+
+    await _touch_portfolio(session, portfolio_id, datetime.now(UTC))
+    await session.commit()
+
+    return True
+
+
+async def import_holdings(
+    session: AsyncSession,
+    portfolio_id: uuid.UUID,
+    batches: AsyncIterable[Sequence[HoldingFields]],
+) -> int:
+    """
+    Adds many holdings to a portfolio with one multi-row insert per batch, all in a
+    single transaction.
 
+    Holdings are stamped with consecutive creation times, so that they keep the order
+    of the batches on the portfolio page.
 
-def insert_metal_prices_batch(
-    session: Session, prices: dict[Metal, float]
+    Args:
+        session: Database session
+        portfolio_id: Portfolio to add the holdings to
+        batches: Holdings to add, e.g. parsed from a file while it is being read
+
+    Returns:
+        Number of added holdings; nothing is stored if the batches raise.
+    """
+    timestamp = datetime.now(UTC)
+    count = 0
+
+    async for batch in batches:
+        await session.execute(
+            insert(Holding),
+            [
+                {
+                    "description": holding.description,
+                    "metal": holding.metal,
+                    "quantity": holding.quantity,
+                    "purchase_price": holding.purchase_price,
+                    "portfolio_id": portfolio_id,
+                    "created_at": timestamp + timedelta(microseconds=count + row),
+                    "updated_at": timestamp,
+                }
+                for row, holding in enumerate(batch)
+            ],
+        )
+        count += len(batch)
+
+    if count:
+        await _touch_portfolio(session, portfolio_id, timestamp)
+
+    await session.commit()
+
+    return count
+
+
+def _dialect_insert(
+    session: AsyncSession, entity: type[BaseModel]
+) -> postgresql.Insert | sqlite.Insert:
+    """Returns a dialect specific insert, which supports ON CONFLICT clauses."""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(entity)
+
+    return sqlite.insert(entity)
+
+
+def _upsert_latest_metal_prices(
+    session: AsyncSession,
+    prices: dict[Metal, float],
+    usd_to_eur_rate: float,
+    timestamp: datetime,
+) -> Insert:
+    stmt = _dialect_insert(session, LatestMetalPrice).values(
+        [
+            {
+                "metal": metal,
+                "price": price,
+                "usd_to_eur_rate": usd_to_eur_rate,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+            }
+            for metal, price in prices.items()
+        ]
+    )
+
+    return stmt.on_conflict_do_update(
+        index_elements=[LatestMetalPrice.metal],
+        set_={
+            "price": stmt.excluded.price,
+            "usd_to_eur_rate": stmt.excluded.usd_to_eur_rate,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+async def insert_metal_prices_batch(
+    session: AsyncSession, prices: dict[Metal, float], usd_to_eur_rate: float
 ) -> list[MetalPrice]:
+    """
+    Stores a price tick in the history and updates the current prices, both in the
+    same transaction.
+
+    Prices that did not change since the previous tick are not added to the history
+    again; their current price is only marked as confirmed by the new timestamp.
+    The rate the prices were converted to EUR with is stored with the current ones.
+    """
+    # One timestamp per tick, so all metals fetched together share it.
+    timestamp = datetime.now(UTC)
+
+    current_prices = await get_latest_metal_prices(session)
+
     metal_prices = [
-        MetalPrice(metal=metal, price=price) for metal, price in prices.items()
+        MetalPrice(metal=metal, price=price, created_at=timestamp, updated_at=timestamp)
+        for metal, price in prices.items()
+        if current_prices.get(metal) != price
     ]
     session.add_all(metal_prices)
-    session.commit()
+
+    if prices:
+        await session.execute(
+            _upsert_latest_metal_prices(session, prices, usd_to_eur_rate, timestamp)
+        )
+
+    await session.commit()
 
     return metal_prices
 
 
-def get_latest_metal_prices(session: Session) -> dict[Metal, float]:
-    subq = (
-        select(
-            MetalPrice.metal,
-            func.max(MetalPrice.created_at).label("max_created_at"),
-        )
-        .group_by(MetalPrice.metal)
-        .subquery()
+async def get_latest_metal_prices(session: AsyncSession) -> dict[Metal, float]:
+    results = (await session.scalars(select(LatestMetalPrice))).all()
+
+    return {result.metal: result.price for result in results}
+
+
+async def get_prices_refreshed_at(session: AsyncSession) -> datetime | None:
+    """Returns when the current prices were last confirmed by the upstream APIs."""
+    refreshed_at = await session.scalar(select(func.max(LatestMetalPrice.updated_at)))
+
+    # SQLite returns naive timestamps, which are stored in UTC
+    return refreshed_at.replace(tzinfo=UTC) if refreshed_at is not None else None
+
+
+async def get_last_usd_to_eur_rate(session: AsyncSession) -> float | None:
+    """Returns the rate the current prices were converted to EUR with, if stored."""
+    return await session.scalar(
+        select(LatestMetalPrice.usd_to_eur_rate)
+        .where(LatestMetalPrice.usd_to_eur_rate.is_not(None))
+        .order_by(LatestMetalPrice.updated_at.desc())
+        .limit(1)
     )
 
-    stmt = select(MetalPrice).join(
-        subq,
-        (MetalPrice.metal == subq.c.metal)
-        & (MetalPrice.created_at == subq.c.max_created_at),
+
+async def _fold_ticks_into_buckets(
+    session: AsyncSession,
+    model: type[BucketT],
+    ticks: list[MetalPrice],
+    bucket_start: Callable[[datetime], datetime],
+) -> None:
+    keys = bucket_keys(ticks, bucket_start)
+
+    existing = await session.scalars(
+        select(model).where(tuple_(model.metal, model.bucket_start).in_(keys))
     )
+    buckets = {(bucket.metal, bucket.bucket_start): bucket for bucket in existing}
 
-    results = session.scalars(stmt).all()
+    session.add_all(apply_ticks_to_buckets(model, buckets, ticks, bucket_start))
 
-    return {result.metal: result.price for result in results}
+
+async def compact_metal_prices_batch(
+    session: AsyncSession, cutoff: datetime, batch_size: int
+) -> int:
+    """
+    Rolls the oldest raw price ticks before the cutoff into the hourly and daily
+    buckets and deletes them, all in one short transaction.
+
+    Args:
+        session: Database session
+        cutoff: Only ticks created before this timestamp are compacted
+        batch_size: Maximum number of ticks to compact in this batch
+
+    Returns:
+        Number of compacted ticks; 0 once nothing is left to compact.
+    """
+    ticks = list(
+        (
+            await session.scalars(
+                select(MetalPrice)
+                .where(MetalPrice.created_at < cutoff)
+                .order_by(MetalPrice.created_at)
+                .limit(batch_size)
+            )
+        ).all()
+    )
+
+    if not ticks:
+        return 0
+
+    await _fold_ticks_into_buckets(session, HourlyMetalPrice, ticks, hour_bucket_start)
+    await _fold_ticks_into_buckets(session, DailyMetalPrice, ticks, day_bucket_start)
+
+    await session.execute(
+        delete(MetalPrice)
+        .where(MetalPrice.id.in_([tick.id for tick in ticks]))
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+
+    return len(ticks)
+
+
+async def acquire_lease(
+    session: AsyncSession, name: str, holder: str, ttl: timedelta
+) -> bool:
+    """
+    Acquires or renews a lease, unless it is currently held by someone else.
+
+    Args:
+        session: Database session
+        name: Name of the lease
+        holder: Identifier of the process trying to hold the lease
+        ttl: How long the lease is valid unless renewed
+
+    Returns:
+        True if the holder owns the lease now.
+    """
+    now = datetime.now(UTC)
+
+    result = cast(
+        CursorResult[Any],
+        await session.execute(
+            update(Lease)
+            .where(
+                (Lease.name == name)
+                & or_(Lease.holder == holder, Lease.expires_at < now)
+            )
+            .values(holder=holder, expires_at=now + ttl, updated_at=now)
+        ),
+    )
+    acquired = result.rowcount == 1
+
+    if not acquired:
+        # The lease may not exist yet; if another process creates it concurrently,
+        # the conflict leaves its row untouched.
+        result = cast(
+            CursorResult[Any],
+            await session.execute(
+                _dialect_insert(session, Lease)
+                .values(
+                    name=name,
+                    holder=holder,
+                    expires_at=now + ttl,
+                    created_at=now,
+                    updated_at=now,
+                )
+                .on_conflict_do_nothing(index_elements=[Lease.name])
+            ),
+        )
+        acquired = result.rowcount == 1
+
+    await session.commit()
+
+    return acquired
+
+
+async def release_lease(session: AsyncSession, name: str, holder: str) -> None:
+    now = datetime.now(UTC)
+
+    await session.execute(
+        update(Lease)
+        .where((Lease.name == name) & (Lease.holder == holder))
+        .values(expires_at=now, updated_at=now)
+    )
+    await session.commit()
@@ -1,49 +1,259 @@
+from array import array
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass
+
 from metals.internal.persistency.models import Holding, Portfolio
-from metals.internal.types import HoldingOverview, Metal, PortfolioOverview
-
-
-def _calculate_holding_overview(
-    holding: Holding, current_price: float
-) -> HoldingOverview:
-    purchase_cost = holding.quantity * holding.purchase_price
-    current_value = holding.quantity * current_price
-    absolute_gain = current_value - purchase_cost
-    gain_percent = (absolute_gain / purchase_cost * 100) if purchase_cost > 0 else 0.0
-
-    return HoldingOverview(
-        id=holding.id,
-        description=holding.description,
-        metal=holding.metal,
-        quantity=holding.quantity,
-        purchase_price=holding.purchase_price,
-        purchase_cost=purchase_cost,
-        current_value=current_value,
-        gain_percent=gain_percent,
-        absolute_gain=absolute_gain,
+from metals.internal.types import (
+    HoldingOverview,
+    Metal,
+    MetalAllocation,
+    MetalHoldingTotals,
+    PortfolioOverview,
+    PortfolioTotals,
+)
+
+# PyTypeChecker incorrectly thinks that list(Metal) returns a list of str
+# noinspection PyTypeChecker
+_METALS: list[Metal] = list(Metal)
+_METAL_CODES: dict[Metal, int] = {metal: code for code, metal in enumerate(_METALS)}
+
+
+@dataclass(frozen=True)
+class HoldingColumns:
+    """
+    Holdings of one or more portfolios, stored column-wise.
+
+    Row i of every column describes the same holding; portfolio_indexes maps it to
+    the portfolio it belongs to.
+    """
+
+    quantities: array[float]
+    purchase_prices: array[float]
+    metal_codes: array[int]
+    portfolio_indexes: array[int]
+
+    @classmethod
+    def from_portfolios(cls, portfolios: Sequence[Sequence[Holding]]) -> HoldingColumns:
+        quantities = array("d")
+        purchase_prices = array("d")
+        metal_codes = array("B")
+        portfolio_indexes = array("L")
+
+        for portfolio_index, holdings in enumerate(portfolios):
+            for holding in holdings:
+                quantities.append(holding.quantity)
+                purchase_prices.append(holding.purchase_price)
+                metal_codes.append(_METAL_CODES[holding.metal])
+                portfolio_indexes.append(portfolio_index)
+
+        return cls(quantities, purchase_prices, metal_codes, portfolio_indexes)
+
+
+@dataclass(frozen=True)
+class Valuation:
+    """Per-holding and per-portfolio figures computed from HoldingColumns."""
+
+    purchase_costs: array[float]
+    current_values: array[float]
+    total_purchase_costs: array[float]
+    total_current_values: array[float]
+
+    def holding_overview(self, holding: Holding, row: int) -> HoldingOverview:
+        purchase_cost = self.purchase_costs[row]
+        current_value = self.current_values[row]
+        absolute_gain = current_value - purchase_cost
+
+        return HoldingOverview(
+            id=holding.id,
+            description=holding.description,
+            metal=holding.metal,
+            quantity=holding.quantity,
+            purchase_price=holding.purchase_price,
+            purchase_cost=purchase_cost,
+            current_value=current_value,
+            gain_percent=_gain_percent(absolute_gain, purchase_cost),
+            absolute_gain=absolute_gain,
+        )
+
+    def portfolio_totals(self, portfolio_index: int = 0) -> PortfolioTotals:
+        return calculate_totals(
+            self.total_purchase_costs[portfolio_index],
+            self.total_current_values[portfolio_index],
+        )
+
+
+def _gain_percent(absolute_gain: float, purchase_cost: float) -> float:
+    return (absolute_gain / purchase_cost * 100) if purchase_cost > 0 else 0.0
+
+
+def calculate_totals(
+    total_purchase_cost: float, total_current_value: float
+) -> PortfolioTotals:
+    total_absolute_gain = total_current_value - total_purchase_cost
+
+    return PortfolioTotals(
+        total_purchase_cost=total_purchase_cost,
+        total_current_value=total_current_value,
+        total_gain_percent=_gain_percent(total_absolute_gain, total_purchase_cost),
+        total_absolute_gain=total_absolute_gain,
+    )
+
+
+def value_holdings(
+    columns: HoldingColumns,
+    current_prices: Mapping[Metal, float],
+    portfolio_count: int = 1,
+) -> Valuation:
+    """
+    Values all holdings and sums them up per portfolio in a single pass.
+
+    Args:
+        columns: Holdings to value
+        current_prices: Current price per ounce for each metal
+        portfolio_count: Number of portfolios the holdings belong to
+
+    Returns:
+        Purchase cost and current value per holding and per portfolio.
+
+    Raises:
+        KeyError: If a holding's metal has no current price.
+    """
+    for code in set(columns.metal_codes):
+        if _METALS[code] not in current_prices:
+            raise KeyError(_METALS[code])
+
+    price_by_code = [current_prices.get(metal, 0.0) for metal in _METALS]
+
+    row_count = len(columns.quantities)
+    purchase_costs = array("d", bytes(8 * row_count))
+    current_values = array("d", bytes(8 * row_count))
+    total_purchase_costs = array("d", bytes(8 * portfolio_count))
+    total_current_values = array("d", bytes(8 * portfolio_count))
+
+    for row, (quantity, purchase_price, metal_code, portfolio_index) in enumerate(
+        zip(
+            columns.quantities,
+            columns.purchase_prices,
+            columns.metal_codes,
+            columns.portfolio_indexes,
+            strict=True,
+        )
+    ):
+        purchase_cost = quantity * purchase_price
+        current_value = quantity * price_by_code[metal_code]
+
+        purchase_costs[row] = purchase_cost
+        current_values[row] = current_value
+        total_purchase_costs[portfolio_index] += purchase_cost
+        total_current_values[portfolio_index] += current_value
+
+    return Valuation(
+        purchase_costs, current_values, total_purchase_costs, total_current_values
     )
 
 
+def calculate_metal_allocations(
+    metal_totals: Sequence[MetalHoldingTotals], current_prices: Mapping[Metal, float]
+) -> list[MetalAllocation]:
+    """
+    Values the per-metal totals of a portfolio.
+
+    Raises:
+        KeyError: If a metal held in the portfolio has no current price.
+    """
+    current_values = [
+        totals.quantity * current_prices[totals.metal] for totals in metal_totals
+    ]
+    total_current_value = sum(current_values)
+
+    allocations = []
+
+    for totals, current_value in zip(metal_totals, current_values, strict=True):
+        absolute_gain = current_value - totals.purchase_cost
+
+        allocations.append(
+            MetalAllocation(
+                metal=totals.metal,
+                quantity=totals.quantity,
+                purchase_cost=totals.purchase_cost,
+                current_value=current_value,
+                gain_percent=_gain_percent(absolute_gain, totals.purchase_cost),
+                absolute_gain=absolute_gain,
+                share_percent=(
+                    current_value / total_current_value * 100
+                    if total_current_value > 0
+                    else 0.0
+                ),
+            )
+        )
+
+    return allocations
+
+
 def calculate_portfolio_overview(
-    portfolio: Portfolio, current_prices: dict[Metal, float]
+    holdings: Sequence[Holding],
+    metal_totals: Sequence[MetalHoldingTotals],
+    current_prices: Mapping[Metal, float],
 ) -> PortfolioOverview:
-    holdings = [
-        _calculate_holding_overview(holding, current_prices[holding.metal])
-        for holding in portfolio.holdings
-    ]
+    """
+    Builds the overview of a portfolio.
 
-    total_purchase_cost = sum(h.purchase_cost for h in holdings)
-    total_current_value = sum(h.current_value for h in holdings)
-    total_absolute_gain = total_current_value - total_purchase_cost
-    total_gain_percent = (
-        (total_absolute_gain / total_purchase_cost * 100)
-        if total_purchase_cost > 0
-        else 0.0
+    Args:
+        holdings: Holdings to build overviews for, i.e. the rendered rows
+        metal_totals: Per-metal totals of all holdings of the portfolio
+        current_prices: Current price per ounce for each metal
+    """
+    valuation = value_holdings(
+        HoldingColumns.from_portfolios([holdings]), current_prices
+    )
+    allocations = calculate_metal_allocations(metal_totals, current_prices)
+
+    totals = calculate_totals(
+        sum(allocation.purchase_cost for allocation in allocations),
+        sum(allocation.current_value for allocation in allocations),
     )
 
     return PortfolioOverview(
-        holdings=holdings,
-        total_purchase_cost=total_purchase_cost,
-        total_current_value=total_current_value,
-        total_gain_percent=total_gain_percent,
-        total_absolute_gain=total_absolute_gain,
+        holding_count=sum(totals.holding_count for totals in metal_totals),
+        holdings=[
+            valuation.holding_overview(holding, row)
+            for row, holding in enumerate(holdings)
+        ],
+        allocations=allocations,
+        **totals.model_dump(),
+    )
+
+
+def iter_holding_overviews(
+    holdings: Sequence[Holding],
+    current_prices: Mapping[Metal, float],
+    chunk_size: int = 500,
+) -> Iterator[HoldingOverview]:
+    """
+    Lazily builds holding overviews, valuing the holdings one chunk at a time.
+
+    Used when streaming a page, so rows can be sent before all of them are valued.
+    """
+    for start in range(0, len(holdings), chunk_size):
+        chunk = holdings[start : start + chunk_size]
+        valuation = value_holdings(
+            HoldingColumns.from_portfolios([chunk]), current_prices
+        )
+
+        for row, holding in enumerate(chunk):
+            yield valuation.holding_overview(holding, row)
+
+
+def calculate_portfolios_totals(
+    portfolios: Sequence[Portfolio], current_prices: Mapping[Metal, float]
+) -> list[PortfolioTotals]:
+    """Values many portfolios at once, returning their totals in the same order."""
+    valuation = value_holdings(
+        HoldingColumns.from_portfolios(
+            [portfolio.holdings for portfolio in portfolios]
+        ),
+        current_prices,
+        portfolio_count=len(portfolios),
     )
+
+    return [valuation.portfolio_totals(index) for index in range(len(portfolios))]
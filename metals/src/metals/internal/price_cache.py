@@ -1,78 +1,459 @@
 import asyncio
+import hashlib
 import logging
-from datetime import timedelta
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime, timedelta
+from types import MappingProxyType
 
-from sqlalchemy.orm import Session
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from metals.internal.persistency.db import engine
-from metals.internal.persistency.queries import insert_metal_prices_batch
+from metals.env import (
+    get_price_history_retention_days,
+    get_price_on_demand_refresh_age_seconds,
+)
+from metals.internal.broadcast import Broadcaster
+from metals.internal.leadership import LeaderLease
+from metals.internal.metrics import (
+    PRICE_LAST_REFRESH,
+    PRICE_ON_DEMAND_REFRESHES,
+    PRICE_REFRESH_INTERVAL,
+    PRICE_REFRESHES,
+)
+from metals.internal.persistency.db import session_factory
+from metals.internal.persistency.queries import (
+    compact_metal_prices_batch,
+    get_last_usd_to_eur_rate,
+    get_latest_metal_prices,
+    get_prices_refreshed_at,
+    insert_metal_prices_batch,
+)
 from metals.internal.prices import get_all_metal_prices_in_eur
+from metals.internal.refresh_schedule import (
+    MarketCalendar,
+    RefreshSchedule,
+    RequestRate,
+    get_refresh_schedule,
+)
+from metals.internal.types import Metal
 
 logger = logging.getLogger(__name__)
 
+# Pause between compaction batches, so that other writers get the write lock in
+# between.
+_COMPACTION_BATCH_PAUSE_SECONDS = 0.05
+
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    """Immutable view of the latest known prices, replaced as a whole on refresh."""
+
+    version: int
+    prices: Mapping[Metal, float]
+    published_at: datetime
+    # Derived from the prices alone, so unlike the version it is the same in every
+    # process that published the same prices.
+    fingerprint: str
+    # When the upstream APIs last confirmed the prices; moves on without a new
+    # snapshot while the prices stay the same.
+    refreshed_at: datetime
+
+    def is_stale(self, max_age: timedelta) -> bool:
+        """Whether the prices were not confirmed within max_age."""
+        return datetime.now(UTC) - self.refreshed_at > max_age
+
+
+def _fingerprint(prices: Mapping[Metal, float]) -> str:
+    canonical = sorted((metal.value, price) for metal, price in prices.items())
+    return hashlib.sha256(repr(canonical).encode()).hexdigest()[:16]
+
+
+async def _get_stored_usd_to_eur_rate() -> float | None:
+    # Read from the database rather than kept in memory, so that any process taking
+    # over the refresh converts with the rate its predecessor stored
+    async with session_factory() as session:
+        return await get_last_usd_to_eur_rate(session)
+
 
 class PriceRefresher:
     """
     Background task that periodically fetches prices and stores them in the
-    database.
+    database, and compacts old price history into hourly and daily buckets.
+
+    Prices are refreshed more often while they are requested a lot and less often
+    while nobody requests them or the markets are closed, see RefreshSchedule. A
+    request finding the prices too old refreshes them first.
+
+    When several processes share the database, only the elected leader talks to the
+    upstream APIs and writes prices. All other processes pick up the prices the
+    leader stored, and take over if the leader goes away. The leader schedules
+    refreshes by the requests it handles itself.
     """
 
-    def __init__(self, refresh_interval_seconds: int = 300):
+    def __init__(
+        self,
+        schedule: RefreshSchedule | None = None,
+        raw_price_retention_days: int = 7,
+        compaction_interval_seconds: int = 3600,
+        compaction_batch_size: int = 500,
+        lease_ttl_seconds: int = 60,
+        failed_refresh_retry_seconds: int = 60,
+        on_demand_refresh_age_seconds: int = 300,
+        on_demand_wait_seconds: float = 2.0,
+    ):
         """
         Initialize price refresher.
 
         Args:
-            refresh_interval_seconds: How often to refresh prices
-                (default: 300 = 5 minutes)
+            schedule: When to refresh prices (default: every 5 minutes while
+                requested, every 10 minutes while not, markets always open)
+            raw_price_retention_days: How long raw price ticks are kept before they
+                are compacted (default: 7 days)
+            compaction_interval_seconds: How often to compact the price history
+                (default: 3600 = 1 hour)
+            compaction_batch_size: Maximum number of raw price ticks compacted per
+                transaction (default: 500)
+            lease_ttl_seconds: How long refresher leadership lasts without renewal
+                (default: 60)
+            failed_refresh_retry_seconds: How soon to refresh again after a refresh
+                failed, if sooner than the refresh interval (default: 60)
+            on_demand_refresh_age_seconds: Age from which a request for prices
+                refreshes them first, while the markets are open (default: 300)
+            on_demand_wait_seconds: How long a request waits for such a refresh
+                before it is served the prices it found (default: 2)
         """
-        self._refresh_interval = timedelta(seconds=refresh_interval_seconds)
+        self._schedule = schedule or RefreshSchedule(MarketCalendar())
+        self._raw_price_retention = timedelta(days=raw_price_retention_days)
+        self._compaction_interval = timedelta(seconds=compaction_interval_seconds)
+        self._compaction_batch_size = compaction_batch_size
+        self._failed_refresh_retry = timedelta(seconds=failed_refresh_retry_seconds)
+        self._on_demand_refresh_age = timedelta(seconds=on_demand_refresh_age_seconds)
+        self._on_demand_wait = on_demand_wait_seconds
+        self._request_rate = RequestRate()
+        self._http_client: httpx.AsyncClient | None = None
+        # The refresh running, if any, which concurrent refreshes join
+        self._refresh_task: asyncio.Task[bool] | None = None
+        # Monotonic time the last refresh finished at, None to refresh right away
+        self._last_refresh_at: float | None = None
+        self._last_refresh_failed = False
         self._background_task: asyncio.Task[None] | None = None
+        self._compaction_task: asyncio.Task[None] | None = None
+        self._leader_lease = LeaderLease("price_refresher", lease_ttl_seconds)
+        self._snapshot: PriceSnapshot | None = None
+        self._broadcaster = Broadcaster[PriceSnapshot]("prices")
+
+    @property
+    def snapshot(self) -> PriceSnapshot | None:
+        """The most recently published prices, or None before the first publish."""
+        return self._snapshot
+
+    @property
+    def broadcaster(self) -> Broadcaster[PriceSnapshot]:
+        """Broadcasts every published or confirmed snapshot, e.g. to price streams."""
+        return self._broadcaster
+
+    @property
+    def refreshed_at(self) -> datetime | None:
+        """
+        When the current prices were last confirmed by the upstream APIs, by this
+        process or by the leader, or None before the first publish.
+        """
+        return self._snapshot.refreshed_at if self._snapshot is not None else None
+
+    def publish(
+        self, prices: Mapping[Metal, float], refreshed_at: datetime | None = None
+    ) -> PriceSnapshot:
+        """
+        Publish new prices as the current snapshot.
+
+        The snapshot is swapped in a single assignment, so readers always see either
+        the previous or the new prices, never a mix of both.
+
+        Args:
+            prices: Prices to publish
+            refreshed_at: When the prices were confirmed by the upstream APIs, if
+                not just now, e.g. when they were stored earlier
+        """
+        version = self._snapshot.version + 1 if self._snapshot is not None else 1
+        published_at = datetime.now(UTC)
+
+        self._snapshot = PriceSnapshot(
+            version=version,
+            prices=MappingProxyType(dict(prices)),
+            published_at=published_at,
+            fingerprint=_fingerprint(prices),
+            refreshed_at=refreshed_at or published_at,
+        )
+        PRICE_LAST_REFRESH.set(self._snapshot.refreshed_at.timestamp())
+        self._broadcaster.broadcast(self._snapshot)
+
+        return self._snapshot
+
+    def _confirm(self, refreshed_at: datetime) -> None:
+        """Marks the current prices as confirmed again, without publishing them."""
+        snapshot = self._snapshot
+
+        if snapshot is not None and refreshed_at > snapshot.refreshed_at:
+            self._snapshot = replace(snapshot, refreshed_at=refreshed_at)
+            PRICE_LAST_REFRESH.set(refreshed_at.timestamp())
+            self._broadcaster.broadcast(self._snapshot)
+
+    async def get_snapshot(self, session: AsyncSession) -> PriceSnapshot | None:
+        """
+        Get the current snapshot, loading it from the database on cold start.
+
+        Args:
+            session: Database session used only if nothing was published yet
+
+        Returns:
+            The current snapshot, or None if no prices are known at all.
+        """
+        if self._snapshot is None:
+            prices = await get_latest_metal_prices(session)
+
+            if prices:
+                self.publish(prices, await get_prices_refreshed_at(session))
+
+        return self._snapshot
+
+    async def on_request(self) -> None:
+        """
+        Records a request for prices, refreshing them first if they are too old.
+
+        Concurrent requests share a single refresh, and wait for it only so long
+        before they are served the prices they found. Only the leader refreshes, and
+        only while the markets are open, as prices barely move otherwise.
+        """
+        self._request_rate.record()
+
+        snapshot = self._snapshot
+        http_client = self._http_client
+        age = self._on_demand_refresh_age.total_seconds()
+
+        if (
+            http_client is None
+            or snapshot is None
+            or not self._leader_lease.is_leader
+            or not snapshot.is_stale(self._on_demand_refresh_age)
+            # A failed refresh is not repeated on every request
+            or (
+                self._last_refresh_at is not None
+                and time.monotonic() - self._last_refresh_at < age
+            )
+            or not self._schedule.calendar.is_open(datetime.now(UTC))
+        ):
+            return
+
+        PRICE_ON_DEMAND_REFRESHES.inc(str(self._refresh_task is not None).lower())
 
-    async def _fetch_and_store_prices(self) -> None:
-        """Fetch prices from external APIs and store them in the database."""
         try:
-            prices = await get_all_metal_prices_in_eur()
+            await asyncio.wait_for(self._refresh(http_client), self._on_demand_wait)
+        except TimeoutError:
+            logger.warning(
+                f"Prices are not refreshed within {self._on_demand_wait} s, serving "
+                f"the prices of {snapshot.refreshed_at}"
+            )
+
+    async def _refresh(self, http_client: httpx.AsyncClient) -> bool:
+        """
+        Refreshes prices, joining the refresh already running if there is one.
+
+        Returns:
+            Whether the prices were refreshed.
+        """
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._run_refresh(http_client))
+
+        # Shielded, so that a waiter giving up does not cancel it for everyone
+        return await asyncio.shield(self._refresh_task)
+
+    async def _run_refresh(self, http_client: httpx.AsyncClient) -> bool:
+        try:
+            refreshed = await self._fetch_and_store_prices(http_client)
+        finally:
+            self._refresh_task = None
+
+        self._last_refresh_at = time.monotonic()
+        self._last_refresh_failed = not refreshed
+
+        return refreshed
+
+    def _next_refresh_interval(self) -> timedelta:
+        interval = self._schedule.next_interval(
+            self._request_rate.per_minute(), datetime.now(UTC)
+        )
+
+        if self._last_refresh_failed:
+            interval = min(interval, self._failed_refresh_retry)
+
+        PRICE_REFRESH_INTERVAL.set(interval.total_seconds())
+
+        return interval
+
+    async def _fetch_and_store_prices(self, http_client: httpx.AsyncClient) -> bool:
+        """
+        Fetch prices from external APIs and store them in the database.
+
+        On failure, the previous prices stay published and keep being served.
+
+        Returns:
+            Whether the prices were refreshed.
+        """
+        try:
+            prices = await get_all_metal_prices_in_eur(
+                http_client, _get_stored_usd_to_eur_rate
+            )
 
             # Store all prices in a single transaction for better performance
-            with Session(engine) as session:
-                insert_metal_prices_batch(session, prices)
+            async with session_factory() as session:
+                await insert_metal_prices_batch(
+                    session, prices.prices, prices.usd_to_eur_rate
+                )
+
+            self.publish(prices.prices)
+            PRICE_REFRESHES.inc("success")
             logger.info("Prices updated successfully and stored in database")
+            return True
         except Exception as e:
-            logger.error(f"Failed to fetch and store prices: {e}")
+            PRICE_REFRESHES.inc("failure")
+            logger.error(f"Failed to fetch and store prices: {e!r}")
+            return False
+
+    async def _load_prices_from_database(self) -> None:
+        """Publish the prices stored by the leader, if they changed."""
+        try:
+            async with session_factory() as session:
+                prices = await get_latest_metal_prices(session)
+                refreshed_at = await get_prices_refreshed_at(session)
+
+            if prices and (
+                self._snapshot is None or prices != dict(self._snapshot.prices)
+            ):
+                self.publish(prices, refreshed_at)
+            elif refreshed_at is not None:
+                # The leader confirms unchanged prices as well
+                self._confirm(refreshed_at)
+        except Exception as e:
+            logger.error(f"Failed to load prices from database: {e}")
+
+    async def _refresh_loop(self, http_client: httpx.AsyncClient) -> None:
+        """Background task that refreshes prices as often as the schedule says."""
+        logger.info(f"Starting price refresh loop (schedule: {self._schedule})")
+
+        # Renew well before the lease expires, so a slow renewal does not cost
+        # leadership. Waking up that often also picks up changes of the schedule,
+        # e.g. when the markets open.
+        renewal_interval = self._leader_lease.ttl.total_seconds() / 3
 
-    async def _refresh_loop(self) -> None:
-        """Background task that periodically refreshes prices."""
-        logger.info(f"Starting price refresh loop (interval: {self._refresh_interval})")
+        while True:
+            if await self._leader_lease.renew():
+                interval = self._next_refresh_interval().total_seconds()
+
+                if (
+                    self._last_refresh_at is None
+                    or time.monotonic() - self._last_refresh_at >= interval
+                ):
+                    await self._refresh(http_client)
+                    interval = self._next_refresh_interval().total_seconds()
+
+                assert self._last_refresh_at is not None
+                due_in = self._last_refresh_at + interval - time.monotonic()
+                delay = min(renewal_interval, max(due_in, 0))
+            else:
+                await self._load_prices_from_database()
+                # Refresh right away once leadership is taken over.
+                self._last_refresh_at = None
+                delay = renewal_interval
+
+            await asyncio.sleep(delay)
+
+    async def _compact_price_history(self) -> None:
+        """Roll raw price ticks older than the retention window into buckets."""
+        try:
+            cutoff = datetime.now(UTC) - self._raw_price_retention
+            compacted = 0
+
+            # Compact in small batches, each in its own short transaction, so the
+            # write lock is never held for long.
+            while True:
+                async with session_factory() as session:
+                    count = await compact_metal_prices_batch(
+                        session, cutoff, self._compaction_batch_size
+                    )
+
+                compacted += count
+
+                if count < self._compaction_batch_size:
+                    break
+
+                await asyncio.sleep(_COMPACTION_BATCH_PAUSE_SECONDS)
+
+            if compacted:
+                logger.info(f"Compacted {compacted} price ticks older than {cutoff}")
+        except Exception as e:
+            logger.error(f"Failed to compact price history: {e}")
 
-        # Initial fetch
-        await self._fetch_and_store_prices()
+    async def _compaction_loop(self) -> None:
+        """Background task that periodically compacts the price history."""
+        logger.info(
+            f"Starting price history compaction loop "
+            f"(interval: {self._compaction_interval}, "
+            f"retention: {self._raw_price_retention})"
+        )
 
-        # Periodic refresh
         while True:
-            await asyncio.sleep(self._refresh_interval.total_seconds())
-            await self._fetch_and_store_prices()
+            await asyncio.sleep(self._compaction_interval.total_seconds())
+
+            if self._leader_lease.is_leader:
+                await self._compact_price_history()
+
+    def start_background_refresh(self, http_client: httpx.AsyncClient) -> None:
+        """
+        Start the background refresh and compaction tasks.
 
-    def start_background_refresh(self) -> None:
-        """Start the background refresh task."""
+        Args:
+            http_client: Client for upstream price requests, owned by the caller and
+                expected to stay open until the tasks are stopped
+        """
         if self._background_task is None:
+            self._http_client = http_client
+
             try:
-                self._background_task = asyncio.create_task(self._refresh_loop())
+                self._background_task = asyncio.create_task(
+                    self._refresh_loop(http_client)
+                )
+                self._compaction_task = asyncio.create_task(self._compaction_loop())
                 logger.info("Background price refresh task started")
             except Exception as e:
                 logger.error(f"Failed to start background refresh task: {e}")
                 raise
 
     async def stop_background_refresh(self) -> None:
-        """Stop the background refresh task."""
+        """Stop the background refresh and compaction tasks."""
         if self._background_task is not None:
-            self._background_task.cancel()
+            self._http_client = None
 
-            try:
-                await self._background_task
-            except asyncio.CancelledError:
-                pass
+            for task in (
+                self._background_task,
+                self._compaction_task,
+                self._refresh_task,
+            ):
+                if task is None:
+                    continue
+
+                task.cancel()
+
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
 
             self._background_task = None
+            self._compaction_task = None
+
+            await self._leader_lease.release()
 
             logger.info("Background price refresh task stopped")
 
@@ -92,6 +473,10 @@ def get_price_refresher() -> PriceRefresher:
     global _price_refresher
 
     if _price_refresher is None:
-        _price_refresher = PriceRefresher()
+        _price_refresher = PriceRefresher(
+            schedule=get_refresh_schedule(),
+            raw_price_retention_days=get_price_history_retention_days(),
+            on_demand_refresh_age_seconds=get_price_on_demand_refresh_age_seconds(),
+        )
 
     return _price_refresher
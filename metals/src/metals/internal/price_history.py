@@ -0,0 +1,72 @@
+from collections.abc import Callable, Iterable
+from datetime import datetime
+from typing import TypeVar
+
+from metals.internal.persistency.models import MetalPrice, MetalPriceBucket
+from metals.internal.types import Metal
+
+BucketT = TypeVar("BucketT", bound=MetalPriceBucket)
+
+BucketKey = tuple[Metal, datetime]
+
+
+def hour_bucket_start(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket_start(timestamp: datetime) -> datetime:
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_keys(
+    ticks: Iterable[MetalPrice], bucket_start: Callable[[datetime], datetime]
+) -> set[BucketKey]:
+    return {(tick.metal, bucket_start(tick.created_at)) for tick in ticks}
+
+
+def apply_ticks_to_buckets(
+    model: type[BucketT],
+    buckets: dict[BucketKey, BucketT],
+    ticks: Iterable[MetalPrice],
+    bucket_start: Callable[[datetime], datetime],
+) -> list[BucketT]:
+    """
+    Folds price ticks into OHLC buckets.
+
+    Ticks must be passed in chronological order, and must be newer than any tick
+    already folded into the given buckets. Existing buckets are updated in place.
+
+    Args:
+        model: Bucket model to create new buckets with
+        buckets: Existing buckets by metal and bucket start, updated in place
+        ticks: Chronologically ordered price ticks
+        bucket_start: Maps a tick timestamp to the start of its bucket
+
+    Returns:
+        Buckets that did not exist before and still need to be added to the session.
+    """
+    new_buckets: list[BucketT] = []
+
+    for tick in ticks:
+        key = (tick.metal, bucket_start(tick.created_at))
+        bucket = buckets.get(key)
+
+        if bucket is None:
+            bucket = model(
+                metal=tick.metal,
+                bucket_start=key[1],
+                open=tick.price,
+                high=tick.price,
+                low=tick.price,
+                close=tick.price,
+                tick_count=1,
+            )
+            buckets[key] = bucket
+            new_buckets.append(bucket)
+        else:
+            bucket.high = max(bucket.high, tick.price)
+            bucket.low = min(bucket.low, tick.price)
+            bucket.close = tick.price
+            bucket.tick_count += 1
+
+    return new_buckets
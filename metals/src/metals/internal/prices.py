@@ -1,10 +1,23 @@
 import asyncio
+import logging
+import random
+import time
 import typing
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
 
 import httpx
 
+from metals.internal.metrics import (
+    UPSTREAM_CIRCUIT_OPEN,
+    UPSTREAM_REQUEST_DURATION,
+    UPSTREAM_REQUESTS,
+)
 from metals.internal.types import Metal
 
+logger = logging.getLogger(__name__)
+
 Symbol = typing.Literal["XAU", "XAG"]
 
 GOLD_API_BASE_URL = "https://api.gold-api.com/"
@@ -12,46 +25,256 @@ FRANKFURTER_API_BASE_URL = "https://api.frankfurter.app/"
 
 METAL_TO_SYMBOL: dict[Metal, Symbol] = {Metal.GOLD: "XAU", Metal.SILVER: "XAG"}
 
+# Attempts per request within one refresh, and the bounds of the jittered backoff
+# between them
+_RETRY_ATTEMPTS = 3
+_RETRY_BASE_DELAY_SECONDS = 0.5
+_RETRY_MAX_DELAY_SECONDS = 4.0
 
-async def _get_metal_price_in_usd(metal: Metal) -> float:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{GOLD_API_BASE_URL}price/{METAL_TO_SYMBOL[metal]}",
-            timeout=10.0,
-        )
 
-        response.raise_for_status()
+class CircuitOpenError(Exception):
+    """Raised instead of requesting an upstream whose circuit is open."""
 
-        data = response.json()
 
-        return float(data["price"])
+class CircuitBreaker:
+    """
+    Stops requesting an upstream after repeated failures, so that an upstream which
+    is down or hangs does not cost a timeout on every attempt.
 
+    Every request counts once, as a failure if it still failed after its retries.
+    After failure_threshold failures without a success in between the circuit opens
+    and requests fail right away for reset_timeout_seconds. Afterwards a single
+    request is let through as a probe: its success closes the circuit, its failure
+    opens it for another reset_timeout_seconds. A probe which never reports back,
+    e.g. as it was cancelled, is replaced by the next one after the same timeout.
+    """
 
-async def _get_usd_to_eur_rate() -> float:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{FRANKFURTER_API_BASE_URL}latest?from=USD&to=EUR",
-            timeout=10.0,
-        )
+    def __init__(
+        self,
+        upstream: str,
+        failure_threshold: int = 5,
+        reset_timeout_seconds: float = 60.0,
+    ):
+        self._upstream = upstream
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout_seconds
+        self._failures = 0
+        # When the circuit opened or the last probe was let through, None if closed
+        self._opened_at: float | None = None
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent, letting a probe through if it is time."""
+        if self._opened_at is None:
+            return True
+
+        now = time.monotonic()
+
+        if now - self._opened_at < self._reset_timeout:
+            return False
+
+        # Requests after the probe are rejected until it reports back or times out
+        self._opened_at = now
+        return True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info(f"Circuit of {self._upstream} closed")
+
+        self._failures = 0
+        self._opened_at = None
+        UPSTREAM_CIRCUIT_OPEN.set(0, self._upstream)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+
+        if self._opened_at is not None:
+            # The probe failed, the upstream gets another timeout to recover
+            self._opened_at = time.monotonic()
+        elif self._failures >= self._failure_threshold:
+            logger.warning(
+                f"Circuit of {self._upstream} opened after {self._failures} "
+                f"failed requests"
+            )
+            self._opened_at = time.monotonic()
+            UPSTREAM_CIRCUIT_OPEN.set(1, self._upstream)
+
+
+UPSTREAMS = ("gold-api", "frankfurter")
+
+_circuit_breakers = {upstream: CircuitBreaker(upstream) for upstream in UPSTREAMS}
+
+
+@dataclass(frozen=True)
+class MetalPricesInEur:
+    """Metal prices converted to EUR, along with the rate they were converted with."""
+
+    prices: dict[Metal, float]
+    usd_to_eur_rate: float
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Creates the HTTP client used for all upstream price requests.
+
+    The client is meant to live as long as the application, so connections (and
+    their TLS sessions) are reused across refreshes instead of being set up anew for
+    every request.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(10.0),
+        limits=httpx.Limits(
+            max_connections=10,
+            max_keepalive_connections=4,
+            # Slightly longer than the default refresh interval, so connections
+            # survive from one refresh to the next unless the server closes them.
+            keepalive_expiry=330.0,
+        ),
+    )
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed request may succeed when it is repeated."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+
+    return isinstance(error, httpx.TransportError)
+
+
+def _retry_delay(attempt: int) -> float:
+    # Full jitter, so that retries of concurrent requests do not arrive together
+    return random.uniform(
+        0, min(_RETRY_MAX_DELAY_SECONDS, _RETRY_BASE_DELAY_SECONDS * 2**attempt)
+    )
 
-        response.raise_for_status()
 
+async def _get_json(client: httpx.AsyncClient, upstream: str, url: str) -> Any:
+    """
+    Requests a JSON document, retrying transient failures with exponential backoff.
+
+    The request counts towards the circuit of the upstream once, after its retries.
+
+    Raises:
+        CircuitOpenError: If the circuit of the upstream is open.
+    """
+    circuit_breaker = _circuit_breakers[upstream]
+
+    if not circuit_breaker.allow_request():
+        UPSTREAM_REQUESTS.inc(upstream, "rejected")
+        raise CircuitOpenError(f"Circuit of {upstream} is open")
+
+    attempt = 0
+
+    while True:
+        try:
+            data = await _request_json(client, upstream, url)
+        except Exception as e:
+            if not _is_transient(e):
+                # The upstream answered, so it is up even though the request failed
+                circuit_breaker.record_success()
+                raise
+
+            attempt += 1
+
+            if attempt >= _RETRY_ATTEMPTS:
+                circuit_breaker.record_failure()
+                raise
+
+            delay = _retry_delay(attempt)
+            logger.warning(
+                f"Request to {upstream} failed ({e!r}), retrying in {delay:.2f} s"
+            )
+            await asyncio.sleep(delay)
+            continue
+
+        circuit_breaker.record_success()
+
+        return data
+
+
+async def _request_json(client: httpx.AsyncClient, upstream: str, url: str) -> Any:
+    """Requests a JSON document, recording the duration and outcome per upstream."""
+    started_at = time.perf_counter()
+
+    try:
+        response = await client.get(url)
+        response.raise_for_status()
         data = response.json()
+    except Exception:
+        UPSTREAM_REQUESTS.inc(upstream, "failure")
+        raise
+    finally:
+        UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - started_at, upstream)
 
-        return float(data["rates"]["EUR"])
+    UPSTREAM_REQUESTS.inc(upstream, "success")
 
+    return data
 
-async def get_all_metal_prices_in_eur() -> dict[Metal, float]:
-    usd_to_eur = await _get_usd_to_eur_rate()
 
+async def _get_metal_price_in_usd(client: httpx.AsyncClient, metal: Metal) -> float:
+    data = await _get_json(
+        client, "gold-api", f"{GOLD_API_BASE_URL}price/{METAL_TO_SYMBOL[metal]}"
+    )
+
+    return float(data["price"])
+
+
+async def _get_usd_to_eur_rate(client: httpx.AsyncClient) -> float:
+    data = await _get_json(
+        client, "frankfurter", f"{FRANKFURTER_API_BASE_URL}latest?from=USD&to=EUR"
+    )
+
+    return float(data["rates"]["EUR"])
+
+
+async def get_all_metal_prices_in_eur(
+    client: httpx.AsyncClient,
+    get_last_usd_to_eur_rate: Callable[[], Awaitable[float | None]] | None = None,
+) -> MetalPricesInEur:
+    """
+    Fetches the current price of every metal, converted to EUR.
+
+    Args:
+        client: HTTP client for the upstream requests
+        get_last_usd_to_eur_rate: Looks up the last known rate, e.g. the one stored
+            with the current prices; only called if the rate cannot be fetched, so
+            that the metal prices are converted with it instead of being discarded
+    """
     # PyTypeChecker incorrectly thinks that list(Metal) returns a list of str
     # noinspection PyTypeChecker
     metals: list[Metal] = list(Metal)
 
-    coroutines = [_get_metal_price_in_usd(metal) for metal in metals]
+    # The exchange rate and all metal prices are requested in a single fan-out.
+    usd_to_eur, *results = await asyncio.gather(
+        _get_usd_to_eur_rate(client),
+        *(_get_metal_price_in_usd(client, metal) for metal in metals),
+        return_exceptions=True,
+    )
 
-    results = await asyncio.gather(*coroutines)
+    prices_in_usd: dict[Metal, float] = {}
+
+    for metal, result in zip(metals, results, strict=True):
+        if isinstance(result, BaseException):
+            raise result
+
+        prices_in_usd[metal] = result
+
+    if isinstance(usd_to_eur, BaseException):
+        last_usd_to_eur = (
+            await get_last_usd_to_eur_rate() if get_last_usd_to_eur_rate else None
+        )
+
+        if last_usd_to_eur is None:
+            raise usd_to_eur
+
+        logger.warning(
+            f"Failed to fetch the USD to EUR rate ({usd_to_eur!r}), converting with "
+            f"the last known rate {last_usd_to_eur}"
+        )
+        usd_to_eur = last_usd_to_eur
 
-    return {
-        metal: price * usd_to_eur for price, metal in zip(results, metals, strict=True)
-    }
+    return MetalPricesInEur(
+        prices={metal: price * usd_to_eur for metal, price in prices_in_usd.items()},
+        usd_to_eur_rate=usd_to_eur,
+    )
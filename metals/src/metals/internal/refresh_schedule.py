@@ -0,0 +1,216 @@
+import re
+import time
+from collections import deque
+from collections.abc import Collection, Mapping, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import cache
+
+from metals.env import (
+    get_price_market_holidays,
+    get_price_market_hours,
+    get_price_refresh_busy_interval_seconds,
+    get_price_refresh_busy_requests_per_minute,
+    get_price_refresh_closed_interval_seconds,
+    get_price_refresh_idle_interval_seconds,
+    get_price_refresh_interval_seconds,
+)
+
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+_HOURS_PATTERN = re.compile(
+    r"(?P<first>[a-z]{3})(?:-(?P<last>[a-z]{3}))?\s+"
+    r"(?P<opens>\d{2}:\d{2})-(?P<closes>\d{2}:\d{2})"
+)
+
+_MINUTES_PER_DAY = 24 * 60
+
+
+def _minute_of_day(value: str) -> int:
+    hours, minutes = (int(part) for part in value.split(":"))
+
+    if hours > 24 or minutes > 59 or hours * 60 + minutes > _MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time of day {value!r}")
+
+    return hours * 60 + minutes
+
+
+def _weekday(value: str) -> int:
+    try:
+        return _WEEKDAYS.index(value)
+    except ValueError:
+        raise ValueError(
+            f"Invalid weekday {value!r}, expected one of {_WEEKDAYS}"
+        ) from None
+
+
+class MarketCalendar:
+    """
+    Weekly trading hours in UTC, along with holidays on which the markets stay
+    closed all day.
+
+    Outside of trading hours prices barely move, so they are refreshed rarely.
+    """
+
+    def __init__(
+        self,
+        hours: Mapping[int, Sequence[tuple[int, int]]] | None = None,
+        holidays: Collection[date] = (),
+    ):
+        """
+        Args:
+            hours: Trading hours per weekday (0 is Monday), as pairs of the minutes
+                of the day the markets open and close at; None if always open
+            holidays: Dates on which the markets are closed
+        """
+        self._hours = hours
+        self._holidays = frozenset(holidays)
+
+    @classmethod
+    def parse(cls, hours: str, holidays: Collection[date] = ()) -> MarketCalendar:
+        """
+        Parses trading hours such as "sun 22:00-24:00, mon-thu 00:00-24:00".
+
+        Args:
+            hours: Comma separated weekdays or ranges of weekdays, each followed by
+                the time range the markets are open in UTC; empty if always open
+            holidays: Dates on which the markets are closed
+
+        Raises:
+            ValueError: If the trading hours are malformed.
+        """
+        if not hours.strip():
+            return cls(holidays=holidays)
+
+        parsed: dict[int, list[tuple[int, int]]] = {}
+
+        for entry in hours.lower().split(","):
+            match = _HOURS_PATTERN.fullmatch(entry.strip())
+
+            if match is None:
+                raise ValueError(
+                    f"Invalid trading hours {entry.strip()!r}, expected e.g. "
+                    f"'mon-fri 08:00-17:00'"
+                )
+
+            first = _weekday(match["first"])
+            last = _weekday(match["last"]) if match["last"] else first
+            opens = _minute_of_day(match["opens"])
+            closes = _minute_of_day(match["closes"])
+
+            if opens >= closes:
+                raise ValueError(f"Trading hours {entry.strip()!r} close before open")
+
+            for weekday in range(first, last + 1):
+                parsed.setdefault(weekday, []).append((opens, closes))
+
+        return cls(parsed, holidays)
+
+    def is_open(self, at: datetime) -> bool:
+        """Whether the markets are open at the given time, which is in UTC."""
+        if at.date() in self._holidays:
+            return False
+
+        if self._hours is None:
+            return True
+
+        minute = at.hour * 60 + at.minute
+
+        return any(
+            opens <= minute < closes
+            for opens, closes in self._hours.get(at.weekday(), ())
+        )
+
+
+class RequestRate:
+    """
+    Requests per minute over a sliding window.
+
+    Requests are counted in buckets of a few seconds, so that memory stays the same
+    however many requests arrive.
+    """
+
+    def __init__(self, window_seconds: float = 300.0, bucket_seconds: float = 10.0):
+        self._window = window_seconds
+        self._bucket_size = bucket_seconds
+        # Pairs of bucket number and request count, oldest first
+        self._buckets: deque[list[int]] = deque()
+
+    def record(self, now: float | None = None) -> None:
+        bucket = int((time.monotonic() if now is None else now) // self._bucket_size)
+
+        if self._buckets and self._buckets[-1][0] == bucket:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([bucket, 1])
+            self._expire(bucket)
+
+    def per_minute(self, now: float | None = None) -> float:
+        self._expire(
+            int((time.monotonic() if now is None else now) // self._bucket_size)
+        )
+
+        return sum(count for _, count in self._buckets) * 60 / self._window
+
+    def _expire(self, current_bucket: int) -> None:
+        oldest = current_bucket - int(self._window // self._bucket_size)
+
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._buckets.popleft()
+
+
+@dataclass(frozen=True)
+class RefreshSchedule:
+    """
+    Decides how long prices are kept before they are refreshed again, from the
+    market hours and the rate at which pages showing prices are requested.
+    """
+
+    calendar: MarketCalendar
+    # While the markets are open and prices are requested now and then
+    interval: timedelta = timedelta(minutes=5)
+    # While prices are requested at least busy_requests_per_minute times
+    busy_interval: timedelta = timedelta(minutes=1)
+    # While no prices are requested at all
+    idle_interval: timedelta = timedelta(minutes=10)
+    # While the markets are closed, however often prices are requested
+    closed_interval: timedelta = timedelta(hours=1)
+    busy_requests_per_minute: float = 30.0
+
+    def next_interval(self, requests_per_minute: float, at: datetime) -> timedelta:
+        if not self.calendar.is_open(at):
+            return self.closed_interval
+
+        if requests_per_minute >= self.busy_requests_per_minute:
+            return self.busy_interval
+
+        if requests_per_minute == 0:
+            return self.idle_interval
+
+        return self.interval
+
+    def max_price_age(self, threshold: timedelta, at: datetime) -> timedelta:
+        """
+        Age after which prices count as stale: the threshold, extended by the closed
+        interval while the markets are closed, as prices are refreshed that rarely on
+        purpose then.
+        """
+        if self.calendar.is_open(at):
+            return threshold
+
+        return threshold + self.closed_interval
+
+
+@cache
+def get_refresh_schedule() -> RefreshSchedule:
+    """Returns the refresh schedule configured through the environment."""
+    return RefreshSchedule(
+        calendar=MarketCalendar.parse(
+            get_price_market_hours(), get_price_market_holidays()
+        ),
+        interval=timedelta(seconds=get_price_refresh_interval_seconds()),
+        busy_interval=timedelta(seconds=get_price_refresh_busy_interval_seconds()),
+        idle_interval=timedelta(seconds=get_price_refresh_idle_interval_seconds()),
+        closed_interval=timedelta(seconds=get_price_refresh_closed_interval_seconds()),
+        busy_requests_per_minute=get_price_refresh_busy_requests_per_minute(),
+    )
@@ -1,5 +1,8 @@
+import base64
 import uuid
+from datetime import datetime
 from enum import Enum
+from typing import Protocol
 
 from pydantic import BaseModel
 
@@ -9,6 +12,15 @@ class Metal(str, Enum):
     GOLD = "Gold"
 
 
+class HoldingFields(Protocol):
+    """Fields of a holding entered by the user, e.g. through a form or an import."""
+
+    description: str
+    metal: Metal
+    quantity: float
+    purchase_price: float
+
+
 class HoldingOverview(BaseModel):
     id: uuid.UUID
     description: str
@@ -21,9 +33,46 @@ class HoldingOverview(BaseModel):
     absolute_gain: float
 
 
-class PortfolioOverview(BaseModel):
-    holdings: list[HoldingOverview]
+class HoldingCursor(BaseModel):
+    """Position of a holding within its portfolio, ordered by creation."""
+
+    created_at: datetime
+    id: uuid.UUID
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.model_dump_json().encode()).decode()
+
+    @classmethod
+    def decode(cls, value: str) -> HoldingCursor:
+        """Raises a ValueError if the value is not a cursor returned by encode."""
+        return cls.model_validate_json(base64.urlsafe_b64decode(value))
+
+
+class MetalHoldingTotals(BaseModel):
+    metal: Metal
+    holding_count: int
+    quantity: float
+    purchase_cost: float
+
+
+class MetalAllocation(BaseModel):
+    metal: str
+    quantity: float
+    purchase_cost: float
+    current_value: float
+    gain_percent: float
+    absolute_gain: float
+    share_percent: float
+
+
+class PortfolioTotals(BaseModel):
     total_purchase_cost: float
     total_current_value: float
     total_gain_percent: float
     total_absolute_gain: float
+
+
+class PortfolioOverview(PortfolioTotals):
+    holding_count: int
+    holdings: list[HoldingOverview]
+    allocations: list[MetalAllocation]
@@ -1,28 +1,87 @@
+import logging
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from webcommon.compression import CompressionMiddleware, CompressionStats
 
+from metals.env import (
+    get_compression_brotli_quality,
+    get_compression_gzip_level,
+    get_compression_minimum_size,
+)
+from metals.internal.metrics import Counter, Gauge, MetricsMiddleware, registry
 from metals.internal.price_cache import get_price_refresher
-from metals.routers import holdings, home, portfolios
-from metals.routers.shared import templates
+from metals.internal.prices import create_http_client
+from metals.routers import health, holdings, home, metrics, portfolios, prices
+from metals.routers.shared import precompile_templates, static_assets, templates
+
+logger = logging.getLogger(__name__)
+
+compression_stats = CompressionStats()
+
+registry.register(
+    Counter(
+        "compression_responses_total",
+        "Responses compressed by the compression middleware",
+        function=lambda: compression_stats.responses,
+    )
+)
+registry.register(
+    Counter(
+        "compression_bytes_in_total",
+        "Size of the compressed responses before compression",
+        function=lambda: compression_stats.bytes_in,
+    )
+)
+registry.register(
+    Counter(
+        "compression_bytes_out_total",
+        "Size of the compressed responses after compression",
+        function=lambda: compression_stats.bytes_out,
+    )
+)
+registry.register(
+    Gauge(
+        "price_stream_clients",
+        "Clients connected to the price stream",
+        function=lambda: get_price_refresher().broadcaster.subscriber_count,
+    )
+)
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
-    # Application startup
-    refresher = get_price_refresher()
-    refresher.start_background_refresh()
+    precompile_templates()
+
+    async with create_http_client() as http_client:
+        # Application startup
+        refresher = get_price_refresher()
+        refresher.start_background_refresh(http_client)
+
+        yield
 
-    yield
+        # Application shutdown; open price streams end instead of waiting for updates
+        refresher.broadcaster.close()
+        await refresher.stop_background_refresh()
 
-    # Application shutdown
-    await refresher.stop_background_refresh()
+    logger.info(
+        f"Compressed {compression_stats.responses} responses to "
+        f"{compression_stats.ratio:.1%} of their size"
+    )
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=get_compression_minimum_size(),
+    gzip_level=get_compression_gzip_level(),
+    brotli_quality=get_compression_brotli_quality(),
+    stats=compression_stats,
+)
+# Added last, so that it measures the time spent compressing as well
+app.add_middleware(MetricsMiddleware)
 
 
 @app.exception_handler(HTTPException)
@@ -38,8 +97,11 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> HTMLRe
     return HTMLResponse(content=str(exc.detail), status_code=exc.status_code)
 
 
-app.mount("/static", StaticFiles(directory="src/metals/static"), name="static")
+app.mount("/static", static_assets, name="static")
 
 app.include_router(portfolios.router)
 app.include_router(holdings.router)
 app.include_router(home.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
+app.include_router(prices.router)
@@ -0,0 +1,129 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import cache
+from pathlib import Path
+
+from fastapi import Request, Response
+
+from metals.env import is_development_mode
+from metals.routers.shared import TEMPLATE_DIRECTORY, static_assets
+
+
+@cache
+def _templates_digest() -> str:
+    """Digest of all templates, so that a deployment changing them changes ETags."""
+    digest = hashlib.sha256()
+
+    for path in sorted(Path(TEMPLATE_DIRECTORY).rglob("*")):
+        if path.is_file():
+            digest.update(path.as_posix().encode())
+            digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+def _opaque_tag(etag: str) -> str:
+    # Weak comparison, as the body may be compressed or streamed differently
+    return etag.strip().removeprefix("W/")
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    # SQLite returns naive timestamps, which are stored in UTC
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=UTC)
+
+    return timestamp.astimezone(UTC)
+
+
+@dataclass(frozen=True)
+class PageValidators:
+    """
+    ETag and Last-Modified of a rendered page, used to answer conditional GETs with
+    304 Not Modified before doing any of the work needed to render the page.
+    """
+
+    etag: str
+    last_modified: datetime | None = None
+
+    @classmethod
+    def for_page(
+        cls,
+        request: Request,
+        *parts: object,
+        last_modified: datetime | None = None,
+    ) -> PageValidators:
+        """
+        Builds the validators of a page from everything its content depends on.
+
+        The path, query string, templates, static asset names and development mode
+        are always included, so only the parts specific to the page have to be
+        passed.
+
+        Args:
+            request: Request for the page
+            *parts: Values the page content depends on, e.g. timestamps or versions
+            last_modified: When the page content last changed, if known
+        """
+        digest = hashlib.sha256()
+
+        for part in (
+            request.url.path,
+            request.url.query,
+            _templates_digest(),
+            static_assets.digest,
+            is_development_mode(),
+            *parts,
+        ):
+            digest.update(repr(part).encode())
+            digest.update(b"\0")
+
+        return cls(
+            etag=f'W/"{digest.hexdigest()[:32]}"',
+            last_modified=_as_utc(last_modified) if last_modified else None,
+        )
+
+    @property
+    def headers(self) -> dict[str, str]:
+        # no-cache lets browsers store the page, but revalidate it on every use
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """Whether the client's cached copy of the page is still up to date."""
+        if_none_match = request.headers.get("if-none-match")
+
+        # If-Modified-Since is ignored if If-None-Match is present (RFC 9110)
+        if if_none_match is not None:
+            return any(
+                tag.strip() == "*" or _opaque_tag(tag) == _opaque_tag(self.etag)
+                for tag in if_none_match.split(",")
+            )
+
+        if_modified_since = request.headers.get("if-modified-since")
+
+        if if_modified_since is None or self.last_modified is None:
+            return False
+
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except ValueError:
+            return False
+
+        if since.tzinfo is None:
+            return False
+
+        # HTTP dates have a resolution of one second
+        return self.last_modified.replace(microsecond=0) <= since
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+    def apply(self, response: Response) -> Response:
+        response.headers.update(self.headers)
+        return response
@@ -0,0 +1,44 @@
+from datetime import UTC, datetime
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from metals.env import get_price_staleness_threshold_seconds
+from metals.internal.price_cache import PriceSnapshot
+from metals.routers.shared import get_known_prices, prices_are_stale
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+async def healthz(
+    prices: Annotated[PriceSnapshot | None, Depends(get_known_prices)],
+) -> JSONResponse:
+    """
+    Reports whether current prices are served.
+
+    The status is "ok" while the prices are fresh and "degraded" once they are older
+    than the staleness threshold, extended while the markets are closed. Both are
+    answered with 200, as pages are still served with the last known prices and
+    every instance shares them, so taking an instance out of rotation would not
+    help. Only without any prices the status is "unavailable", answered with 503.
+    """
+    content: dict[str, Any] = {
+        "status": "unavailable",
+        "prices_refreshed_at": None,
+        "prices_age_seconds": None,
+        "staleness_threshold_seconds": get_price_staleness_threshold_seconds(),
+    }
+
+    if prices is not None:
+        age = datetime.now(UTC) - prices.refreshed_at
+        content["status"] = "degraded" if prices_are_stale(prices) else "ok"
+        content["prices_refreshed_at"] = prices.refreshed_at.isoformat()
+        content["prices_age_seconds"] = round(age.total_seconds(), 1)
+
+    return JSONResponse(
+        content,
+        status_code=503 if prices is None else 200,
+        headers={"Cache-Control": "no-store"},
+    )
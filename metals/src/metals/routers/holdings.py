@@ -1,32 +1,52 @@
 import uuid
+from collections.abc import AsyncIterator
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from metals.internal.persistency.db import get_session
-from metals.internal.persistency.models import Holding
 from metals.internal.persistency.queries import (
     delete_holding,
     get_holding,
     get_portfolio,
+    import_holdings,
+    insert_holding,
+    iter_holding_batches,
     update_holding,
-    update_portfolio,
 )
-from metals.routers.shared import build_template_context, templates
+from metals.internal.portfolio_calculations import iter_holding_overviews
+from metals.internal.price_cache import PriceSnapshot
+from metals.routers.holdings_csv import (
+    CsvImportError,
+    format_holdings,
+    format_unvalued_holdings,
+    parse_holdings,
+)
+from metals.routers.shared import build_template_context, get_current_prices, templates
 from metals.routers.types import HoldingForm
 
 router = APIRouter()
 
+# Holdings loaded, valued and written per part of a CSV export
+EXPORT_BATCH_SIZE = 1000
+
+_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+async def _read_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+        yield chunk
+
 
 @router.get("/p/{portfolio_id}/holdings/new")
 async def holdings_new(
     portfolio_id: uuid.UUID,
     request: Request,
-    session: Annotated[Session, Depends(get_session)],
+    prices: Annotated[PriceSnapshot | None, Depends(get_current_prices)],
 ) -> HTMLResponse:
-    context = await build_template_context(session, portfolio_id=portfolio_id)
+    context = await build_template_context(prices, portfolio_id=portfolio_id)
     return templates.TemplateResponse(request, "holdings/new.html.jinja2", context)
 
 
@@ -34,40 +54,96 @@ async def holdings_new(
 async def holdings_create(
     portfolio_id: uuid.UUID,
     data: Annotated[HoldingForm, Form()],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> RedirectResponse:
-    holding = Holding(
-        description=data.description,
-        metal=data.metal,
-        quantity=data.quantity,
-        purchase_price=data.purchase_price,
-    )
+    holding = await insert_holding(session, portfolio_id, data)
+
+    if holding is None:
+        raise HTTPException(status_code=404)
+
+    return RedirectResponse(f"/p/{portfolio_id}", status_code=303)
+
+
+@router.post("/p/{portfolio_id}/holdings/import")
+async def holdings_import(
+    portfolio_id: uuid.UUID,
+    file: UploadFile,
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> RedirectResponse:
+    """
+    Adds all holdings of an uploaded CSV file, e.g. written by holdings_export.
 
-    portfolio = get_portfolio(session, portfolio_id)
+    The file is parsed while it is read and stored in batches, so large files are
+    never held in memory as a whole. Either all rows are imported or none.
+    """
+    portfolio = await get_portfolio(session, portfolio_id)
 
     if portfolio is None:
         raise HTTPException(status_code=404)
 
-    portfolio.holdings.append(holding)
-    update_portfolio(session, portfolio)
+    try:
+        await import_holdings(session, portfolio.id, parse_holdings(_read_chunks(file)))
+    except CsvImportError as e:
+        await session.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
 
     return RedirectResponse(f"/p/{portfolio_id}", status_code=303)
 
 
+@router.get("/p/{portfolio_id}/holdings/export.csv")
+async def holdings_export(
+    portfolio_id: uuid.UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    prices: Annotated[PriceSnapshot | None, Depends(get_current_prices)],
+) -> StreamingResponse:
+    """
+    Streams all holdings of a portfolio, valued at the current prices, as CSV.
+
+    While no prices are known the holdings are exported all the same, with the
+    columns valuing them left empty.
+    """
+    portfolio = await get_portfolio(session, portfolio_id)
+
+    if portfolio is None:
+        raise HTTPException(status_code=404)
+
+    current_prices = prices.prices if prices else None
+
+    async def parts() -> AsyncIterator[str]:
+        yield format_holdings((), header=True)
+
+        async for holdings in iter_holding_batches(
+            session, portfolio_id, EXPORT_BATCH_SIZE
+        ):
+            if current_prices is None:
+                yield format_unvalued_holdings(holdings)
+            else:
+                yield format_holdings(
+                    iter_holding_overviews(holdings, current_prices), header=False
+                )
+
+    return StreamingResponse(
+        parts(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="holdings.csv"'},
+    )
+
+
 @router.get("/p/{portfolio_id}/holdings/{holding_id}/edit")
 async def holdings_edit(
     portfolio_id: uuid.UUID,
     holding_id: uuid.UUID,
     request: Request,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    prices: Annotated[PriceSnapshot | None, Depends(get_current_prices)],
 ) -> HTMLResponse:
-    holding = get_holding(session, portfolio_id, holding_id)
+    holding = await get_holding(session, portfolio_id, holding_id)
 
     if holding is None:
         raise HTTPException(status_code=404)
 
     context = await build_template_context(
-        session,
+        prices,
         portfolio_id=portfolio_id,
         holding_id=holding_id,
         holding=holding,
@@ -85,20 +161,13 @@ async def holdings_update(
     portfolio_id: uuid.UUID,
     holding_id: uuid.UUID,
     data: Annotated[HoldingForm, Form()],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> RedirectResponse:
-    holding = get_holding(session, portfolio_id, holding_id)
+    holding = await update_holding(session, portfolio_id, holding_id, data)
 
     if holding is None:
         raise HTTPException(status_code=404)
 
-    holding.description = data.description
-    holding.metal = data.metal
-    holding.quantity = data.quantity
-    holding.purchase_price = data.purchase_price
-
-    update_holding(session, holding)
-
     return RedirectResponse(f"/p/{portfolio_id}", status_code=303)
 
 
@@ -106,13 +175,9 @@ async def holdings_update(
 async def holdings_delete(
     portfolio_id: uuid.UUID,
     holding_id: uuid.UUID,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> RedirectResponse:
-    holding = get_holding(session, portfolio_id, holding_id)
-
-    if holding is None:
+    if not await delete_holding(session, portfolio_id, holding_id):
         raise HTTPException(status_code=404)
 
-    delete_holding(session, holding)
-
     return RedirectResponse(f"/p/{portfolio_id}", status_code=303)
@@ -0,0 +1,218 @@
+import codecs
+import csv
+import io
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from typing import Any
+
+from pydantic import ValidationError
+
+from metals.internal.persistency.models import Holding
+from metals.internal.types import HoldingOverview
+from metals.routers.types import HoldingForm
+
+IMPORT_COLUMNS = ("description", "metal", "quantity", "purchase_price")
+
+EXPORT_COLUMNS = (
+    "description",
+    "metal",
+    "quantity",
+    "purchase_price",
+    "purchase_cost",
+    "current_value",
+    "gain_percent",
+    "absolute_gain",
+)
+
+# Reporting every broken row of a large file is of no use to anyone
+_MAX_REPORTED_ERRORS = 20
+
+
+class CsvImportError(Exception):
+    """Raised if a CSV file cannot be imported, listing what is wrong with it."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _split_complete_records(text: str) -> tuple[str, str]:
+    """
+    Splits text into complete CSV records and the incomplete rest.
+
+    A line break only ends a record outside of a quoted field, i.e. if the number of
+    quotes read so far is even; escaped quotes ("") do not change that.
+    """
+    quotes = 0
+    position = 0
+    cut = 0
+
+    for line in text.split("\n")[:-1]:
+        quotes += line.count('"')
+        position += len(line) + 1
+
+        if quotes % 2 == 0:
+            cut = position
+
+    return text[:cut], text[cut:]
+
+
+async def _read_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[list[str]]:
+    # utf-8-sig drops the byte order mark spreadsheet applications like to add
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    try:
+        async for chunk in chunks:
+            complete, pending = _split_complete_records(pending + decoder.decode(chunk))
+
+            for record in csv.reader(io.StringIO(complete, newline="")):
+                yield record
+
+        pending += decoder.decode(b"", final=True)
+
+        for record in csv.reader(io.StringIO(pending, newline="")):
+            yield record
+    except UnicodeDecodeError:
+        raise CsvImportError(["File is not UTF-8 encoded"])
+    except csv.Error as e:
+        raise CsvImportError([f"Malformed CSV: {e}"])
+
+
+def _format_validation_error(row_number: int, error: ValidationError) -> str:
+    details = ", ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+    return f"Row {row_number}: {details}"
+
+
+async def parse_holdings(
+    chunks: AsyncIterable[bytes], batch_size: int = 500
+) -> AsyncIterator[list[HoldingForm]]:
+    """
+    Parses a CSV file of holdings while it is read, in batches of valid rows.
+
+    The header names the columns; columns other than IMPORT_COLUMNS are ignored, so
+    files written by format_holdings can be imported again. Empty rows are skipped.
+
+    Args:
+        chunks: Content of the file, e.g. read from an upload
+        batch_size: Maximum number of holdings per batch
+
+    Yields:
+        Validated holdings, in the order of the file.
+
+    Raises:
+        CsvImportError: If the header is missing columns or any row is invalid. Rows
+            are validated to the end of the file, so all problems are reported at
+            once; batches yielded before must be discarded.
+    """
+    records = _read_records(chunks)
+    header = await anext(records, None)
+
+    if header is None:
+        raise CsvImportError(["File is empty"])
+
+    names = [name.strip().lower() for name in header]
+    missing = [column for column in IMPORT_COLUMNS if column not in names]
+
+    if missing:
+        raise CsvImportError([f"Missing columns: {', '.join(missing)}"])
+
+    indexes = {column: names.index(column) for column in IMPORT_COLUMNS}
+    errors: list[str] = []
+    batch: list[HoldingForm] = []
+    # The header is row 1, like in a spreadsheet
+    row_number = 1
+
+    async for record in records:
+        row_number += 1
+
+        if not any(value.strip() for value in record):
+            continue
+
+        row: dict[str, Any] = {
+            column: record[index].strip() if index < len(record) else None
+            for column, index in indexes.items()
+        }
+
+        try:
+            holding = HoldingForm.model_validate(row)
+        except ValidationError as e:
+            if len(errors) < _MAX_REPORTED_ERRORS:
+                errors.append(_format_validation_error(row_number, e))
+            continue
+
+        if errors:
+            # Nothing is going to be stored anymore, only look for further errors
+            continue
+
+        batch.append(holding)
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if errors:
+        raise CsvImportError(errors)
+
+    if batch:
+        yield batch
+
+
+def format_holdings(holdings: Iterable[HoldingOverview], header: bool = True) -> str:
+    """
+    Formats holding overviews as CSV lines.
+
+    Args:
+        holdings: Holdings to format
+        header: Whether to start with the line naming the EXPORT_COLUMNS; disabled
+            for all but the first part of a file written in parts
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+
+    writer.writerows(
+        [
+            holding.description,
+            holding.metal,
+            holding.quantity,
+            holding.purchase_price,
+            round(holding.purchase_cost, 2),
+            round(holding.current_value, 2),
+            round(holding.gain_percent, 2),
+            round(holding.absolute_gain, 2),
+        ]
+        for holding in holdings
+    )
+
+    return buffer.getvalue()
+
+
+def format_unvalued_holdings(holdings: Iterable[Holding]) -> str:
+    """
+    Formats holdings as CSV lines without a header, like format_holdings, but with
+    the columns depending on the current prices left empty, e.g. while no prices are
+    known.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerows(
+        [
+            holding.description,
+            holding.metal.value,
+            holding.quantity,
+            holding.purchase_price,
+            round(holding.quantity * holding.purchase_price, 2),
+            "",
+            "",
+            "",
+        ]
+        for holding in holdings
+    )
+
+    return buffer.getvalue()
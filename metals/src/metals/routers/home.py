@@ -1,11 +1,16 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Request
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import Response
 
-from metals.internal.persistency.db import get_session
-from metals.routers.shared import build_template_context, templates
+from metals.internal.price_cache import PriceSnapshot
+from metals.routers.conditional import PageValidators
+from metals.routers.shared import (
+    build_template_context,
+    get_current_prices,
+    prices_are_stale,
+    templates,
+)
 
 router = APIRouter()
 
@@ -13,7 +18,23 @@ router = APIRouter()
 @router.get("/")
 async def home_index(
     request: Request,
-    session: Annotated[Session, Depends(get_session)],
-) -> HTMLResponse:
-    context = await build_template_context(session)
-    return templates.TemplateResponse(request, "home/index.html.jinja2", context)
+    prices: Annotated[PriceSnapshot | None, Depends(get_current_prices)],
+) -> Response:
+    validators = None
+
+    # The page only changes with the prices shown in the footer
+    if prices is not None:
+        validators = PageValidators.for_page(
+            request,
+            prices.fingerprint,
+            prices_are_stale(prices),
+            last_modified=prices.published_at,
+        )
+
+        if validators.matches(request):
+            return validators.not_modified()
+
+    context = await build_template_context(prices)
+    response = templates.TemplateResponse(request, "home/index.html.jinja2", context)
+
+    return validators.apply(response) if validators else response
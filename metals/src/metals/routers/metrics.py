@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from metals.internal.metrics import CONTENT_TYPE, registry
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics() -> Response:
+    """Exposes the metrics of this process in the Prometheus text format."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
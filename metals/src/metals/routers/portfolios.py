@@ -1,28 +1,50 @@
 import uuid
+from collections.abc import AsyncIterator, Iterator
+from datetime import UTC
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import RedirectResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from metals.internal.metrics import PORTFOLIO_OVERVIEW_DURATION
 from metals.internal.persistency.db import get_session
 from metals.internal.persistency.models import Portfolio
 from metals.internal.persistency.queries import (
-    get_latest_metal_prices,
+    get_holdings_page,
     get_portfolio,
+    get_portfolio_metal_totals,
     insert_portfolio,
+    iter_holding_batches,
+)
+from metals.internal.portfolio_calculations import (
+    calculate_portfolio_overview,
+    iter_holding_overviews,
+)
+from metals.internal.price_cache import PriceSnapshot
+from metals.internal.types import HoldingCursor, HoldingOverview
+from metals.routers.conditional import PageValidators
+from metals.routers.shared import (
+    build_template_context,
+    get_current_prices,
+    prices_are_stale,
+    stream_template,
+    templates,
 )
-from metals.internal.portfolio_calculations import calculate_portfolio_overview
-from metals.routers.shared import build_template_context, templates
 
 router = APIRouter()
 
+HOLDINGS_PAGE_SIZE = 100
+
+# Holdings loaded and valued per query while streaming all of them
+HOLDINGS_STREAM_BATCH_SIZE = 1000
+
 
 @router.post("/p/")
 async def portfolios_create(
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> RedirectResponse:
-    portfolio = insert_portfolio(session, Portfolio())
+    portfolio = await insert_portfolio(session, Portfolio())
 
     return RedirectResponse(f"/p/{portfolio.id}", status_code=303)
 
@@ -31,27 +53,106 @@ async def portfolios_create(
 async def portfolios_show(
     _id: uuid.UUID,
     request: Request,
-    session: Annotated[Session, Depends(get_session)],
-) -> HTMLResponse:
-    portfolio = get_portfolio(session, _id)
+    session: Annotated[AsyncSession, Depends(get_session)],
+    prices: Annotated[PriceSnapshot | None, Depends(get_current_prices)],
+    after: str | None = None,
+    stream: bool = False,
+) -> Response:
+    """
+    Shows a portfolio with one page of its holdings, following the cursor in after.
+
+    With stream set, all holdings after the cursor are rendered instead and the page
+    is streamed: layout and totals are sent first, rows follow as they are loaded and
+    rendered, one batch at a time.
+    """
+    portfolio = await get_portfolio(session, _id)
 
     if portfolio is None:
         raise HTTPException(status_code=404)
 
-    current_prices = get_latest_metal_prices(session)
+    if prices is None:
+        # Holdings cannot be valued yet; the page says so instead of failing
+        context = await build_template_context(None, portfolio_id=portfolio.id)
+
+        return templates.TemplateResponse(
+            request,
+            "portfolios/show.html.jinja2",
+            context,
+            headers={"Cache-Control": "no-store"},
+        )
+
+    validators = PageValidators.for_page(
+        request,
+        portfolio.updated_at,
+        prices.fingerprint,
+        prices_are_stale(prices),
+        last_modified=max(
+            portfolio.updated_at.replace(tzinfo=UTC), prices.published_at
+        ),
+    )
+
+    if validators.matches(request):
+        return validators.not_modified()
+
+    try:
+        cursor = HoldingCursor.decode(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid page cursor")
 
-    if not current_prices:
-        raise HTTPException(
-            status_code=503,
-            detail="Unable to fetch current metal prices from database",
+    metal_totals = await get_portfolio_metal_totals(session, portfolio.id)
+
+    if stream:
+        with PORTFOLIO_OVERVIEW_DURATION.time():
+            portfolio_overview = calculate_portfolio_overview(
+                [], metal_totals, prices.prices
+            )
+
+        current_prices = prices.prices
+
+        async def holding_chunks() -> AsyncIterator[Iterator[HoldingOverview]]:
+            # Loaded and valued one batch at a time while the page is sent
+            async for holdings in iter_holding_batches(
+                session, portfolio.id, HOLDINGS_STREAM_BATCH_SIZE, after=cursor
+            ):
+                yield iter_holding_overviews(holdings, current_prices)
+
+        context = await build_template_context(
+            prices,
+            portfolio_id=portfolio.id,
+            data=portfolio_overview,
+            holding_chunks=holding_chunks(),
+            is_first_page=cursor is None,
+            next_cursor=None,
         )
 
-    portfolio_overview = calculate_portfolio_overview(portfolio, current_prices)
+        return validators.apply(
+            stream_template(request, "portfolios/show.html.jinja2", context)
+        )
+
+    # One extra holding is loaded to find out whether there is a next page
+    holdings = await get_holdings_page(
+        session, portfolio.id, after=cursor, limit=HOLDINGS_PAGE_SIZE + 1
+    )
+    page = holdings[:HOLDINGS_PAGE_SIZE]
+
+    next_cursor = None
+    if len(holdings) > HOLDINGS_PAGE_SIZE:
+        next_cursor = HoldingCursor(created_at=page[-1].created_at, id=page[-1].id)
+
+    with PORTFOLIO_OVERVIEW_DURATION.time():
+        portfolio_overview = calculate_portfolio_overview(
+            page, metal_totals, prices.prices
+        )
 
     context = await build_template_context(
-        session,
+        prices,
         portfolio_id=portfolio.id,
         data=portfolio_overview,
+        holding_chunks=[portfolio_overview.holdings],
+        is_first_page=cursor is None,
+        next_cursor=next_cursor.encode() if next_cursor else None,
     )
 
-    return templates.TemplateResponse(request, "portfolios/show.html.jinja2", context)
+    return validators.apply(
+        templates.TemplateResponse(request, "portfolios/show.html.jinja2", context)
+    )
@@ -0,0 +1,69 @@
+import json
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from metals.internal.price_cache import (
+    PriceRefresher,
+    PriceSnapshot,
+    get_price_refresher,
+)
+from metals.routers.shared import prices_are_stale
+
+router = APIRouter()
+
+# Comments are sent on idle connections this often, so that proxies keep them open
+KEEPALIVE_INTERVAL_SECONDS = 15.0
+
+# How long browsers wait before reconnecting, e.g. after being dropped
+RECONNECT_DELAY_MS = 5000
+
+
+def format_price_event(prices: PriceSnapshot) -> str:
+    """Formats a snapshot as a server-sent "prices" event."""
+    data = {
+        "version": prices.version,
+        "prices": {metal.value: price for metal, price in prices.prices.items()},
+        "refreshed_at": prices.refreshed_at.isoformat(),
+        "stale": prices_are_stale(prices),
+    }
+
+    return f"event: prices\ndata: {json.dumps(data)}\n\n"
+
+
+async def _price_events(refresher: PriceRefresher) -> AsyncIterator[str]:
+    yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+
+    with refresher.broadcaster.subscribe() as subscription:
+        while True:
+            try:
+                prices = await subscription.receive(KEEPALIVE_INTERVAL_SECONDS)
+            except TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            # Dropped for falling behind or on shutdown; the browser reconnects and
+            # starts over
+            if prices is None:
+                return
+
+            yield format_price_event(prices)
+
+
+@router.get("/prices/stream")
+async def prices_stream(
+    refresher: Annotated[PriceRefresher, Depends(get_price_refresher)],
+) -> StreamingResponse:
+    """
+    Streams the current prices and every update as server-sent events, so that open
+    pages update their values without being reloaded.
+
+    Connections stay idle between updates, without holding a database session.
+    """
+    return StreamingResponse(
+        _price_events(refresher),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
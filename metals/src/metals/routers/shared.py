@@ -1,21 +1,197 @@
-from typing import Any
+import logging
+import os
+import time
+from collections.abc import AsyncGenerator, AsyncIterable, AsyncIterator, Iterator
+from datetime import UTC, datetime, timedelta
+from typing import Annotated, Any
 
+import jinja2
+from fastapi import Depends, Request
+from fastapi.responses import StreamingResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from webcommon.static_assets import StaticAssets
 
-from metals.env import is_development_mode
-from metals.internal.persistency.queries import get_latest_metal_prices
+from metals.env import (
+    get_price_staleness_threshold_seconds,
+    get_template_cache_dir,
+    is_development_mode,
+)
+from metals.internal.metrics import TEMPLATE_RENDER_DURATION
+from metals.internal.persistency.db import get_session
+from metals.internal.price_cache import (
+    PriceRefresher,
+    PriceSnapshot,
+    get_price_refresher,
+)
+from metals.internal.refresh_schedule import get_refresh_schedule
 
-templates = Jinja2Templates(directory="src/metals/templates")
+logger = logging.getLogger(__name__)
 
+TEMPLATE_DIRECTORY = "src/metals/templates"
 
-async def build_template_context(session: Session, **kwargs: Any) -> dict[str, Any]:
+static_assets = StaticAssets(
+    directory="src/metals/static",
+    prefix="/static",
+    fingerprint=not is_development_mode(),
+)
+
+
+def _create_bytecode_cache(subdirectory: str = "") -> jinja2.BytecodeCache | None:
+    directory = get_template_cache_dir()
+
+    if directory is None:
+        return None
+
+    directory = os.path.join(directory, subdirectory)
+    os.makedirs(directory, exist_ok=True)
+    return jinja2.FileSystemBytecodeCache(directory)
+
+
+class _TimedTemplate(jinja2.Template):
+    """Template recording how long it takes to render."""
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        with TEMPLATE_RENDER_DURATION.time(self.name or ""):
+            return super().render(*args, **kwargs)
+
+    def generate(self, *args: Any, **kwargs: Any) -> Iterator[str]:
+        # Only the time spent producing fragments counts, not the time the stream
+        # waits for the client in between
+        fragments = super().generate(*args, **kwargs)
+        elapsed = 0.0
+
+        while True:
+            started_at = time.perf_counter()
+            fragment = next(fragments, None)
+            elapsed += time.perf_counter() - started_at
+
+            if fragment is None:
+                break
+
+            yield fragment
+
+        TEMPLATE_RENDER_DURATION.observe(elapsed, self.name or "")
+
+    async def generate_async(
+        self, *args: Any, **kwargs: Any
+    ) -> AsyncGenerator[str, object]:
+        # As above, though the time spent awaiting iterables in the context, e.g.
+        # rows loaded from the database, counts towards rendering
+        fragments = aiter(super().generate_async(*args, **kwargs))
+        elapsed = 0.0
+
+        while True:
+            started_at = time.perf_counter()
+            fragment = await anext(fragments, None)
+            elapsed += time.perf_counter() - started_at
+
+            if fragment is None:
+                break
+
+            yield fragment
+
+        TEMPLATE_RENDER_DURATION.observe(elapsed, self.name or "")
+
+
+_environment = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATE_DIRECTORY),
+    autoescape=True,
+    bytecode_cache=_create_bytecode_cache(),
+    # Outside of development templates only change with a deployment, so there
+    # is no need to check them for changes on every render
+    auto_reload=is_development_mode(),
+)
+_environment.template_class = _TimedTemplate
+
+templates = Jinja2Templates(env=_environment)
+templates.env.globals["asset_url"] = static_assets.url
+
+# Streamed pages are rendered asynchronously, so that they can loop over async
+# iterables which load their rows while the page is sent. Globals are shared with
+# the environment above; compiled templates differ, so they are cached apart.
+_stream_environment = _environment.overlay(
+    enable_async=True, bytecode_cache=_create_bytecode_cache("async")
+)
+
+# Jinja yields many tiny fragments, which are joined into chunks of roughly this
+# many characters before being written to the client.
+_STREAM_CHUNK_SIZE = 4096
+
+
+def precompile_templates() -> list[str]:
+    """
+    Loads and compiles all templates, filling the bytecode cache.
+
+    Returns:
+        Names of all compiled templates.
+
+    Raises:
+        jinja2.TemplateError: If a template is broken, so that a bad deployment
+            fails on startup instead of on the first request rendering it.
+    """
+    names = templates.env.list_templates(extensions=["jinja2"])
+
+    for environment in (templates.env, _stream_environment):
+        for name in names:
+            environment.get_template(name)
+
+    return names
+
+
+async def get_current_prices(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    refresher: Annotated[PriceRefresher, Depends(get_price_refresher)],
+) -> PriceSnapshot | None:
+    """
+    FastAPI dependency to provide the current price snapshot to pages showing it.
+
+    The request counts towards the demand prices are refreshed by, and refreshes
+    them first if they are too old.
+    """
+    await refresher.on_request()
+
+    return await get_known_prices(session, refresher)
+
+
+async def get_known_prices(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    refresher: Annotated[PriceRefresher, Depends(get_price_refresher)],
+) -> PriceSnapshot | None:
+    """
+    FastAPI dependency to provide the current price snapshot as it is, e.g. to
+    health checks, which should not keep prices refreshed.
+
+    Prices are served from memory; the database is only queried on cold start, before
+    the refresher has published anything.
+    """
+    try:
+        return await refresher.get_snapshot(session)
+    except Exception as e:
+        # Prices not available, callers handle missing prices gracefully
+        logger.error(f"Failed to load current prices: {e}")
+        return None
+
+
+def prices_are_stale(prices: PriceSnapshot) -> bool:
+    """Whether prices are older than the staleness threshold, so pages mark them."""
+    return prices.is_stale(
+        get_refresh_schedule().max_price_age(
+            timedelta(seconds=get_price_staleness_threshold_seconds()),
+            datetime.now(UTC),
+        )
+    )
+
+
+async def build_template_context(
+    prices: PriceSnapshot | None, **kwargs: Any
+) -> dict[str, Any]:
     """
     Builds template context with shared values such as metal prices automatically
     included.
 
     Args:
-        session: Database session for querying latest metal prices
+        prices: Current price snapshot, if any prices are known
         **kwargs: Additional context variables to include
 
     Returns:
@@ -23,13 +199,50 @@ async def build_template_context(session: Session, **kwargs: Any) -> dict[str, A
     """
     context = dict(kwargs)
 
-    try:
-        metal_prices = get_latest_metal_prices(session)
-        context["metal_prices"] = metal_prices if metal_prices else None
-    except Exception:
-        # Prices not available, template will handle missing prices gracefully
-        context["metal_prices"] = None
-
+    context["metal_prices"] = prices.prices if prices else None
+    context["prices_refreshed_at"] = prices.refreshed_at if prices else None
+    context["prices_stale"] = prices_are_stale(prices) if prices else False
     context["is_dev_mode"] = is_development_mode()
 
     return context
+
+
+async def _join_fragments(fragments: AsyncIterable[str]) -> AsyncIterator[str]:
+    buffer: list[str] = []
+    buffered = 0
+
+    async for fragment in fragments:
+        buffer.append(fragment)
+        buffered += len(fragment)
+
+        if buffered >= _STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer.clear()
+            buffered = 0
+
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_template(
+    request: Request, name: str, context: dict[str, Any]
+) -> StreamingResponse:
+    """
+    Renders a template incrementally, sending each part as soon as it is rendered.
+
+    Iterables in the context, including async ones, are consumed while rendering, so
+    expensive rows can be loaded and produced lazily after the layout has already
+    been sent.
+
+    Args:
+        request: Request being answered, required by url_for in templates
+        name: Name of the template to render
+        context: Template context, e.g. built by build_template_context
+
+    Returns:
+        Streaming HTML response.
+    """
+    template = _stream_environment.get_template(name)
+    fragments = template.generate_async({**context, "request": request})
+
+    return StreamingResponse(_join_fragments(fragments), media_type="text/html")
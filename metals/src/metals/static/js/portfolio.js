@@ -20,3 +20,106 @@ function updateHomeButton() {
         form.method = 'get';
     }
 }
+
+function formatAmount(value) {
+    return `${value.toFixed(2)} €`;
+}
+
+function formatGain(value, suffix) {
+    return `${value >= 0 ? '+' : ''}${value.toFixed(2)}${suffix}`;
+}
+
+function gainPercent(absoluteGain, purchaseCost) {
+    return purchaseCost > 0 ? absoluteGain / purchaseCost * 100 : 0;
+}
+
+function setValue(element, name, text) {
+    const cell = element.querySelector(`[data-value="${name}"]`);
+
+    if (cell) {
+        cell.textContent = text;
+    }
+}
+
+// Values a table row from its quantity, purchase cost and the current prices
+function valueRow(row, prices) {
+    const price = prices[row.dataset.metal];
+
+    if (price === undefined) {
+        return null;
+    }
+
+    const purchaseCost = parseFloat(row.dataset.purchaseCost);
+    const currentValue = parseFloat(row.dataset.quantity) * price;
+
+    return {purchaseCost, currentValue, absoluteGain: currentValue - purchaseCost};
+}
+
+// Recomputes all values of the page with new prices, the same way the server does
+function updatePrices(update) {
+    const prices = update.prices;
+
+    for (const item of document.querySelectorAll('.price-item[data-metal]')) {
+        const price = prices[item.dataset.metal];
+
+        if (price !== undefined) {
+            item.textContent = `${item.dataset.metal}: ${formatAmount(price)}`;
+        }
+    }
+
+    if (!update.stale) {
+        document.querySelector('.price-item.stale')?.remove();
+    }
+
+    for (const row of document.querySelectorAll('tr[data-metal]:not([data-allocation])')) {
+        const value = valueRow(row, prices);
+
+        if (value) {
+            setValue(row, 'current-value', formatAmount(value.currentValue));
+            setValue(row, 'gain-percent', formatGain(gainPercent(value.absoluteGain, value.purchaseCost), '%'));
+            setValue(row, 'absolute-gain', formatGain(value.absoluteGain, ' €'));
+        }
+    }
+
+    // The allocations cover all holdings of the portfolio, not only those of the
+    // page, so the totals are summed up from them
+    const allocations = [...document.querySelectorAll('tr[data-allocation]')]
+        .map(row => ({row, value: valueRow(row, prices)}));
+
+    if (allocations.length === 0 || allocations.some(allocation => !allocation.value)) {
+        return;
+    }
+
+    const totalPurchaseCost = allocations.reduce((sum, {value}) => sum + value.purchaseCost, 0);
+    const totalCurrentValue = allocations.reduce((sum, {value}) => sum + value.currentValue, 0);
+    const totalAbsoluteGain = totalCurrentValue - totalPurchaseCost;
+
+    for (const {row, value} of allocations) {
+        setValue(row, 'current-value', formatAmount(value.currentValue));
+        setValue(row, 'share-percent', `${(totalCurrentValue > 0 ? value.currentValue / totalCurrentValue * 100 : 0).toFixed(2)}%`);
+        setValue(row, 'gain-percent', formatGain(gainPercent(value.absoluteGain, value.purchaseCost), '%'));
+    }
+
+    for (const total of document.querySelectorAll('[data-total="current-value"]')) {
+        total.textContent = formatAmount(totalCurrentValue);
+    }
+
+    for (const total of document.querySelectorAll('[data-total="gain-percent"]')) {
+        total.textContent = formatGain(gainPercent(totalAbsoluteGain, totalPurchaseCost), '%');
+    }
+
+    for (const total of document.querySelectorAll('[data-total="absolute-gain"]')) {
+        total.textContent = formatGain(totalAbsoluteGain, ' €');
+    }
+}
+
+// Keeps the values of the page up to date while it is open, instead of reloading it
+function streamPrices() {
+    if (!window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource('/prices/stream');
+
+    source.addEventListener('prices', event => updatePrices(JSON.parse(event.data)));
+}
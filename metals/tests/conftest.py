@@ -1,40 +1,100 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
+from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
+from metals.internal import prices
 from metals.internal.persistency.db import get_session
 from metals.internal.persistency.models import BaseModel
+from metals.internal.price_cache import PriceRefresher, get_price_refresher
+from metals.internal.refresh_schedule import get_refresh_schedule
 from metals.main import app
 
 
-@pytest.fixture
-def test_session() -> Generator[Session, None, None]:
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=False,
+@pytest.fixture(autouse=True)
+def upstream_state(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Circuits are kept per process; every test starts with closed circuits and
+    # retries without delay.
+    monkeypatch.setattr(
+        prices,
+        "_circuit_breakers",
+        {upstream: prices.CircuitBreaker(upstream) for upstream in prices.UPSTREAMS},
     )
+    monkeypatch.setattr(prices, "_RETRY_BASE_DELAY_SECONDS", 0.0)
+
+
+@pytest.fixture(autouse=True)
+def markets_always_open(monkeypatch: pytest.MonkeyPatch) -> Generator[None, None, None]:
+    # Staleness depends on the market hours, which must not depend on the weekday
+    # the tests run on
+    monkeypatch.setenv("PRICE_MARKET_HOURS", "")
+    get_refresh_schedule.cache_clear()
+
+    yield
+
+    get_refresh_schedule.cache_clear()
+
+
+@pytest.fixture
+def database_path(tmp_path: Path) -> Path:
+    # A file database is shared between the sync test session and the async
+    # session used by the app, which an in-memory database cannot do.
+    return tmp_path / "test.db"
+
+
+@pytest.fixture
+def test_engine(database_path: Path) -> Generator[Engine, None, None]:
+    engine = create_engine(f"sqlite:///{database_path}", echo=False)
 
     BaseModel.metadata.create_all(engine)
 
-    with Session(engine) as session:
-        yield session
+    yield engine
 
     BaseModel.metadata.drop_all(engine)
     engine.dispose()
 
 
 @pytest.fixture
-def client(test_session: Session) -> Generator[TestClient, None, None]:
-    def override_get_session() -> Generator[Session, None, None]:
-        yield test_session
+def test_session(test_engine: Engine) -> Generator[Session, None, None]:
+    with Session(test_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def price_refresher() -> PriceRefresher:
+    # A fresh refresher per test, so published snapshots do not leak between tests.
+    return PriceRefresher()
+
+
+@pytest.fixture
+def test_session_factory(
+    test_engine: Engine, database_path: Path
+) -> async_sessionmaker[AsyncSession]:
+    # The test client runs every request on a fresh event loop, so connections must
+    # not be pooled across requests.
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool
+    )
+
+    return async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def client(
+    test_session_factory: async_sessionmaker[AsyncSession],
+    price_refresher: PriceRefresher,
+) -> Generator[TestClient, None, None]:
+    async def override_get_session() -> AsyncGenerator[AsyncSession, None]:
+        async with test_session_factory() as session:
+            yield session
 
     app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_price_refresher] = lambda: price_refresher
 
     test_client = TestClient(app)
 
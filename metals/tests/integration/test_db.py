@@ -0,0 +1,47 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from metals.internal.persistency.db import apply_sqlite_pragmas
+
+
+def _read_pragmas(database_path: Path, foreign_keys: bool) -> dict[str, object]:
+    async def read() -> dict[str, object]:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+        apply_sqlite_pragmas(engine, foreign_keys=foreign_keys)
+
+        try:
+            async with engine.connect() as connection:
+                return {
+                    name: (await connection.execute(text(f"PRAGMA {name}"))).scalar()
+                    for name in (
+                        "journal_mode",
+                        "synchronous",
+                        "busy_timeout",
+                        "cache_size",
+                        "foreign_keys",
+                    )
+                }
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(read())
+
+
+def test_apply_sqlite_pragmas_configures_every_connection(
+    database_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "1234")
+
+    assert _read_pragmas(database_path, foreign_keys=True) == {
+        "journal_mode": "wal",
+        # NORMAL
+        "synchronous": 1,
+        "busy_timeout": 1234,
+        "cache_size": -65536,
+        "foreign_keys": 1,
+    }
+    assert _read_pragmas(database_path, foreign_keys=False)["foreign_keys"] == 0
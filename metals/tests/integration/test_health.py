@@ -0,0 +1,53 @@
+from datetime import UTC, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from metals.internal.persistency.models import LatestMetalPrice
+from metals.internal.types import Metal
+
+
+def _store_prices(test_session: Session, refreshed_at: datetime) -> None:
+    test_session.add_all(
+        LatestMetalPrice(metal=metal, price=10.0, updated_at=refreshed_at)
+        for metal in Metal
+    )
+    test_session.commit()
+
+
+def test_healthz_reports_fresh_prices_as_ok(
+    client: TestClient, test_session: Session
+) -> None:
+    _store_prices(test_session, datetime.now(UTC) - timedelta(minutes=1))
+
+    response = client.get("/healthz")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    assert response.json()["status"] == "ok"
+    assert 60 <= response.json()["prices_age_seconds"] < 120
+
+
+def test_healthz_reports_stale_prices_as_degraded(
+    client: TestClient, test_session: Session
+) -> None:
+    _store_prices(test_session, datetime.now(UTC) - timedelta(hours=1))
+
+    response = client.get("/healthz")
+
+    # Pages are still served with the last known prices
+    assert response.status_code == 200
+    assert response.json()["status"] == "degraded"
+    assert response.json()["prices_age_seconds"] >= 3600
+
+
+def test_healthz_reports_missing_prices_as_unavailable(client: TestClient) -> None:
+    response = client.get("/healthz")
+
+    assert response.status_code == 503
+    assert response.json() == {
+        "status": "unavailable",
+        "prices_refreshed_at": None,
+        "prices_age_seconds": None,
+        "staleness_threshold_seconds": 900,
+    }
@@ -1,11 +1,13 @@
 import uuid
+from typing import Any
 
 from bs4 import BeautifulSoup
 from fastapi.testclient import TestClient
-from sqlalchemy import select
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import Session
 
-from metals.internal.persistency.models import Holding, MetalPrice, Portfolio
+from metals.internal.persistency.models import Holding, LatestMetalPrice, Portfolio
 from metals.internal.types import Metal
 
 
@@ -14,8 +16,8 @@ def test_holdings_new_renders_successfully(
 ) -> None:
     portfolio_id = uuid.uuid4()
 
-    test_session.add(MetalPrice(metal=Metal.GOLD, price=12.0))
-    test_session.add(MetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
     test_session.add(Portfolio(id=portfolio_id))
     test_session.commit()
 
@@ -60,8 +62,8 @@ def test_holdings_create_redirects_to_portfolio_show(
 ) -> None:
     portfolio_id = uuid.uuid4()
 
-    test_session.add(MetalPrice(metal=Metal.GOLD, price=12.0))
-    test_session.add(MetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
     test_session.add(Portfolio(id=portfolio_id))
     test_session.commit()
 
@@ -86,8 +88,8 @@ def test_holdings_edit_renders_successfully(
     portfolio_id = uuid.uuid4()
     holding_id = uuid.uuid4()
 
-    test_session.add(MetalPrice(metal=Metal.GOLD, price=12.0))
-    test_session.add(MetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
     test_session.add(
         Portfolio(
             id=portfolio_id,
@@ -175,8 +177,8 @@ def test_holdings_update_redirects_to_portfolio_show(
     portfolio_id = uuid.uuid4()
     holding_id = uuid.uuid4()
 
-    test_session.add(MetalPrice(metal=Metal.GOLD, price=12.0))
-    test_session.add(MetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
     test_session.add(
         Portfolio(
             id=portfolio_id,
@@ -208,6 +210,109 @@ def test_holdings_update_redirects_to_portfolio_show(
     assert "Updated Britannia" in response.text
 
 
+def test_holdings_update_writes_with_single_statements_per_table(
+    client: TestClient,
+    test_session: Session,
+    test_session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    portfolio_id = uuid.uuid4()
+    holding_id = uuid.uuid4()
+
+    test_session.add(
+        Portfolio(
+            id=portfolio_id,
+            holdings=[
+                Holding(
+                    id=holding_id,
+                    description="Britannia",
+                    metal=Metal.GOLD,
+                    quantity=2.0,
+                    purchase_price=6.0,
+                )
+            ],
+        )
+    )
+    test_session.commit()
+    updated_at = test_session.get_one(Portfolio, portfolio_id).updated_at
+
+    statements: list[str] = []
+
+    def record(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        statements.append(statement.split()[0])
+
+    engine = test_session_factory.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.post(
+            f"/p/{portfolio_id}/holdings/{holding_id}",
+            data={
+                "description": "Updated Britannia",
+                "metal": "Silver",
+                "quantity": "3.0",
+                "purchase_price": "7.0",
+            },
+            follow_redirects=False,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    test_session.expire_all()
+
+    assert response.status_code == 303
+    assert statements == ["UPDATE", "UPDATE"]
+    assert test_session.get_one(Portfolio, portfolio_id).updated_at > updated_at
+
+
+def test_holdings_writes_return_404_for_holdings_of_other_portfolios(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = uuid.uuid4()
+    other_portfolio_id = uuid.uuid4()
+    holding_id = uuid.uuid4()
+
+    test_session.add(
+        Portfolio(
+            id=portfolio_id,
+            holdings=[
+                Holding(
+                    id=holding_id,
+                    description="Britannia",
+                    metal=Metal.GOLD,
+                    quantity=2.0,
+                    purchase_price=6.0,
+                )
+            ],
+        )
+    )
+    test_session.add(Portfolio(id=other_portfolio_id))
+    test_session.commit()
+
+    data = {
+        "description": "Stolen Britannia",
+        "metal": "Gold",
+        "quantity": "2.0",
+        "purchase_price": "6.0",
+    }
+
+    update_response = client.post(
+        f"/p/{other_portfolio_id}/holdings/{holding_id}", data=data
+    )
+    delete_response = client.post(
+        f"/p/{other_portfolio_id}/holdings/{holding_id}/delete"
+    )
+    create_response = client.post(f"/p/{uuid.uuid4()}/holdings", data=data)
+
+    test_session.expire_all()
+    holding = test_session.get_one(Holding, holding_id)
+
+    assert update_response.status_code == 404
+    assert delete_response.status_code == 404
+    assert create_response.status_code == 404
+    assert holding.description == "Britannia"
+    assert holding.portfolio_id == portfolio_id
+    assert test_session.scalars(select(Holding)).all() == [holding]
+
+
 def test_holdings_delete_removes_holding_successfully(
     client: TestClient, test_session: Session
 ) -> None:
@@ -247,8 +352,8 @@ def test_holdings_delete_redirects_to_portfolio_show(
     portfolio_id = uuid.uuid4()
     holding_id = uuid.uuid4()
 
-    test_session.add(MetalPrice(metal=Metal.GOLD, price=12.0))
-    test_session.add(MetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
     test_session.add(
         Portfolio(
             id=portfolio_id,
@@ -270,3 +375,138 @@ def test_holdings_delete_redirects_to_portfolio_show(
     assert response.status_code == 200
     assert "Your portfolio" in response.text
     assert "No holdings yet" in response.text
+
+
+def test_holdings_import_adds_all_rows_in_file_order(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = uuid.uuid4()
+
+    test_session.add(Portfolio(id=portfolio_id))
+    test_session.commit()
+
+    rows = "".join(f"Coin {index},Silver,1.5,20\n" for index in range(1200))
+    response = client.post(
+        f"/p/{portfolio_id}/holdings/import",
+        files={
+            "file": (
+                "holdings.csv",
+                f"description,metal,quantity,purchase_price\n{rows}",
+                "text/csv",
+            )
+        },
+        follow_redirects=False,
+    )
+
+    holdings = test_session.scalars(
+        select(Holding).order_by(Holding.created_at, Holding.id)
+    ).all()
+
+    assert response.status_code == 303
+    assert response.headers["Location"] == f"/p/{portfolio_id}"
+    assert [holding.description for holding in holdings] == [
+        f"Coin {index}" for index in range(1200)
+    ]
+    assert all(holding.portfolio_id == portfolio_id for holding in holdings)
+
+
+def test_holdings_import_rejects_the_whole_file_if_a_row_is_invalid(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = uuid.uuid4()
+
+    test_session.add(Portfolio(id=portfolio_id))
+    test_session.commit()
+
+    content = (
+        "description,metal,quantity,purchase_price\n"
+        "Britannia,Silver,1,20\n"
+        "Krugerrand,Platinum,1,1800\n"
+        "Maple Leaf,Gold,many,1900\n"
+    )
+    response = client.post(
+        f"/p/{portfolio_id}/holdings/import",
+        files={"file": ("holdings.csv", content, "text/csv")},
+    )
+
+    assert response.status_code == 422
+    assert [error.split(":")[0] for error in response.text.split("; ")] == [
+        "Row 3",
+        "Row 4",
+    ]
+    assert test_session.scalars(select(Holding)).all() == []
+
+
+def test_holdings_export_streams_valued_holdings_that_can_be_imported_again(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = uuid.uuid4()
+    copy_id = uuid.uuid4()
+
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(
+        Portfolio(
+            id=portfolio_id,
+            holdings=[
+                Holding(
+                    description='Britannia, "2024"',
+                    metal=Metal.GOLD,
+                    quantity=2.0,
+                    purchase_price=6.0,
+                )
+            ],
+        )
+    )
+    test_session.add(Portfolio(id=copy_id))
+    test_session.commit()
+
+    response = client.get(f"/p/{portfolio_id}/holdings/export.csv")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "description,metal,quantity,purchase_price,purchase_cost,current_value,"
+        "gain_percent,absolute_gain",
+        '"Britannia, ""2024""",Gold,2.0,6.0,12.0,24.0,100.0,12.0',
+    ]
+
+    response = client.post(
+        f"/p/{copy_id}/holdings/import",
+        files={"file": ("holdings.csv", response.content, "text/csv")},
+        follow_redirects=False,
+    )
+
+    copied = test_session.scalars(
+        select(Holding).where(Holding.portfolio_id == copy_id)
+    ).one()
+
+    assert response.status_code == 303
+    assert copied.description == 'Britannia, "2024"'
+    assert copied.metal == Metal.GOLD
+
+
+def test_holdings_export_leaves_valuation_empty_without_prices(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = uuid.uuid4()
+
+    test_session.add(
+        Portfolio(
+            id=portfolio_id,
+            holdings=[
+                Holding(
+                    description="Maple Leaf",
+                    metal=Metal.SILVER,
+                    quantity=3.0,
+                    purchase_price=25.5,
+                )
+            ],
+        )
+    )
+    test_session.commit()
+
+    response = client.get(f"/p/{portfolio_id}/holdings/export.csv")
+
+    assert response.status_code == 200
+    assert response.text.splitlines()[1:] == ["Maple Leaf,Silver,3.0,25.5,76.5,,,"]
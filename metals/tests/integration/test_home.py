@@ -1,13 +1,14 @@
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
-from metals.internal.persistency.models import MetalPrice
+from metals.internal.persistency.models import LatestMetalPrice
+from metals.internal.price_cache import PriceRefresher
 from metals.internal.types import Metal
 
 
 def test_loads_home_successfully(client: TestClient, test_session: Session) -> None:
-    test_session.add(MetalPrice(metal=Metal.GOLD, price=12.0))
-    test_session.add(MetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
     test_session.commit()
 
     response = client.get("/")
@@ -18,3 +19,55 @@ def test_loads_home_successfully(client: TestClient, test_session: Session) -> N
     assert "Track your precious metal portfolio" in content
     assert "Gold: 12.00 €" in content
     assert "Silver: 10.00 €" in content
+
+
+def test_home_prefers_published_prices_over_database(
+    client: TestClient, test_session: Session, price_refresher: PriceRefresher
+) -> None:
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.commit()
+
+    price_refresher.publish({Metal.GOLD: 20.0, Metal.SILVER: 15.0})
+
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert "Gold: 20.00 €" in response.text
+    assert "Silver: 15.00 €" in response.text
+
+
+def test_home_loads_prices_from_database_on_cold_start(
+    client: TestClient, test_session: Session, price_refresher: PriceRefresher
+) -> None:
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.commit()
+
+    assert price_refresher.snapshot is None
+
+    client.get("/")
+
+    snapshot = price_refresher.snapshot
+
+    assert snapshot is not None
+    assert snapshot.version == 1
+    assert snapshot.prices == {Metal.GOLD: 12.0, Metal.SILVER: 10.0}
+
+
+def test_home_answers_conditional_requests_until_prices_change(
+    client: TestClient, price_refresher: PriceRefresher
+) -> None:
+    price_refresher.publish({Metal.GOLD: 20.0, Metal.SILVER: 15.0})
+
+    etag = client.get("/").headers["ETag"]
+    not_modified = client.get("/", headers={"If-None-Match": etag})
+
+    price_refresher.publish({Metal.GOLD: 21.0, Metal.SILVER: 15.0})
+
+    modified = client.get("/", headers={"If-None-Match": etag})
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert modified.status_code == 200
+    assert modified.headers["ETag"] != etag
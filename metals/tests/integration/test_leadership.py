@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from metals.internal import leadership
+from metals.internal.leadership import LeaderLease
+
+
+@pytest.fixture(autouse=True)
+def leadership_session_factory(
+    monkeypatch: pytest.MonkeyPatch,
+    test_session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    monkeypatch.setattr(leadership, "session_factory", test_session_factory)
+
+
+def test_only_one_process_holds_the_lease() -> None:
+    first = LeaderLease("refresher")
+    second = LeaderLease("refresher")
+
+    assert asyncio.run(first.renew()) is True
+    assert asyncio.run(second.renew()) is False
+    assert asyncio.run(first.renew()) is True
+
+    assert first.is_leader
+    assert not second.is_leader
+
+
+def test_lease_is_taken_over_after_release() -> None:
+    first = LeaderLease("refresher")
+    second = LeaderLease("refresher")
+
+    asyncio.run(first.renew())
+    asyncio.run(first.release())
+
+    assert asyncio.run(second.renew()) is True
+    assert asyncio.run(first.renew()) is False
+
+
+def test_lease_is_taken_over_after_expiry() -> None:
+    first = LeaderLease("refresher", ttl_seconds=0)
+    second = LeaderLease("refresher")
+
+    asyncio.run(first.renew())
+
+    assert asyncio.run(second.renew()) is True
+
+
+def test_leases_with_different_names_are_independent() -> None:
+    first = LeaderLease("refresher")
+    second = LeaderLease("compactor")
+
+    assert asyncio.run(first.renew()) is True
+    assert asyncio.run(second.renew()) is True
@@ -1,13 +1,20 @@
 import re
 import uuid
+from datetime import UTC, datetime, timedelta
+from typing import Any
 
+import pytest
 from bs4 import BeautifulSoup
 from fastapi.testclient import TestClient
-from sqlalchemy import select
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import Session
 
-from metals.internal.persistency.models import Holding, MetalPrice, Portfolio
+from metals.internal.metrics import instrument_engine
+from metals.internal.persistency.models import Holding, LatestMetalPrice, Portfolio
+from metals.internal.price_cache import PriceRefresher
 from metals.internal.types import Metal
+from metals.routers import portfolios
 
 
 def test_portfolios_create_inserts_a_portfolio_successfully(
@@ -26,8 +33,8 @@ def test_portfolios_create_inserts_a_portfolio_successfully(
 def test_portfolios_create_redirects_to_portfolio_show(
     client: TestClient, test_session: Session
 ) -> None:
-    test_session.add(MetalPrice(metal=Metal.GOLD, price=12.0))
-    test_session.add(MetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
     test_session.commit()
 
     response = client.post("/p/")
@@ -41,8 +48,8 @@ def test_portfolios_show_renders_successfully_with_no_holdings(
 ) -> None:
     portfolio_id = uuid.uuid4()
 
-    test_session.add(MetalPrice(metal=Metal.GOLD, price=12.0))
-    test_session.add(MetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
     test_session.add(Portfolio(id=portfolio_id))
     test_session.commit()
 
@@ -55,6 +62,46 @@ def test_portfolios_show_renders_successfully_with_no_holdings(
     assert "Silver: 10.00 €" in response.text
 
 
+def test_portfolios_show_renders_without_prices_instead_of_failing(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = uuid.uuid4()
+
+    test_session.add(Portfolio(id=portfolio_id))
+    test_session.commit()
+
+    response = client.get(f"/p/{portfolio_id}")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "prices are not available yet" in response.text
+
+
+def test_portfolios_show_marks_stale_prices(
+    client: TestClient, test_session: Session, price_refresher: PriceRefresher
+) -> None:
+    portfolio_id = uuid.uuid4()
+
+    test_session.add(Portfolio(id=portfolio_id))
+    test_session.commit()
+
+    price_refresher.publish({Metal.GOLD: 12.0, Metal.SILVER: 10.0})
+    fresh = client.get(f"/p/{portfolio_id}")
+
+    price_refresher.publish(
+        {Metal.GOLD: 12.0, Metal.SILVER: 10.0},
+        refreshed_at=datetime(2026, 1, 2, 3, 4, tzinfo=UTC),
+    )
+    stale = client.get(
+        f"/p/{portfolio_id}", headers={"If-None-Match": fresh.headers["ETag"]}
+    )
+
+    assert "currently not updated" not in fresh.text
+    assert stale.status_code == 200
+    assert "Gold: 12.00 €" in stale.text
+    assert "Prices as of 2026-01-02 03:04 UTC, currently not updated" in stale.text
+
+
 def test_portfolios_show_renders_portfolio_table(
     client: TestClient, test_session: Session
 ) -> None:
@@ -64,8 +111,8 @@ def test_portfolios_show_renders_portfolio_table(
 
     test_session.add_all(
         [
-            MetalPrice(metal=Metal.GOLD, price=12.0),
-            MetalPrice(metal=Metal.SILVER, price=10.0),
+            LatestMetalPrice(metal=Metal.GOLD, price=12.0),
+            LatestMetalPrice(metal=Metal.SILVER, price=10.0),
             Portfolio(
                 id=portfolio_id,
                 holdings=[
@@ -154,5 +201,296 @@ def test_portfolios_show_renders_portfolio_table(
     assert _remove_all_whitespace(footer_cells[3].text) == "+27.00€"
 
 
+def test_portfolios_show_renders_allocation_per_metal(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = uuid.uuid4()
+
+    test_session.add_all(
+        [
+            LatestMetalPrice(metal=Metal.GOLD, price=12.0),
+            LatestMetalPrice(metal=Metal.SILVER, price=10.0),
+            Portfolio(
+                id=portfolio_id,
+                holdings=[
+                    Holding(
+                        description="Britannia",
+                        metal=Metal.GOLD,
+                        quantity=2,
+                        purchase_price=6.0,
+                    ),
+                    Holding(
+                        description="Maple Leaf",
+                        metal=Metal.SILVER,
+                        quantity=3,
+                        purchase_price=5.0,
+                    ),
+                    Holding(
+                        description="Philharmoniker",
+                        metal=Metal.SILVER,
+                        quantity=1,
+                        purchase_price=5.0,
+                    ),
+                ],
+            ),
+        ]
+    )
+    test_session.commit()
+
+    response = client.get(f"/p/{portfolio_id}")
+
+    soup = BeautifulSoup(response.text, "html.parser")
+
+    assert response.status_code == 200
+
+    allocations = soup.select_one("section.allocations")
+
+    assert allocations is not None
+
+    rows = {
+        cells[0].text: [cell.text.strip() for cell in cells[1:4]]
+        for cells in (row("td") for row in allocations("tr")[1:])
+    }
+
+    assert rows == {
+        "Gold": ["2.00", "24.00 €", "37.50%"],
+        "Silver": ["4.00", "40.00 €", "62.50%"],
+    }
+
+
+def test_portfolios_show_paginates_holdings_in_creation_order(
+    client: TestClient, test_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(portfolios, "HOLDINGS_PAGE_SIZE", 2)
+    portfolio_id = _add_portfolio_with_holdings(
+        test_session, ["First", "Second", "Third"]
+    )
+
+    first_page = BeautifulSoup(client.get(f"/p/{portfolio_id}").text, "html.parser")
+    next_link = first_page.find("a", string="Next page")
+
+    assert _holding_descriptions(first_page) == ["First", "Second"]
+    assert first_page.find("a", string="First page") is None
+    assert next_link is not None
+
+    second_page = BeautifulSoup(client.get(str(next_link["href"])).text, "html.parser")
+
+    assert _holding_descriptions(second_page) == ["Third"]
+    assert second_page.find("a", string="Next page") is None
+    assert second_page.find("a", string="First page") is not None
+    # Totals always cover the whole portfolio
+    assert "3 holdings worth" in second_page.text
+
+
+def test_portfolios_show_rejects_invalid_cursor(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = _add_portfolio_with_holdings(test_session, ["First"])
+
+    response = client.get(f"/p/{portfolio_id}?after=invalid")
+
+    assert response.status_code == 400
+
+
+def test_portfolios_show_streams_all_holdings(
+    client: TestClient, test_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(portfolios, "HOLDINGS_PAGE_SIZE", 2)
+    portfolio_id = _add_portfolio_with_holdings(
+        test_session, ["First", "Second", "Third"]
+    )
+
+    response = client.get(f"/p/{portfolio_id}?stream=true")
+    soup = BeautifulSoup(response.text, "html.parser")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert _holding_descriptions(soup) == ["First", "Second", "Third"]
+    assert soup.find("a", string="Next page") is None
+    assert response.text.index("3 holdings worth") < response.text.index("First")
+
+
+def test_portfolios_show_streams_holdings_in_batches(
+    client: TestClient,
+    test_session: Session,
+    test_session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(portfolios, "HOLDINGS_STREAM_BATCH_SIZE", 2)
+    portfolio_id = _add_portfolio_with_holdings(
+        test_session, ["First", "Second", "Third", "Fourth", "Fifth"]
+    )
+    holding_queries: list[str] = []
+
+    def record(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        if "ORDER BY holdings.created_at" in statement:
+            holding_queries.append(statement)
+
+    engine = test_session_factory.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+
+    try:
+        response = client.get(f"/p/{portfolio_id}?stream=true")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    soup = BeautifulSoup(response.text, "html.parser")
+
+    assert _holding_descriptions(soup) == [
+        "First",
+        "Second",
+        "Third",
+        "Fourth",
+        "Fifth",
+    ]
+    assert len(holding_queries) == 3
+    assert all("LIMIT" in statement for statement in holding_queries)
+
+
+def test_portfolios_show_answers_conditional_requests(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = _add_portfolio_with_holdings(test_session, ["First"])
+
+    response = client.get(f"/p/{portfolio_id}")
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    by_etag = client.get(f"/p/{portfolio_id}", headers={"If-None-Match": etag})
+    by_date = client.get(
+        f"/p/{portfolio_id}", headers={"If-Modified-Since": last_modified}
+    )
+    other_page = client.get(
+        f"/p/{portfolio_id}?stream=true", headers={"If-None-Match": etag}
+    )
+
+    assert by_etag.status_code == 304
+    assert by_etag.headers["ETag"] == etag
+    assert by_date.status_code == 304
+    assert other_page.status_code == 200
+
+
+def test_portfolios_show_changes_etag_when_holdings_change(
+    client: TestClient, test_session: Session
+) -> None:
+    portfolio_id = _add_portfolio_with_holdings(test_session, ["First"])
+    holding_id = test_session.scalars(select(Holding.id)).one()
+
+    etags = [client.get(f"/p/{portfolio_id}").headers["ETag"]]
+
+    client.post(
+        f"/p/{portfolio_id}/holdings",
+        data={
+            "description": "Second",
+            "metal": "Gold",
+            "quantity": "1.0",
+            "purchase_price": "6.0",
+        },
+    )
+    etags.append(client.get(f"/p/{portfolio_id}").headers["ETag"])
+
+    client.post(
+        f"/p/{portfolio_id}/holdings/{holding_id}",
+        data={
+            "description": "Renamed",
+            "metal": "Gold",
+            "quantity": "1.0",
+            "purchase_price": "6.0",
+        },
+    )
+    etags.append(client.get(f"/p/{portfolio_id}").headers["ETag"])
+
+    client.post(f"/p/{portfolio_id}/holdings/{holding_id}/delete")
+    etags.append(client.get(f"/p/{portfolio_id}").headers["ETag"])
+
+    assert len(set(etags)) == 4
+
+
+def _add_portfolio_with_holdings(
+    test_session: Session, descriptions: list[str]
+) -> uuid.UUID:
+    portfolio_id = uuid.uuid4()
+    created_at = datetime(2026, 1, 1)
+
+    test_session.add_all(
+        [
+            LatestMetalPrice(metal=Metal.GOLD, price=12.0),
+            LatestMetalPrice(metal=Metal.SILVER, price=10.0),
+            Portfolio(
+                id=portfolio_id,
+                holdings=[
+                    Holding(
+                        description=description,
+                        metal=Metal.GOLD,
+                        quantity=1,
+                        purchase_price=6.0,
+                        created_at=created_at + timedelta(minutes=index),
+                    )
+                    for index, description in enumerate(descriptions)
+                ],
+            ),
+        ]
+    )
+    test_session.commit()
+
+    return portfolio_id
+
+
+def _holding_descriptions(soup: BeautifulSoup) -> list[str]:
+    tbody = soup.find("tbody")
+    assert tbody is not None
+
+    return [cell.text for cell in tbody.select("tr > td:first-child")]
+
+
 def _remove_all_whitespace(text: str) -> str:
     return re.sub(r"\s+", "", text)
+
+
+def test_metrics_break_down_portfolio_requests(
+    client: TestClient,
+    test_session: Session,
+    test_session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    portfolio_id = uuid.uuid4()
+
+    # The app's engine is replaced by the test engine
+    instrument_engine(test_session_factory.kw["bind"])
+
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.add(Portfolio(id=portfolio_id))
+    test_session.commit()
+
+    client.get(f"/p/{portfolio_id}")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+
+    samples = dict(
+        line.rsplit(" ", 1)
+        for line in response.text.splitlines()
+        if not line.startswith("#")
+    )
+
+    assert (
+        float(
+            samples[
+                'http_request_duration_seconds_count{method="GET",route="/p/{_id}",'
+                'status="200"}'
+            ]
+        )
+        >= 1
+    )
+    assert float(samples['http_request_db_statements_count{route="/p/{_id}"}']) >= 1
+    assert float(samples['http_request_db_statements_sum{route="/p/{_id}"}']) >= 3
+    assert (
+        float(
+            samples[
+                'template_render_duration_seconds_count{template="portfolios/show.html.jinja2"}'
+            ]
+        )
+        >= 1
+    )
+    assert float(samples["portfolio_overview_duration_seconds_count"]) >= 1
@@ -0,0 +1,301 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from metals.internal import leadership, price_cache
+from metals.internal.metrics import (
+    PRICE_LAST_REFRESH,
+    PRICE_REFRESHES,
+    UPSTREAM_REQUEST_DURATION,
+    UPSTREAM_REQUESTS,
+)
+from metals.internal.persistency.models import (
+    DailyMetalPrice,
+    HourlyMetalPrice,
+    LatestMetalPrice,
+    MetalPrice,
+)
+from metals.internal.price_cache import PriceRefresher
+from metals.internal.prices import METAL_TO_SYMBOL
+from metals.internal.types import Metal
+
+
+@pytest.fixture(autouse=True)
+def refresher_session_factory(
+    monkeypatch: pytest.MonkeyPatch,
+    test_session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    monkeypatch.setattr(price_cache, "session_factory", test_session_factory)
+    monkeypatch.setattr(leadership, "session_factory", test_session_factory)
+
+
+@pytest.fixture
+def upstream_prices() -> dict[Metal, float]:
+    """USD prices returned by the stubbed upstream APIs, at a 1:1 EUR rate."""
+    return {}
+
+
+@pytest.fixture
+def upstream_client(upstream_prices: dict[Metal, float]) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/latest":
+            return httpx.Response(200, json={"rates": {"EUR": 1.0}})
+
+        symbol = request.url.path.rsplit("/", 1)[-1]
+        metal = next(m for m, s in METAL_TO_SYMBOL.items() if s == symbol)
+
+        return httpx.Response(200, json={"price": upstream_prices[metal]})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_refresh_stores_history_and_latest_prices(
+    upstream_prices: dict[Metal, float],
+    upstream_client: httpx.AsyncClient,
+    test_session: Session,
+) -> None:
+    refresher = PriceRefresher()
+
+    upstream_prices.update({Metal.GOLD: 12.0, Metal.SILVER: 10.0})
+    asyncio.run(refresher._fetch_and_store_prices(upstream_client))
+
+    upstream_prices.update({Metal.GOLD: 13.0, Metal.SILVER: 11.0})
+    asyncio.run(refresher._fetch_and_store_prices(upstream_client))
+
+    history = test_session.scalars(
+        select(MetalPrice).order_by(MetalPrice.created_at)
+    ).all()
+    latest = test_session.scalars(select(LatestMetalPrice)).all()
+
+    assert len(history) == 4
+    assert history[0].created_at < history[-1].created_at
+    assert {price.metal: price.price for price in latest} == {
+        Metal.GOLD: 13.0,
+        Metal.SILVER: 11.0,
+    }
+
+    snapshot = refresher.snapshot
+
+    assert snapshot is not None
+    assert snapshot.version == 2
+    assert snapshot.prices == {Metal.GOLD: 13.0, Metal.SILVER: 11.0}
+
+
+def test_refresh_skips_unchanged_prices_in_history(
+    upstream_prices: dict[Metal, float],
+    upstream_client: httpx.AsyncClient,
+    test_session: Session,
+) -> None:
+    refresher = PriceRefresher()
+
+    upstream_prices.update({Metal.GOLD: 12.0, Metal.SILVER: 10.0})
+    asyncio.run(refresher._fetch_and_store_prices(upstream_client))
+
+    upstream_prices.update({Metal.GOLD: 12.0, Metal.SILVER: 11.0})
+    asyncio.run(refresher._fetch_and_store_prices(upstream_client))
+
+    history = test_session.scalars(select(MetalPrice)).all()
+    latest = test_session.scalars(select(LatestMetalPrice)).all()
+
+    assert sorted((price.price, price.metal) for price in history) == [
+        (10.0, Metal.SILVER),
+        (11.0, Metal.SILVER),
+        (12.0, Metal.GOLD),
+    ]
+    assert {price.metal: price.price for price in latest} == {
+        Metal.GOLD: 12.0,
+        Metal.SILVER: 11.0,
+    }
+
+
+def test_refresh_converts_with_the_stored_rate_if_it_is_unavailable(
+    test_session: Session,
+) -> None:
+    usd_to_eur_rate: list[float | None] = [0.5]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/latest":
+            if usd_to_eur_rate[0] is None:
+                return httpx.Response(500)
+
+            return httpx.Response(200, json={"rates": {"EUR": usd_to_eur_rate[0]}})
+
+        return httpx.Response(200, json={"price": 20.0})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    asyncio.run(PriceRefresher()._fetch_and_store_prices(client))
+
+    # Another process takes over the refresh while the rate is unavailable
+    usd_to_eur_rate[0] = None
+    refresher = PriceRefresher()
+    refreshed = asyncio.run(refresher._fetch_and_store_prices(client))
+
+    latest = test_session.scalars(select(LatestMetalPrice)).all()
+
+    assert refreshed
+    assert refresher.snapshot is not None
+    assert refresher.snapshot.prices == {Metal.GOLD: 10.0, Metal.SILVER: 10.0}
+    assert {price.usd_to_eur_rate for price in latest} == {0.5}
+
+
+def test_refresh_records_upstream_requests_and_outcome(
+    upstream_prices: dict[Metal, float], upstream_client: httpx.AsyncClient
+) -> None:
+    refresher = PriceRefresher()
+    gold_api_calls = UPSTREAM_REQUEST_DURATION.count("gold-api")
+    frankfurter_failures = UPSTREAM_REQUESTS.value("frankfurter", "failure")
+    successes = PRICE_REFRESHES.value("success")
+    failures = PRICE_REFRESHES.value("failure")
+
+    upstream_prices.update({Metal.GOLD: 12.0, Metal.SILVER: 10.0})
+    asyncio.run(refresher._fetch_and_store_prices(upstream_client))
+
+    assert refresher.refreshed_at is not None
+    assert PRICE_LAST_REFRESH.value() == refresher.refreshed_at.timestamp()
+    assert UPSTREAM_REQUEST_DURATION.count("gold-api") == gold_api_calls + 2
+    assert PRICE_REFRESHES.value("success") == successes + 1
+
+    failing_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda _: httpx.Response(502))
+    )
+    refreshed_at = refresher.refreshed_at
+    asyncio.run(refresher._fetch_and_store_prices(failing_client))
+
+    assert refresher.refreshed_at == refreshed_at
+    # Every attempt counts, the failed ones are retried
+    assert UPSTREAM_REQUESTS.value("frankfurter", "failure") == (
+        frankfurter_failures + 3
+    )
+    assert PRICE_REFRESHES.value("failure") == failures + 1
+
+
+def test_requests_finding_old_prices_share_one_refresh(test_session: Session) -> None:
+    requested: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        await asyncio.sleep(0.05)
+
+        if request.url.path == "/latest":
+            return httpx.Response(200, json={"rates": {"EUR": 1.0}})
+
+        return httpx.Response(200, json={"price": 20.0})
+
+    refresher = PriceRefresher()
+    old = datetime.now(UTC) - timedelta(hours=1)
+
+    async def run() -> None:
+        refresher._http_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        await refresher._leader_lease.renew()
+        refresher.publish({Metal.GOLD: 10.0, Metal.SILVER: 10.0}, refreshed_at=old)
+
+        await asyncio.gather(*(refresher.on_request() for _ in range(10)))
+        # Fresh prices are served as they are
+        await refresher.on_request()
+
+    asyncio.run(run())
+
+    snapshot = refresher.snapshot
+
+    assert sorted(requested) == ["/latest", "/price/XAG", "/price/XAU"]
+    assert snapshot is not None
+    assert snapshot.prices == {Metal.GOLD: 20.0, Metal.SILVER: 20.0}
+    assert snapshot.refreshed_at > old
+
+
+def test_requests_do_not_refresh_prices_without_leadership() -> None:
+    refresher = PriceRefresher()
+    old = datetime.now(UTC) - timedelta(hours=1)
+
+    async def run() -> None:
+        refresher._http_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda _: httpx.Response(500))
+        )
+        refresher.publish({Metal.GOLD: 10.0, Metal.SILVER: 10.0}, refreshed_at=old)
+
+        await refresher.on_request()
+
+    asyncio.run(run())
+
+    assert refresher.refreshed_at == old
+
+
+def test_compaction_rolls_old_ticks_into_buckets(test_session: Session) -> None:
+    old = datetime(2025, 1, 1, 10, 0)
+    recent = datetime.now() - timedelta(days=1)
+
+    test_session.add_all(
+        [
+            MetalPrice(metal=Metal.GOLD, price=10.0, created_at=old),
+            MetalPrice(
+                metal=Metal.GOLD, price=14.0, created_at=old + timedelta(minutes=5)
+            ),
+            MetalPrice(
+                metal=Metal.GOLD, price=8.0, created_at=old + timedelta(minutes=10)
+            ),
+            MetalPrice(
+                metal=Metal.GOLD, price=11.0, created_at=old + timedelta(hours=1)
+            ),
+            MetalPrice(metal=Metal.GOLD, price=20.0, created_at=recent),
+        ]
+    )
+    test_session.commit()
+
+    refresher = PriceRefresher(raw_price_retention_days=7, compaction_batch_size=2)
+
+    asyncio.run(refresher._compact_price_history())
+
+    remaining = test_session.scalars(select(MetalPrice)).all()
+    hourly = test_session.scalars(
+        select(HourlyMetalPrice).order_by(HourlyMetalPrice.bucket_start)
+    ).all()
+    daily = test_session.scalars(select(DailyMetalPrice)).all()
+
+    assert [price.price for price in remaining] == [20.0]
+
+    assert len(hourly) == 2
+    assert hourly[0].bucket_start == datetime(2025, 1, 1, 10, 0)
+    assert (hourly[0].open, hourly[0].high, hourly[0].low, hourly[0].close) == (
+        10.0,
+        14.0,
+        8.0,
+        8.0,
+    )
+    assert hourly[0].tick_count == 3
+    assert hourly[1].bucket_start == datetime(2025, 1, 1, 11, 0)
+    assert hourly[1].tick_count == 1
+
+    assert len(daily) == 1
+    assert daily[0].bucket_start == datetime(2025, 1, 1)
+    assert (daily[0].open, daily[0].high, daily[0].low, daily[0].close) == (
+        10.0,
+        14.0,
+        8.0,
+        11.0,
+    )
+    assert daily[0].tick_count == 4
+
+
+def test_follower_publishes_prices_stored_by_leader(test_session: Session) -> None:
+    test_session.add(LatestMetalPrice(metal=Metal.GOLD, price=12.0))
+    test_session.add(LatestMetalPrice(metal=Metal.SILVER, price=10.0))
+    test_session.commit()
+
+    refresher = PriceRefresher()
+
+    asyncio.run(refresher._load_prices_from_database())
+    asyncio.run(refresher._load_prices_from_database())
+
+    snapshot = refresher.snapshot
+
+    assert snapshot is not None
+    assert snapshot.version == 1
+    assert snapshot.prices == {Metal.GOLD: 12.0, Metal.SILVER: 10.0}
+    assert refresher.refreshed_at is not None
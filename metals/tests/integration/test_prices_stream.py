@@ -0,0 +1,102 @@
+import asyncio
+import json
+from collections.abc import AsyncGenerator
+from typing import Any, cast
+
+import pytest
+from fastapi.testclient import TestClient
+
+from metals import main
+from metals.internal.price_cache import PriceRefresher
+from metals.internal.types import Metal
+from metals.routers import prices
+
+
+def _event_data(event: str) -> Any:
+    lines = event.strip().splitlines()
+
+    assert lines[0] == "event: prices"
+    return json.loads(lines[1].removeprefix("data: "))
+
+
+def test_stream_sends_current_prices_and_updates() -> None:
+    refresher = PriceRefresher()
+    refresher.publish({Metal.GOLD: 12.0, Metal.SILVER: 10.0})
+
+    async def run() -> list[str]:
+        response = await prices.prices_stream(refresher)
+        events = cast(AsyncGenerator[str], response.body_iterator)
+        received = [await anext(events), await anext(events)]
+
+        refresher.publish({Metal.GOLD: 13.0, Metal.SILVER: 10.0})
+        received.append(await anext(events))
+
+        await events.aclose()
+        return received
+
+    retry, current, update = asyncio.run(run())
+
+    assert retry == "retry: 5000\n\n"
+    assert _event_data(current)["prices"] == {"Gold": 12.0, "Silver": 10.0}
+    assert _event_data(current)["stale"] is False
+    assert _event_data(update)["prices"] == {"Gold": 13.0, "Silver": 10.0}
+    assert _event_data(update)["version"] == 2
+    assert refresher.broadcaster.subscriber_count == 0
+
+
+def test_stream_keeps_idle_connections_open(monkeypatch: Any) -> None:
+    monkeypatch.setattr(prices, "KEEPALIVE_INTERVAL_SECONDS", 0.01)
+    refresher = PriceRefresher()
+
+    async def run() -> str:
+        response = await prices.prices_stream(refresher)
+        events = cast(AsyncGenerator[str], response.body_iterator)
+        await anext(events)
+        keepalive = await anext(events)
+
+        await events.aclose()
+        return keepalive
+
+    assert asyncio.run(run()) == ": keepalive\n\n"
+
+
+def test_stream_ends_when_the_app_shuts_down(monkeypatch: pytest.MonkeyPatch) -> None:
+    refresher = PriceRefresher()
+    refresher.publish({Metal.GOLD: 12.0, Metal.SILVER: 10.0})
+    monkeypatch.setattr(main, "get_price_refresher", lambda: refresher)
+    monkeypatch.setattr(refresher, "start_background_refresh", lambda _client: None)
+
+    async def run() -> None:
+        async with main.lifespan(main.app):
+            response = await prices.prices_stream(refresher)
+            events = cast(AsyncGenerator[str], response.body_iterator)
+            await anext(events)
+            await anext(events)
+
+        with pytest.raises(StopAsyncIteration):
+            await asyncio.wait_for(anext(events), 1)
+
+    asyncio.run(run())
+
+    assert refresher.broadcaster.subscriber_count == 0
+
+
+def test_portfolio_page_exposes_what_values_are_recomputed_from(
+    client: TestClient, price_refresher: PriceRefresher
+) -> None:
+    price_refresher.publish({Metal.GOLD: 12.0, Metal.SILVER: 10.0})
+    portfolio_id = client.post("/p/", follow_redirects=False).headers["Location"]
+
+    client.post(
+        f"{portfolio_id}/holdings",
+        data={
+            "description": "Coin",
+            "metal": "Gold",
+            "quantity": "2",
+            "purchase_price": "5",
+        },
+    )
+    page = client.get(portfolio_id).text
+
+    assert 'data-metal="Gold" data-quantity="2.0" data-purchase-cost="10.0"' in page
+    assert "streamPrices()" in page
@@ -0,0 +1,220 @@
+import asyncio
+import inspect
+import uuid
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from metals.internal.persistency import queries
+from metals.internal.persistency.models import (
+    BaseModel,
+    Holding,
+    LatestMetalPrice,
+    MetalPrice,
+    Portfolio,
+)
+from metals.internal.types import HoldingCursor, Metal
+from metals.routers.types import HoldingForm
+
+PORTFOLIO_COUNT = 20
+HOLDINGS_PER_PORTFOLIO = 50
+PRICE_TICKS = 500
+
+# Tables that are read as a whole on purpose, as they hold one row per metal
+FULL_READ_TABLES = {"latest_metal_prices"}
+
+Query = Callable[[AsyncSession], Awaitable[object]]
+
+PORTFOLIO_ID = uuid.UUID(int=1)
+HOLDING_ID = uuid.UUID(int=1_000)
+FORM = HoldingForm(description="Coin", metal=Metal.GOLD, quantity=1, purchase_price=2)
+
+
+async def _batches() -> Any:
+    yield [FORM, FORM]
+
+
+# Every public function of queries.py, called the way the application calls it
+QUERIES: dict[str, Query] = {
+    "insert_portfolio": lambda s: queries.insert_portfolio(s, Portfolio()),
+    "get_portfolio": lambda s: queries.get_portfolio(s, PORTFOLIO_ID),
+    "get_holdings_page": lambda s: queries.get_holdings_page(
+        s,
+        PORTFOLIO_ID,
+        after=HoldingCursor(created_at=datetime(2026, 1, 1), id=HOLDING_ID),
+        limit=101,
+    ),
+    "get_portfolio_metal_totals": lambda s: queries.get_portfolio_metal_totals(
+        s, PORTFOLIO_ID
+    ),
+    "get_holding": lambda s: queries.get_holding(s, PORTFOLIO_ID, HOLDING_ID),
+    "insert_holding": lambda s: queries.insert_holding(s, PORTFOLIO_ID, FORM),
+    "update_holding": lambda s: queries.update_holding(
+        s, PORTFOLIO_ID, HOLDING_ID, FORM
+    ),
+    "delete_holding": lambda s: queries.delete_holding(s, PORTFOLIO_ID, HOLDING_ID),
+    "import_holdings": lambda s: queries.import_holdings(s, PORTFOLIO_ID, _batches()),
+    "insert_metal_prices_batch": lambda s: queries.insert_metal_prices_batch(
+        s, {Metal.GOLD: 1.5, Metal.SILVER: 2.5}, 0.9
+    ),
+    "get_latest_metal_prices": queries.get_latest_metal_prices,
+    "get_last_usd_to_eur_rate": queries.get_last_usd_to_eur_rate,
+    "get_prices_refreshed_at": queries.get_prices_refreshed_at,
+    "compact_metal_prices_batch": lambda s: queries.compact_metal_prices_batch(
+        s, datetime.now(UTC) - timedelta(days=1), 100
+    ),
+    "acquire_lease": lambda s: queries.acquire_lease(
+        s, "refresher", "worker-1", timedelta(seconds=30)
+    ),
+    "release_lease": lambda s: queries.release_lease(s, "refresher", "worker-1"),
+}
+
+
+@pytest.fixture
+def seeded_session(test_session: Session) -> Session:
+    now = datetime.now(UTC)
+
+    for portfolio_index in range(PORTFOLIO_COUNT):
+        test_session.add(
+            Portfolio(
+                id=uuid.UUID(int=portfolio_index + 1),
+                holdings=[
+                    Holding(
+                        id=uuid.UUID(
+                            int=1_000 + portfolio_index * HOLDINGS_PER_PORTFOLIO + row
+                        ),
+                        description=f"Coin {row}",
+                        metal=Metal.GOLD if row % 2 else Metal.SILVER,
+                        quantity=1.0,
+                        purchase_price=10.0,
+                        created_at=now - timedelta(minutes=row),
+                    )
+                    for row in range(HOLDINGS_PER_PORTFOLIO)
+                ],
+            )
+        )
+
+    test_session.add_all(
+        MetalPrice(
+            metal=Metal.GOLD if tick % 2 else Metal.SILVER,
+            price=float(tick),
+            created_at=now - timedelta(days=3, minutes=tick),
+        )
+        for tick in range(PRICE_TICKS)
+    )
+    test_session.add_all(
+        [
+            LatestMetalPrice(metal=Metal.GOLD, price=1.0),
+            LatestMetalPrice(metal=Metal.SILVER, price=2.0),
+        ]
+    )
+    test_session.commit()
+
+    return test_session
+
+
+@contextmanager
+def _recorded_statements(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> Iterator[list[tuple[str, Any]]]:
+    statements: list[tuple[str, Any]] = []
+
+    def record(
+        _conn: Any,
+        _cursor: Any,
+        statement: str,
+        parameters: Any,
+        _context: Any,
+        executemany: bool,
+    ) -> None:
+        # Inserts only touch the indexes they maintain
+        if not executemany and not statement.lstrip().upper().startswith("INSERT"):
+            statements.append((statement, parameters))
+
+    engine = session_factory.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _scanned_tables(engine: Engine, statement: str, parameters: Any) -> list[str]:
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).all()
+
+    # Details look like "SCAN holdings" or "SEARCH holdings USING INDEX ...";
+    # scans of VALUES lists or subquery results are not table scans
+    return [
+        detail.split()[1]
+        for *_, detail in plan
+        if detail.startswith("SCAN ") and detail.split()[1] in BaseModel.metadata.tables
+    ]
+
+
+def test_query_plan_suite_covers_all_queries() -> None:
+    public_functions = {
+        name
+        for name, function in inspect.getmembers(queries, inspect.iscoroutinefunction)
+        if not name.startswith("_") and function.__module__ == queries.__name__
+    }
+
+    assert public_functions == set(QUERIES)
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_query_does_not_scan_tables(
+    name: str,
+    seeded_session: Session,
+    test_engine: Engine,
+    test_session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async def run() -> None:
+        async with test_session_factory() as session:
+            await QUERIES[name](session)
+
+    with _recorded_statements(test_session_factory) as statements:
+        asyncio.run(run())
+
+    scans = {
+        statement: tables
+        for statement, parameters in statements
+        if (
+            tables := [
+                table
+                for table in _scanned_tables(test_engine, statement, parameters)
+                if table not in FULL_READ_TABLES
+            ]
+        )
+    }
+
+    assert statements or name == "insert_portfolio"
+    assert scans == {}
+
+
+def test_holdings_index_serves_pages_in_order(
+    seeded_session: Session, test_engine: Engine
+) -> None:
+    with test_engine.connect() as connection:
+        plan = connection.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT * FROM holdings WHERE portfolio_id = :id "
+                "ORDER BY created_at, id LIMIT 100"
+            ),
+            {"id": PORTFOLIO_ID.hex},
+        ).all()
+
+    details = [detail for *_, detail in plan]
+
+    assert any("ix_holdings_portfolio_id_created_at_id" in d for d in details)
+    # Rows come in index order, without sorting them first
+    assert not any("TEMP B-TREE" in d for d in details)
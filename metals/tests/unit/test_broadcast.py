@@ -0,0 +1,61 @@
+import asyncio
+
+from metals.internal.broadcast import Broadcaster
+from metals.internal.metrics import BROADCAST_DROPPED_SUBSCRIBERS
+
+
+def test_subscribers_receive_the_latest_and_every_later_message() -> None:
+    broadcaster = Broadcaster[int]("test")
+    broadcaster.broadcast(1)
+
+    async def run() -> list[int | None]:
+        with broadcaster.subscribe() as first, broadcaster.subscribe() as second:
+            broadcaster.broadcast(2)
+
+            return [
+                await first.receive(1),
+                await first.receive(1),
+                await second.receive(1),
+                await second.receive(1),
+            ]
+
+    assert asyncio.run(run()) == [1, 2, 1, 2]
+    assert broadcaster.subscriber_count == 0
+
+
+def test_subscribers_falling_behind_are_dropped() -> None:
+    broadcaster = Broadcaster[int]("test", max_queued=2)
+    dropped = BROADCAST_DROPPED_SUBSCRIBERS.value("test")
+
+    async def run() -> tuple[int | None, int | None]:
+        with broadcaster.subscribe() as slow, broadcaster.subscribe() as fast:
+            broadcaster.broadcast(1)
+            assert await fast.receive(1) == 1
+            broadcaster.broadcast(2)
+            assert await fast.receive(1) == 2
+            broadcaster.broadcast(3)
+
+            assert slow.dropped
+            assert broadcaster.subscriber_count == 1
+
+            return await slow.receive(1), await fast.receive(1)
+
+    # Queued messages are discarded, so the dropped subscriber learns right away
+    assert asyncio.run(run()) == (None, 3)
+    assert BROADCAST_DROPPED_SUBSCRIBERS.value("test") == dropped + 1
+
+
+def test_closing_drops_all_subscribers() -> None:
+    broadcaster = Broadcaster[int]("test")
+    broadcaster.broadcast(1)
+
+    async def run() -> tuple[int | None, int | None]:
+        with broadcaster.subscribe() as subscription:
+            broadcaster.close()
+
+            assert broadcaster.subscriber_count == 0
+
+            with broadcaster.subscribe() as late:
+                return await subscription.receive(1), await late.receive(1)
+
+    assert asyncio.run(run()) == (None, None)
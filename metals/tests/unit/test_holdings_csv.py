@@ -0,0 +1,62 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from metals.internal.types import Metal
+from metals.routers.holdings_csv import CsvImportError, parse_holdings
+from metals.routers.types import HoldingForm
+
+
+async def _chunks(content: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(content), size):
+        yield content[start : start + size]
+
+
+def _parse(content: bytes, size: int, batch_size: int = 500) -> list[list[HoldingForm]]:
+    async def collect() -> list[list[HoldingForm]]:
+        return [
+            batch async for batch in parse_holdings(_chunks(content, size), batch_size)
+        ]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+def test_parse_holdings_handles_records_split_across_chunks(size: int) -> None:
+    content = (
+        "\ufeffPurchase_Price,Description,Metal,Quantity,Notes\r\n"
+        '20,"Britannia\r\nfirst ""edition""",Silver,1,\r\n'
+        "\r\n"
+        "1900,Krügerrand,Gold,0.5,gift\r\n"
+        "30,Maple Leaf,Silver,2,"
+    ).encode()
+
+    batches = _parse(content, size, batch_size=2)
+
+    assert [[holding.description for holding in batch] for batch in batches] == [
+        ['Britannia\r\nfirst "edition"', "Krügerrand"],
+        ["Maple Leaf"],
+    ]
+    assert batches[0][1].metal == Metal.GOLD
+    assert batches[0][1].quantity == 0.5
+    assert batches[0][1].purchase_price == 1900.0
+
+
+def test_parse_holdings_reports_missing_columns() -> None:
+    with pytest.raises(CsvImportError) as error:
+        _parse(b"description,metal\nCoin,Gold\n", 16)
+
+    assert error.value.errors == ["Missing columns: quantity, purchase_price"]
+
+
+def test_parse_holdings_rejects_files_that_are_not_utf8() -> None:
+    with pytest.raises(CsvImportError) as error:
+        _parse(
+            "description,metal,quantity,purchase_price\nMünze,Gold,1,2\n".encode(
+                "latin-1"
+            ),
+            8,
+        )
+
+    assert error.value.errors == ["File is not UTF-8 encoded"]
@@ -0,0 +1,60 @@
+import pytest
+
+from metals.internal.metrics import Counter, Gauge, Histogram, Registry, _Metric
+
+
+def test_registry_renders_the_prometheus_text_format() -> None:
+    registry = Registry()
+    requests = registry.register(
+        Counter("requests_total", "Handled requests", labels=("route",))
+    )
+    registry.register(
+        Gauge("temperature", "Current temperature", function=lambda: 21.5)
+    )
+    latency = registry.register(
+        Histogram("latency_seconds", "Latency", labels=("route",), buckets=(0.1, 1.0))
+    )
+
+    requests.inc("/p/{_id}")
+    requests.inc("/p/{_id}", amount=2)
+    latency.observe(0.05, "/")
+    latency.observe(0.5, "/")
+    latency.observe(5.0, "/")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Handled requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/p/{_id}"} 3',
+        "# HELP temperature Current temperature",
+        "# TYPE temperature gauge",
+        "temperature 21.5",
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/",le="0.1"} 1',
+        'latency_seconds_bucket{route="/",le="1"} 2',
+        'latency_seconds_bucket{route="/",le="+Inf"} 3',
+        'latency_seconds_sum{route="/"} 5.55',
+        'latency_seconds_count{route="/"} 3',
+    ]
+
+
+def test_histogram_counts_values_on_a_bound_into_its_bucket() -> None:
+    histogram = Histogram("statements", "Statements", buckets=(0, 1, 2))
+
+    histogram.observe(0)
+    histogram.observe(1)
+
+    assert [line for line in histogram.render() if "_bucket" in line] == [
+        'statements_bucket{le="0"} 1',
+        'statements_bucket{le="1"} 2',
+        'statements_bucket{le="2"} 2',
+        'statements_bucket{le="+Inf"} 2',
+    ]
+
+
+def test_incomplete_metrics_cannot_be_created() -> None:
+    class WithoutSamples(_Metric):
+        type = "gauge"
+
+    with pytest.raises(TypeError):
+        WithoutSamples("without_samples", "Renders no samples")  # type: ignore[abstract]
@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+
+from metals.internal.persistency.models import Holding, Portfolio
+from metals.internal.portfolio_calculations import (
+    calculate_portfolio_overview,
+    calculate_portfolios_totals,
+)
+from metals.internal.types import Metal, MetalHoldingTotals
+
+PRICES = {Metal.GOLD: 12.0, Metal.SILVER: 10.0}
+
+
+def _holding(metal: Metal, quantity: float, purchase_price: float) -> Holding:
+    return Holding(
+        id=uuid.uuid4(),
+        description=f"{metal.value} coin",
+        metal=metal,
+        quantity=quantity,
+        purchase_price=purchase_price,
+    )
+
+
+def test_portfolio_overview_takes_totals_from_metal_totals() -> None:
+    holdings = [_holding(Metal.SILVER, 3, 5.0)]
+    metal_totals = [
+        MetalHoldingTotals(
+            metal=Metal.GOLD, holding_count=1, quantity=2, purchase_cost=12.0
+        ),
+        MetalHoldingTotals(
+            metal=Metal.SILVER, holding_count=2, quantity=4, purchase_cost=35.0
+        ),
+    ]
+
+    overview = calculate_portfolio_overview(holdings, metal_totals, PRICES)
+
+    assert len(overview.holdings) == 1
+    assert overview.holdings[0].purchase_cost == 15.0
+    assert overview.holdings[0].current_value == 30.0
+    assert overview.total_purchase_cost == 47.0
+    assert overview.total_current_value == 64.0
+    assert overview.total_absolute_gain == 17.0
+
+    assert [a.metal for a in overview.allocations] == ["Gold", "Silver"]
+    assert [a.current_value for a in overview.allocations] == [24.0, 40.0]
+    assert [a.share_percent for a in overview.allocations] == [37.5, 62.5]
+
+
+def test_portfolios_totals_values_many_portfolios_at_once() -> None:
+    portfolios = [
+        Portfolio(holdings=[_holding(Metal.GOLD, 2, 6.0)]),
+        Portfolio(holdings=[]),
+        Portfolio(
+            holdings=[_holding(Metal.SILVER, 3, 5.0), _holding(Metal.GOLD, 1, 24.0)]
+        ),
+    ]
+
+    totals = calculate_portfolios_totals(portfolios, PRICES)
+
+    assert [t.total_purchase_cost for t in totals] == [12.0, 0.0, 39.0]
+    assert [t.total_current_value for t in totals] == [24.0, 0.0, 42.0]
+    assert [t.total_gain_percent for t in totals] == pytest.approx(
+        [100.0, 0.0, 300 / 39]
+    )
+
+
+def test_valuation_fails_for_metal_without_price() -> None:
+    portfolios = [Portfolio(holdings=[_holding(Metal.SILVER, 1, 5.0)])]
+
+    with pytest.raises(KeyError):
+        calculate_portfolios_totals(portfolios, {Metal.GOLD: 12.0})
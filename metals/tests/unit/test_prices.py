@@ -0,0 +1,197 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+import httpx
+import pytest
+
+from metals.internal import prices
+from metals.internal.metrics import UPSTREAM_CIRCUIT_OPEN, UPSTREAM_REQUESTS
+from metals.internal.prices import (
+    CircuitOpenError,
+    MetalPricesInEur,
+    get_all_metal_prices_in_eur,
+)
+from metals.internal.types import Metal
+
+USD_PRICES = {"XAU": 2000.0, "XAG": 25.0}
+
+
+def _client(
+    fx_responses: list[httpx.Response], metal_responses: list[httpx.Response]
+) -> tuple[httpx.AsyncClient, list[str]]:
+    """Client answering with the given responses in order, the last one repeated."""
+    requested: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+
+        if request.url.path == "/latest":
+            response = fx_responses.pop(0) if len(fx_responses) > 1 else fx_responses[0]
+        else:
+            response = (
+                metal_responses.pop(0)
+                if len(metal_responses) > 1
+                else metal_responses[0]
+            )
+
+        if response.status_code == 200 and request.url.path != "/latest":
+            symbol = request.url.path.rsplit("/", 1)[-1]
+            return httpx.Response(200, json={"price": USD_PRICES[symbol]})
+
+        return response
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), requested
+
+
+def _fx(rate: float) -> httpx.Response:
+    return httpx.Response(200, json={"rates": {"EUR": rate}})
+
+
+def test_transient_failures_are_retried() -> None:
+    client, requested = _client(
+        [httpx.Response(503), httpx.Response(429), _fx(0.5)],
+        [httpx.Response(200)],
+    )
+
+    result = asyncio.run(get_all_metal_prices_in_eur(client))
+
+    assert result == MetalPricesInEur(
+        prices={Metal.GOLD: 1000.0, Metal.SILVER: 12.5}, usd_to_eur_rate=0.5
+    )
+    assert requested.count("/latest") == 3
+
+
+def test_client_errors_are_not_retried() -> None:
+    client, requested = _client([_fx(0.5)], [httpx.Response(404)])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get_all_metal_prices_in_eur(client))
+
+    assert requested.count("/price/XAU") == 1
+
+
+def test_a_single_failed_refresh_does_not_open_the_circuit() -> None:
+    client, requested = _client([_fx(0.5)], [httpx.Response(502)])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get_all_metal_prices_in_eur(client))
+
+    requested.clear()
+
+    # Every attempt is retried again, instead of being rejected
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get_all_metal_prices_in_eur(client))
+
+    assert requested.count("/price/XAU") == 3
+    assert UPSTREAM_CIRCUIT_OPEN.value("gold-api") == 0
+
+
+def test_circuit_opens_after_repeated_failures() -> None:
+    client, requested = _client([_fx(0.5)], [httpx.Response(502)])
+
+    # Each refresh counts one failure per metal, once its retries are exhausted, so
+    # the fifth failure happens during the third refresh
+    for _ in range(3):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(get_all_metal_prices_in_eur(client))
+
+    requested.clear()
+    rejected = UPSTREAM_REQUESTS.value("gold-api", "rejected")
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(get_all_metal_prices_in_eur(client))
+
+    assert "/price/XAU" not in requested
+    assert UPSTREAM_REQUESTS.value("gold-api", "rejected") == rejected + 2
+    assert UPSTREAM_CIRCUIT_OPEN.value("gold-api") == 1
+
+
+def test_circuit_lets_a_single_probe_through_once_the_timeout_passed(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    circuit_breaker = prices.CircuitBreaker(
+        "gold-api", failure_threshold=2, reset_timeout_seconds=60.0
+    )
+
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_request()
+
+    circuit_breaker.record_failure()
+    assert not circuit_breaker.allow_request()
+
+    now += 60.0
+    assert circuit_breaker.allow_request()
+    assert not circuit_breaker.allow_request()
+
+    # A failed probe opens the circuit again
+    circuit_breaker.record_failure()
+    now += 30.0
+    assert not circuit_breaker.allow_request()
+
+    now += 30.0
+    assert circuit_breaker.allow_request()
+
+    circuit_breaker.record_success()
+    assert circuit_breaker.allow_request()
+    assert circuit_breaker.allow_request()
+    assert UPSTREAM_CIRCUIT_OPEN.value("gold-api") == 0
+
+
+def test_lost_probe_is_replaced_after_the_timeout(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    circuit_breaker = prices.CircuitBreaker(
+        "gold-api", failure_threshold=1, reset_timeout_seconds=60.0
+    )
+
+    circuit_breaker.record_failure()
+    now += 60.0
+    assert circuit_breaker.allow_request()
+
+    # The probe never reports back, e.g. as it was cancelled
+    now += 60.0
+    assert circuit_breaker.allow_request()
+
+
+async def _known_rate() -> float | None:
+    return 0.5
+
+
+async def _no_known_rate() -> float | None:
+    return None
+
+
+def test_prices_are_converted_with_the_last_known_rate_if_it_is_unavailable() -> None:
+    client, _ = _client([httpx.Response(500)], [httpx.Response(200)])
+
+    result = asyncio.run(get_all_metal_prices_in_eur(client, _known_rate))
+
+    assert result == MetalPricesInEur(
+        prices={Metal.GOLD: 1000.0, Metal.SILVER: 12.5}, usd_to_eur_rate=0.5
+    )
+
+
+def test_last_known_rate_is_only_looked_up_if_the_rate_is_unavailable() -> None:
+    client, _ = _client([_fx(0.25)], [httpx.Response(200)])
+
+    async def unexpected_lookup() -> float | None:
+        raise AssertionError("The last known rate was looked up")
+
+    result = asyncio.run(get_all_metal_prices_in_eur(client, unexpected_lookup))
+
+    assert result.usd_to_eur_rate == 0.25
+
+
+@pytest.mark.parametrize("get_last_rate", [None, _no_known_rate])
+def test_prices_are_not_converted_without_any_known_rate(
+    get_last_rate: Callable[[], Awaitable[float | None]] | None,
+) -> None:
+    client, _ = _client([httpx.Response(500)], [httpx.Response(200)])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get_all_metal_prices_in_eur(client, get_last_rate))
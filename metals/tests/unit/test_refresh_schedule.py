@@ -0,0 +1,72 @@
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+
+from metals.internal.refresh_schedule import (
+    MarketCalendar,
+    RefreshSchedule,
+    RequestRate,
+)
+
+# A Friday
+FRIDAY = datetime(2026, 10, 16, tzinfo=UTC)
+
+
+def test_calendar_follows_weekly_hours_and_holidays() -> None:
+    calendar = MarketCalendar.parse(
+        "sun 22:00-24:00, mon-thu 00:00-24:00, fri 00:00-21:00",
+        holidays=[date(2026, 12, 25)],
+    )
+
+    assert calendar.is_open(FRIDAY.replace(hour=20, minute=59))
+    assert not calendar.is_open(FRIDAY.replace(hour=21))
+    assert not calendar.is_open(FRIDAY + timedelta(days=1, hours=12))
+    assert not calendar.is_open(FRIDAY + timedelta(days=2, hours=21, minutes=59))
+    assert calendar.is_open(FRIDAY + timedelta(days=2, hours=22))
+    assert calendar.is_open(FRIDAY + timedelta(days=3, hours=3))
+    assert not calendar.is_open(datetime(2026, 12, 25, 12, tzinfo=UTC))
+
+
+def test_calendar_without_hours_is_always_open() -> None:
+    calendar = MarketCalendar.parse(" ", holidays=[date(2026, 12, 25)])
+
+    assert calendar.is_open(FRIDAY + timedelta(days=1))
+    assert not calendar.is_open(datetime(2026, 12, 25, tzinfo=UTC))
+
+
+@pytest.mark.parametrize(
+    "hours", ["mon-fri", "mon 9:00-17:00", "xyz 08:00-17:00", "mon 17:00-08:00"]
+)
+def test_calendar_rejects_malformed_hours(hours: str) -> None:
+    with pytest.raises(ValueError):
+        MarketCalendar.parse(hours)
+
+
+def test_request_rate_counts_requests_within_the_window() -> None:
+    rate = RequestRate(window_seconds=60, bucket_seconds=10)
+
+    for second in range(30):
+        rate.record(now=1000.0 + second)
+
+    assert rate.per_minute(now=1030.0) == 30
+    # The first bucket has left the window
+    assert rate.per_minute(now=1065.0) == 20
+    assert rate.per_minute(now=1200.0) == 0
+
+
+def test_schedule_follows_demand_while_markets_are_open() -> None:
+    schedule = RefreshSchedule(MarketCalendar.parse("mon-fri 00:00-21:00"))
+
+    assert schedule.next_interval(0, FRIDAY) == schedule.idle_interval
+    assert schedule.next_interval(5, FRIDAY) == schedule.interval
+    assert schedule.next_interval(100, FRIDAY) == schedule.busy_interval
+
+    closed = FRIDAY.replace(hour=22)
+
+    assert schedule.next_interval(100, closed) == schedule.closed_interval
+    assert schedule.max_price_age(timedelta(minutes=15), FRIDAY) == timedelta(
+        minutes=15
+    )
+    assert schedule.max_price_age(timedelta(minutes=15), closed) == timedelta(
+        minutes=75
+    )
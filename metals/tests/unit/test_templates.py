@@ -0,0 +1,27 @@
+import jinja2
+import pytest
+from fastapi.templating import Jinja2Templates
+
+from metals.routers import shared
+from metals.routers.shared import precompile_templates
+
+
+def test_precompile_templates_compiles_all_templates() -> None:
+    names = precompile_templates()
+
+    assert "layout.html.jinja2" in names
+    assert "portfolios/show.html.jinja2" in names
+
+
+def test_precompile_templates_fails_on_broken_template(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    broken = Jinja2Templates(
+        env=jinja2.Environment(
+            loader=jinja2.DictLoader({"broken.html.jinja2": "{% if %}"})
+        )
+    )
+    monkeypatch.setattr(shared, "templates", broken)
+
+    with pytest.raises(jinja2.TemplateSyntaxError):
+        precompile_templates()
@@ -0,0 +1,247 @@
+import logging
+import zlib
+from collections.abc import Collection
+from dataclasses import dataclass
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .content_encoding import choose_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT_TYPES = frozenset(
+    {
+        "application/javascript",
+        "application/json",
+        "image/svg+xml",
+        "text/calendar",
+        "text/css",
+        "text/csv",
+        "text/html",
+        "text/plain",
+    }
+)
+
+
+@dataclass
+class CompressionStats:
+    """Running totals of the compressed responses, to tune the middleware with."""
+
+    responses: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """Compressed size relative to the original size, e.g. 0.2 for 80% saved."""
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+    def record(self, bytes_in: int, bytes_out: int) -> None:
+        self.responses += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+
+class _Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        # Flushed per chunk, so streamed parts reach the client without delay
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.process(data) + self._compressor.flush())
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.finish())
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli, if installed, or gzip.
+
+    Responses are passed through unchanged if they are already encoded, have a
+    content type not in content_types, or are complete and smaller than
+    minimum_size. Streamed responses are compressed chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        content_types: Collection[str] = DEFAULT_CONTENT_TYPES,
+        stats: CompressionStats | None = None,
+    ):
+        """
+        Args:
+            app: Application to compress the responses of
+            minimum_size: Complete responses below this many bytes are sent as is
+            gzip_level: gzip compression level, from 1 (fastest) to 9 (smallest)
+            brotli_quality: brotli quality, from 0 (fastest) to 11 (smallest)
+            content_types: Media types to compress, without parameters
+            stats: Totals to record the achieved compression in
+        """
+        self._app = app
+        self._minimum_size = minimum_size
+        self._gzip_level = gzip_level
+        self._brotli_quality = brotli_quality
+        self._content_types = frozenset(content_types)
+        self._stats = stats if stats is not None else CompressionStats()
+        self._encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    @property
+    def stats(self) -> CompressionStats:
+        return self._stats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self._encodings
+        )
+
+        if encoding is None:
+            await self._app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self, scope["path"], encoding, send)
+        await self._app(scope, receive, responder.send)
+
+    def create_encoder(self, encoding: str) -> _Encoder:
+        if encoding == "br":
+            return _BrotliEncoder(self._brotli_quality)
+
+        return _GzipEncoder(self._gzip_level)
+
+    def should_compress(self, start: Message, body: bytes, more_body: bool) -> bool:
+        headers = Headers(raw=start["headers"])
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+
+        if start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+
+        if media_type not in self._content_types:
+            return False
+
+        return more_body or len(body) >= self._minimum_size
+
+
+class _CompressingResponder:
+    """Intercepts the messages of a single response and compresses its body."""
+
+    def __init__(
+        self, middleware: CompressionMiddleware, path: str, encoding: str, send: Send
+    ):
+        self._middleware = middleware
+        self._path = path
+        self._encoding = encoding
+        self._send = send
+        self._start: Message | None = None
+        self._encoder: _Encoder | None = None
+        self._passthrough = False
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self._start = message
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if self._start is not None:
+            start, self._start = self._start, None
+
+            if not self._middleware.should_compress(start, body, more_body):
+                self._passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+
+            self._encoder = self._middleware.create_encoder(self._encoding)
+            await self._send_start(start, body, more_body)
+            return
+
+        await self._send_body(body, more_body)
+
+    async def _send_start(self, start: Message, body: bytes, more_body: bool) -> None:
+        assert self._encoder is not None
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self._encoding
+        headers.add_vary_header("Accept-Encoding")
+
+        # The compressed body is no longer byte-for-byte the same representation
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+        if more_body:
+            del headers["Content-Length"]
+            await self._send(start)
+            await self._send_body(body, more_body)
+            return
+
+        compressed = self._encoder.compress(body) + self._encoder.finish()
+        headers["Content-Length"] = str(len(compressed))
+        await self._send(start)
+        await self._send(
+            {"type": "http.response.body", "body": compressed, "more_body": False}
+        )
+        self._record(len(body), len(compressed))
+
+    async def _send_body(self, body: bytes, more_body: bool) -> None:
+        assert self._encoder is not None
+        compressed = self._encoder.compress(body)
+        self._bytes_in += len(body)
+        self._bytes_out += len(compressed)
+
+        if not more_body:
+            tail = self._encoder.finish()
+            compressed += tail
+            self._bytes_out += len(tail)
+            self._record(self._bytes_in, self._bytes_out)
+
+        await self._send(
+            {"type": "http.response.body", "body": compressed, "more_body": more_body}
+        )
+
+    def _record(self, bytes_in: int, bytes_out: int) -> None:
+        self._middleware.stats.record(bytes_in, bytes_out)
+        logger.debug(
+            f"Compressed {self._path} with {self._encoding}: {bytes_in} -> "
+            f"{bytes_out} bytes ({bytes_out / bytes_in if bytes_in else 1.0:.1%})"
+        )
@@ -0,0 +1,45 @@
+from collections.abc import Iterable
+
+
+def accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """Parses an Accept-Encoding header into the quality value per encoding."""
+    accepted: dict[str, float] = {}
+
+    for item in accept_encoding.split(","):
+        encoding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+
+        for param in params:
+            name, _, value = param.partition("=")
+
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if encoding:
+            accepted[encoding.lower()] = quality
+
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[str]) -> str | None:
+    """
+    Picks the first of the available encodings the client accepts.
+
+    Args:
+        accept_encoding: Accept-Encoding header of the request
+        available: Supported encodings, most preferred first
+
+    Returns:
+        The encoding to use, or None to send the content unencoded.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+
+    for encoding in available:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+
+    return None
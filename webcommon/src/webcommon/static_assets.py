@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from .content_encoding import choose_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Prebuilt siblings per encoding, most preferred first
+_ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+_COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+
+# Below this size compression does not pay off
+_MIN_COMPRESS_SIZE = 512
+
+
+def _fingerprinted(path: str, digest: str) -> str:
+    """Inserts a digest into a file name, e.g. css/custom.css -> css/custom.<d>.css"""
+    posix_path = PurePosixPath(path)
+    return str(posix_path.with_name(f"{posix_path.stem}.{digest}{posix_path.suffix}"))
+
+
+def _is_compressed_sibling(path: Path) -> bool:
+    return path.suffix in _ENCODING_SUFFIXES.values()
+
+
+def _sibling(file: Path, encoding: str) -> Path:
+    return file.with_name(file.name + _ENCODING_SUFFIXES[encoding])
+
+
+@dataclass(frozen=True)
+class _Asset:
+    file: Path
+    media_type: str
+    # Encodings with an up-to-date prebuilt sibling, most preferred first
+    encodings: list[str]
+
+
+class StaticAssets(StaticFiles):
+    """
+    Static files, additionally served under content-hashed names such as
+    css/custom.1a2b3c4d5e6f.css.
+
+    As the name changes with the content, hashed files are cached by browsers for a
+    year without revalidation. Prebuilt .br and .gz siblings (see compress_files) are
+    served to clients accepting them. Files are hashed once, on construction.
+    """
+
+    def __init__(self, directory: str | Path, prefix: str, fingerprint: bool = True):
+        """
+        Args:
+            directory: Directory containing the static files
+            prefix: Path the files are mounted under, e.g. /static
+            fingerprint: Whether URLs point to hashed names; disabled during
+                development, so that changed files are picked up immediately
+        """
+        super().__init__(directory=directory)
+        self._directory = Path(directory)
+        self._prefix = prefix.rstrip("/")
+        self._fingerprint = fingerprint
+        self._urls: dict[str, str] = {}
+        self._assets: dict[str, _Asset] = {}
+
+        digest = hashlib.sha256()
+
+        for file in sorted(self._directory.rglob("*")):
+            if not file.is_file() or _is_compressed_sibling(file):
+                continue
+
+            path = file.relative_to(self._directory).as_posix()
+            content_digest = hashlib.sha256(file.read_bytes()).hexdigest()[:12]
+            hashed = _fingerprinted(path, content_digest)
+            modified_at = file.stat().st_mtime
+
+            self._urls[path] = hashed
+            self._assets[hashed] = _Asset(
+                file=file,
+                media_type=mimetypes.guess_type(path)[0] or "text/plain",
+                encodings=[
+                    encoding
+                    for encoding in _ENCODING_SUFFIXES
+                    if _sibling(file, encoding).is_file()
+                    and _sibling(file, encoding).stat().st_mtime >= modified_at
+                ],
+            )
+            digest.update(f"{hashed}\0".encode())
+
+        self.digest = digest.hexdigest()
+
+    def url(self, path: str) -> str:
+        """
+        Returns the URL of a static file, e.g. for use in templates.
+
+        Args:
+            path: Path of the file relative to the static directory, e.g. /css/x.css
+        """
+        path = path.lstrip("/")
+
+        if self._fingerprint:
+            path = self._urls.get(path, path)
+
+        return f"{self._prefix}/{path}"
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        asset = self._assets.get(path)
+
+        if asset is None:
+            return await super().get_response(path, scope)
+
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), asset.encodings
+        )
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        file = asset.file
+
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            file = _sibling(file, encoding)
+
+        return FileResponse(file, media_type=asset.media_type, headers=headers)
+
+
+def compress_files(directory: str | Path) -> int:
+    """
+    Writes .gz and, if brotli is installed, .br siblings of all compressible static
+    files, e.g. while building the image.
+
+    Returns:
+        Number of written files.
+    """
+    written = 0
+
+    for file in sorted(Path(directory).rglob("*")):
+        if (
+            not file.is_file()
+            or file.suffix not in _COMPRESSIBLE_SUFFIXES
+            or file.stat().st_size < _MIN_COMPRESS_SIZE
+        ):
+            continue
+
+        content = file.read_bytes()
+        variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+
+        if brotli is not None:
+            variants[".br"] = brotli.compress(content, quality=11)
+
+        for suffix, compressed in variants.items():
+            # Not worth serving if compression does not make it smaller
+            if len(compressed) < len(content):
+                file.with_name(file.name + suffix).write_bytes(compressed)
+                written += 1
+
+    logger.info(f"Wrote {written} compressed static files in {directory}")
+
+    return written
@@ -0,0 +1,93 @@
+import gzip
+from collections.abc import Iterator
+
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from webcommon.compression import CompressionMiddleware, CompressionStats
+
+PAGE = "<p>Gold and silver</p>\n" * 200
+
+
+def _client(stats: CompressionStats) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500, stats=stats)
+
+    @app.get("/page")
+    async def page() -> HTMLResponse:
+        return HTMLResponse(PAGE, headers={"ETag": '"page"'})
+
+    @app.get("/small")
+    async def small() -> HTMLResponse:
+        return HTMLResponse("<p>Gold</p>")
+
+    @app.get("/binary")
+    async def binary() -> Response:
+        return Response(PAGE.encode(), media_type="application/octet-stream")
+
+    @app.get("/encoded")
+    async def encoded() -> Response:
+        return Response(
+            gzip.compress(PAGE.encode()),
+            media_type="text/html",
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        def chunks() -> Iterator[str]:
+            yield from PAGE.splitlines(keepends=True)
+
+        return StreamingResponse(chunks(), media_type="text/html")
+
+    return TestClient(app)
+
+
+def test_compresses_large_responses() -> None:
+    stats = CompressionStats()
+
+    response = _client(stats).get("/page", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"page"'
+    assert int(response.headers["content-length"]) == response.num_bytes_downloaded
+    assert response.text == PAGE
+    assert stats.responses == 1
+    assert stats.bytes_in == len(PAGE)
+    assert stats.ratio < 0.1
+
+
+def test_passes_through_small_binary_and_encoded_responses() -> None:
+    stats = CompressionStats()
+    client = _client(stats)
+
+    for path in ("/small", "/binary"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+
+    encoded = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+
+    assert encoded.text == PAGE
+
+    assert (
+        client.get("/page", headers={"Accept-Encoding": "identity"}).headers.get(
+            "content-encoding"
+        )
+        is None
+    )
+    assert stats.responses == 0
+
+
+def test_compresses_streaming_responses_chunk_by_chunk() -> None:
+    stats = CompressionStats()
+
+    response = _client(stats).get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == PAGE
+    assert stats.responses == 1
+    assert stats.bytes_in == len(PAGE)
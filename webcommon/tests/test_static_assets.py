@@ -0,0 +1,71 @@
+import gzip
+import re
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from webcommon.static_assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    StaticAssets,
+    compress_files,
+)
+
+CSS = "body { color: black; }\n" * 100
+
+
+def _client(static_assets: StaticAssets) -> TestClient:
+    app = FastAPI()
+    app.mount("/static", static_assets, name="static")
+    return TestClient(app)
+
+
+def test_static_assets_serves_fingerprinted_files_immutably(tmp_path: Path) -> None:
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_text(CSS)
+    static_assets = StaticAssets(directory=tmp_path, prefix="/static")
+
+    url = static_assets.url("/css/site.css")
+    response = _client(static_assets).get(url)
+
+    assert re.fullmatch(r"/static/css/site\.[0-9a-f]{12}\.css", url)
+    assert response.status_code == 200
+    assert response.text == CSS
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["content-type"].startswith("text/css")
+
+
+def test_static_assets_serves_prebuilt_compressed_siblings(tmp_path: Path) -> None:
+    (tmp_path / "site.css").write_text(CSS)
+    compress_files(str(tmp_path))
+    static_assets = StaticAssets(directory=str(tmp_path), prefix="/static")
+    client = _client(static_assets)
+
+    compressed = client.get(
+        static_assets.url("site.css"), headers={"Accept-Encoding": "gzip"}
+    )
+    plain = client.get(
+        static_assets.url("site.css"), headers={"Accept-Encoding": "identity"}
+    )
+
+    assert (tmp_path / "site.css.gz").read_bytes() == gzip.compress(
+        CSS.encode(), compresslevel=9, mtime=0
+    )
+    assert compressed.headers["content-encoding"] in ("br", "gzip")
+    assert compressed.text == CSS
+    assert int(compressed.headers["content-length"]) < len(CSS)
+    assert "content-encoding" not in plain.headers
+    assert plain.text == CSS
+
+
+def test_static_assets_keeps_serving_plain_names(tmp_path: Path) -> None:
+    (tmp_path / "site.css").write_text(CSS)
+    static_assets = StaticAssets(
+        directory=str(tmp_path), prefix="/static", fingerprint=False
+    )
+
+    response = _client(static_assets).get(static_assets.url("site.css"))
+
+    assert static_assets.url("site.css") == "/static/site.css"
+    assert response.status_code == 200
+    assert "immutable" not in response.headers.get("cache-control", "")